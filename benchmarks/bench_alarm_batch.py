@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""benchmarks/bench_alarm_batch.py
+
+Measures alarm evaluation cycles per second, every tag changes on each cycle
+while the alarm conditions do not flip, so no state transition is logged:
+
+* per-alarm path, *Alarm.update* of each alarm bound to each changed tag, as *AlarmManager.execute* does
+* batch path, *BatchAlarmEvaluator.evaluate* of the whole snapshot in one vectorized pass
+
+Usage:
+
+```
+PYTHONPATH=. python benchmarks/bench_alarm_batch.py [n_alarms ...]
+```
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from pyhades import PyHades
+from pyhades.alarms import Alarm, TriggerType
+from pyhades.alarms.batch import BatchAlarmEvaluator
+
+ALARMS_PER_TAG = 4
+TRIGGERS = [(TriggerType.HH, 110.0), (TriggerType.H, 100.0), (TriggerType.L, 20.0), (TriggerType.LL, 10.0)]
+
+
+def build(n_alarms:int)->tuple:
+
+    tags = [f"BENCH-{i}" for i in range(n_alarms // ALARMS_PER_TAG)]
+    alarms = list()
+
+    for i in range(n_alarms):
+
+        _type, value = TRIGGERS[i % ALARMS_PER_TAG]
+        # Loaded alarms are not inserted in the database
+        alarm = Alarm(name=f"BENCH-ALARM-{i}", tag=tags[i // ALARMS_PER_TAG], description='Benchmark alarm', load=True)
+        alarm.set_trigger(value=value, _type=_type.value)
+        alarms.append(alarm)
+
+    return tags, alarms
+
+
+def per_alarm(tags:list, alarms:list, cycles:int)->float:
+
+    alarms_by_tag = dict()
+
+    for alarm in alarms:
+
+        alarms_by_tag.setdefault(alarm.tag, list()).append(alarm)
+
+    start = time.perf_counter()
+
+    for cycle in range(cycles):
+
+        value = 50.0 + cycle % 10
+
+        for tag in tags:
+
+            for alarm in alarms_by_tag[tag]:
+
+                alarm.update(value)
+
+    return cycles / (time.perf_counter() - start)
+
+
+def batch(tags:list, alarms:list, cycles:int)->float:
+
+    evaluator = BatchAlarmEvaluator(alarms)
+    evaluator.evaluate({tag: 50.0 for tag in tags})
+    start = time.perf_counter()
+
+    for cycle in range(cycles):
+
+        value = 50.0 + cycle % 10
+        evaluator.evaluate({tag: value for tag in tags})
+
+    return cycles / (time.perf_counter() - start)
+
+
+def main(*sizes):
+
+    directory = tempfile.mkdtemp()
+    app = PyHades()
+    app.set_mode('Development')
+    app.set_db(dbfile=os.path.join(directory, 'bench.db'))
+    app.get_db_manager().init_database()
+
+    try:
+
+        print(f"{'alarms':>8}{'per-alarm cycles/s':>22}{'batch cycles/s':>18}{'speedup':>10}")
+
+        for n_alarms in sizes or (10000, 100000):
+
+            tags, alarms = build(n_alarms)
+            cycles = max(5, 200000 // n_alarms)
+            slow = per_alarm(tags, alarms, cycles)
+            fast = batch(tags, alarms, cycles)
+            print(f"{n_alarms:>8}{slow:>22.1f}{fast:>18.1f}{fast / slow:>9.1f}x")
+
+    finally:
+
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
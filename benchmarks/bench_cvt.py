@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""benchmarks/bench_cvt.py
+
+Measures CVT read/write throughput (ops/s).
+
+The *legacy lookup* column reproduces the per-operation database work the
+CVT used to do to resolve a tag name (`Tags.read_by_name`) and its units
+(two `Units.read_by_unit`), so it can be compared with the in-memory path.
+
+Usage:
+
+```
+PYTHONPATH=. python benchmarks/bench_cvt.py [n_tags] [n_ops]
+```
+"""
+import os
+import sys
+import time
+import tempfile
+
+from pyhades import PyHades
+from pyhades.tags import CVTEngine
+from pyhades.dbmodels import Tags, Units
+
+
+def ops_per_second(func, n_ops):
+
+    start = time.perf_counter()
+
+    for i in range(n_ops):
+
+        func(i)
+
+    return n_ops / (time.perf_counter() - start)
+
+
+def main(n_tags:int=1000, n_ops:int=20000):
+
+    dbfile = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = PyHades()
+    app.set_mode('Development')
+    app.set_db(dbfile=dbfile)
+    app.get_db_manager().init_database()
+    tag_engine = CVTEngine()
+    cvt = tag_engine._cvt
+
+    names = [f"BENCH-{i}" for i in range(n_tags)]
+
+    for name in names:
+
+        tag_engine.set_tag(name, 'Pa', 'float', 'Benchmark tag', name)
+
+    # Measure CVT values only, database logging is not part of this benchmark
+    cvt.logger.log_values = lambda values: None
+
+    def legacy_lookup(i):
+
+        name = names[i % n_tags]
+        Tags.read_by_name(name)
+        Units.read_by_unit('Pa')
+        Units.read_by_unit('Pa')
+
+    results = [
+        ("legacy lookup (SQL)", ops_per_second(legacy_lookup, n_ops)),
+        ("CVT.set_value", ops_per_second(lambda i: cvt.set_value(names[i % n_tags], float(i)), n_ops)),
+        ("CVT.get_value", ops_per_second(lambda i: cvt.get_value(names[i % n_tags]), n_ops)),
+        ("CVT.get_value(unit)", ops_per_second(lambda i: cvt.get_value(names[i % n_tags], unit='kPa'), n_ops)),
+        ("CVTEngine.write_tag", ops_per_second(lambda i: tag_engine.write_tag(names[i % n_tags], float(i)), n_ops)),
+        ("CVTEngine.read_tag", ops_per_second(lambda i: tag_engine.read_tag(names[i % n_tags]), n_ops)),
+    ]
+
+    print(f"{n_tags} tags - {n_ops} operations")
+
+    for name, value in results:
+
+        print(f"{name:<24}{value:>14,.0f} ops/s")
+
+
+if __name__ == '__main__':
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""benchmarks/bench_cvt_contention.py
+
+Measures CVTEngine aggregate read throughput and worst read latency
+under contention.
+
+Each run splits a fixed number of `read_tag` calls across *n* reader
+threads while a writer thread keeps calling `write_tag` with a slow
+database write (1 ms per value, simulated). The *global lock* columns
+emulate the former request/response handshake by serializing every
+request behind a single lock, the *striped* columns are the current
+engine.
+
+Usage:
+
+```
+PYTHONPATH=. python benchmarks/bench_cvt_contention.py [n_tags] [n_reads]
+```
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+from pyhades import PyHades
+from pyhades.tags import CVTEngine
+
+THREADS = (1, 2, 4, 8, 16, 32)
+WRITE_DELAY = 0.001
+
+
+def slow_log_values(values):
+
+    time.sleep(WRITE_DELAY)
+
+
+def run(tag_engine, names:list, n_threads:int, n_reads:int)->tuple:
+
+    stop_event = threading.Event()
+    n_tags = len(names)
+    reads_per_thread = n_reads // n_threads
+    latencies = [0.0] * n_threads
+
+    def reader(index):
+
+        worst = 0.0
+
+        for i in range(reads_per_thread):
+
+            start = time.perf_counter()
+            tag_engine.read_tag(names[i % n_tags])
+            worst = max(worst, time.perf_counter() - start)
+
+        latencies[index] = worst
+
+    def writer():
+
+        count = 0
+
+        while not stop_event.is_set():
+
+            tag_engine.write_tag(names[count % n_tags], float(count))
+            count += 1
+
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(n_threads)]
+    _writer = threading.Thread(target=writer)
+    _writer.start()
+    start = time.perf_counter()
+
+    for thread in readers:
+
+        thread.start()
+
+    for thread in readers:
+
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    _writer.join()
+
+    return reads_per_thread * n_threads / elapsed, max(latencies)
+
+
+def main(n_tags:int=1000, n_reads:int=100000):
+
+    dbfile = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = PyHades()
+    app.set_mode('Development')
+    app.set_db(dbfile=dbfile)
+    app.get_db_manager().init_database()
+    tag_engine = CVTEngine()
+    tag_engine._cvt.logger.log_values = slow_log_values
+
+    names = [f"BENCH-{i}" for i in range(n_tags)]
+
+    for name in names:
+
+        tag_engine.set_tag(name, 'Pa', 'float', 'Benchmark tag', name)
+
+    request = tag_engine.request
+    global_lock = threading.Lock()
+
+    def legacy_request(query):
+
+        with global_lock:
+
+            request(query)
+
+    print(f"{n_tags} tags - {n_reads} reads per run - {WRITE_DELAY * 1000:.0f} ms simulated DB write")
+    print(f"{'threads':>8}{'global lock':>18}{'max latency':>14}{'striped':>18}{'max latency':>14}")
+
+    for n_threads in THREADS:
+
+        tag_engine.request = legacy_request
+        legacy, legacy_latency = run(tag_engine, names, n_threads, n_reads)
+        del tag_engine.request
+        striped, striped_latency = run(tag_engine, names, n_threads, n_reads)
+        print(
+            f"{n_threads:>8}{legacy:>12,.0f} ops/s{legacy_latency * 1000:>11.2f} ms"
+            f"{striped:>12,.0f} ops/s{striped_latency * 1000:>11.2f} ms"
+        )
+
+
+if __name__ == '__main__':
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
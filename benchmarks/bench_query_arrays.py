@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""benchmarks/bench_query_arrays.py
+
+Compares QueryLogger.query_trends (list of {"x", "y"} dicts per tag)
+against QueryLogger.query_trends_arrays (NumPy columns per tag) when
+pulling whole series, reporting wall time and peak allocated memory.
+
+Usage:
+
+```
+PYTHONPATH=. python benchmarks/bench_query_arrays.py [n_rows] [n_tags]
+```
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+from peewee import SqliteDatabase
+from pyhades.dbmodels import proxy, Variables, Units, DataTypes, Tags, TagValue
+from pyhades.logger import DataLoggerEngine, QueryLogger
+
+from bench_tagvalue_index import populate
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def measure(func):
+    # Timed and traced apart, tracemalloc slows down allocations a lot
+    t0 = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - t0
+    del result
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak / 2**20
+
+
+def main(n_rows:int=1000000, n_tags:int=10):
+
+    dbfile = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db = SqliteDatabase(dbfile, pragmas={'journal_mode': 'wal', 'synchronous': 0})
+    proxy.initialize(db)
+    db.create_tables([Variables, Units, DataTypes, Tags, TagValue])
+    DataLoggerEngine().set_db(db)
+
+    start = datetime(2023, 1, 1)
+    stop = start + timedelta(seconds=n_rows // n_tags + 1)
+    populate(n_rows, n_tags, start)
+    tags = [f"BENCH-{i}" for i in range(n_tags)]
+    _start = (start - timedelta(seconds=1)).strftime(DATETIME_FORMAT)
+    _stop = stop.strftime(DATETIME_FORMAT)
+    query = QueryLogger()
+
+    dicts, dicts_time, dicts_memory = measure(lambda: query.query_trends(_start, _stop, *tags))
+    arrays, arrays_time, arrays_memory = measure(lambda: query.query_trends_arrays(_start, _stop, *tags))
+
+    assert sum(len(dicts[tag]['values']) for tag in tags) == n_rows
+    assert sum(len(arrays[tag]['values']) for tag in tags) == n_rows
+
+    print(f"{n_rows} rows - {n_tags} tags")
+    print(f"{'mode':<10}{'time (s)':>12}{'rows/s':>14}{'peak (MiB)':>14}")
+    print(f"{'dicts':<10}{dicts_time:>12.2f}{n_rows / dicts_time:>14.0f}{dicts_memory:>14.1f}")
+    print(f"{'arrays':<10}{arrays_time:>12.2f}{n_rows / arrays_time:>14.0f}{arrays_memory:>14.1f}")
+
+
+if __name__ == '__main__':
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""benchmarks/bench_sqlite_profile.py
+
+Measures TagValue inserts per second on SQLite:
+
+* one autocommit TagValue.create per sample, rollback journal and synchronous FULL
+* one autocommit TagValue.create per sample, default pragmas of set_db
+* one autocommit TagValue.create per sample, 'performance' profile pragmas
+* the 'performance' profile, samples enqueued into the tag writer which inserts
+them in timed transactions, while a reader queries trends on a read-only connection
+
+Usage:
+
+```
+PYTHONPATH=. python benchmarks/bench_sqlite_profile.py [n_samples] [n_batched_samples]
+```
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from peewee import SqliteDatabase
+from pyhades.dbmodels import proxy, use_read_db, Variables, Units, DataTypes, Tags, TagValue
+from pyhades.dbmodels.core import SQLITE_PRAGMAS, SQLITE_PERFORMANCE_PRAGMAS, SQLITE_READ_PRAGMAS
+from pyhades.managers import DBManager
+from pyhades.workers import TagWriterWorker
+
+N_TAGS = 10
+
+
+def setup(dbfile:str, pragmas:dict)->list:
+
+    db = SqliteDatabase(dbfile, pragmas=pragmas)
+    proxy.initialize(db)
+    proxy.set_read_db(None)
+    db.create_tables([Variables, Units, DataTypes, Tags, TagValue])
+    Variables.create(name='Pressure')
+    Units.create(name='Pa', unit='Pa', variable='Pressure')
+    DataTypes.create(name='float')
+
+    for i in range(N_TAGS):
+
+        Tags.create(name=f"BENCH-{i}", unit='Pa', data_type='float', description='Benchmark tag', display_name=f"BENCH-{i}")
+
+    return [tag_id for tag_id, in Tags.select(Tags.id).tuples()]
+
+
+def autocommit(dbfile:str, pragmas:dict, n_samples:int)->float:
+
+    tag_ids = setup(dbfile, pragmas)
+    start = datetime(2023, 1, 1)
+    t0 = time.perf_counter()
+
+    for i in range(n_samples):
+
+        TagValue.create(tag=tag_ids[i % N_TAGS], value=float(i), timestamp=start + timedelta(milliseconds=i))
+
+    elapsed = time.perf_counter() - t0
+    proxy.obj.close()
+
+    return n_samples / elapsed
+
+
+def batched(dbfile:str, n_samples:int)->tuple:
+
+    tag_ids = setup(dbfile, SQLITE_PERFORMANCE_PRAGMAS)
+    proxy.set_read_db(SqliteDatabase(f"file:{dbfile}?mode=ro", uri=True, pragmas=SQLITE_READ_PRAGMAS))
+    manager = DBManager()
+    manager.set_db(proxy.obj)
+    manager.set_queue_size(n_samples)
+    manager.set_flush_size(5000)
+    manager.set_flush_interval(0.5)
+    writer = TagWriterWorker(manager)
+    writer.daemon = True
+    writer.start()
+    done = threading.Event()
+    reads = list()
+
+    def read():
+
+        while not done.is_set():
+
+            t0 = time.perf_counter()
+
+            with use_read_db():
+
+                list(TagValue.select(TagValue.timestamp, TagValue.value).where(TagValue.tag == tag_ids[0]).order_by(TagValue.timestamp.desc()).limit(1000).tuples())
+
+            reads.append(time.perf_counter() - t0)
+            time.sleep(0.01)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    start = datetime(2023, 1, 1)
+    t0 = time.perf_counter()
+
+    for i in range(n_samples):
+
+        writer.put(tag_ids[i % N_TAGS], float(i), start + timedelta(milliseconds=i))
+
+    writer.stop()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    reader.join()
+
+    assert TagValue.select().count() == n_samples
+
+    return n_samples / elapsed, sum(reads) / len(reads) * 1000 if reads else 0.0
+
+
+def main(n_samples:int=2000, n_batched_samples:int=200000):
+
+    directory = tempfile.mkdtemp()
+
+    try:
+
+        results = [
+            ("autocommit, synchronous FULL", autocommit(os.path.join(directory, 'full.db'), {'journal_mode': 'delete', 'synchronous': 2}, n_samples)),
+            ("autocommit, default pragmas", autocommit(os.path.join(directory, 'default.db'), SQLITE_PRAGMAS, n_samples)),
+            ("autocommit, performance profile", autocommit(os.path.join(directory, 'performance.db'), SQLITE_PERFORMANCE_PRAGMAS, n_samples))
+        ]
+        rate, read_latency = batched(os.path.join(directory, 'writer.db'), n_batched_samples)
+        results.append(("performance profile, tag writer", rate))
+
+        print(f"{'mode':<36}{'inserts/s':>12}")
+
+        for mode, rate in results:
+
+            print(f"{mode:<36}{rate:>12.0f}")
+
+        print(f"read-only trend query during writes: {read_latency:.2f} ms")
+
+    finally:
+
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
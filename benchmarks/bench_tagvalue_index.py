@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""benchmarks/bench_tagvalue_index.py
+
+Measures historian query latency on a synthetic TagValue dataset,
+without and with the composite (tag, timestamp) index.
+
+The dataset has *n_tags* tags sampled every second, *n_rows* rows in
+total. Queries mimic QueryLogger: a trend of one tag over a 5 minutes
+window ordered by timestamp, the number of samples of one tag over a 1
+hour window (database cost only, no row conversion) and the current
+value of one tag.
+
+Usage:
+
+```
+PYTHONPATH=. python benchmarks/bench_tagvalue_index.py [n_rows] [n_tags]
+```
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from peewee import SqliteDatabase, fn
+from pyhades.dbmodels import proxy, Variables, Units, DataTypes, Tags, TagValue
+
+BATCH_SIZE = 5000
+REPEAT = 20
+
+
+def populate(n_rows:int, n_tags:int, start:datetime):
+
+    Variables.create(name='Pressure')
+    Units.create(name='Pa', unit='Pa', variable='Pressure')
+    DataTypes.create(name='float')
+    tag_ids = list()
+
+    for i in range(n_tags):
+
+        Tags.create(name=f"BENCH-{i}", unit='Pa', data_type='float', description='Benchmark tag', display_name=f"BENCH-{i}")
+        tag_ids.append(Tags.read_by_name(f"BENCH-{i}").id)
+
+    db = TagValue._meta.database
+    fields = [TagValue.tag, TagValue.value, TagValue.timestamp]
+    batch = list()
+
+    for row in range(n_rows):
+
+        second, tag = divmod(row, n_tags)
+        batch.append((tag_ids[tag], random.random(), start + timedelta(seconds=second)))
+
+        if len(batch) == BATCH_SIZE:
+
+            with db.atomic():
+
+                TagValue.insert_many(batch, fields=fields).execute()
+
+            batch = list()
+
+    if batch:
+
+        with db.atomic():
+
+            TagValue.insert_many(batch, fields=fields).execute()
+
+    return tag_ids
+
+
+def latency(func)->float:
+
+    start = time.perf_counter()
+
+    for _ in range(REPEAT):
+
+        func()
+
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def run_queries(tag_ids:list, start:datetime, stop:datetime)->dict:
+
+    middle = start + (stop - start) / 2
+    tag = tag_ids[len(tag_ids) // 2]
+
+    def trend():
+
+        query = (TagValue
+            .select(TagValue.timestamp, TagValue.value)
+            .where((TagValue.tag == tag) & (TagValue.timestamp.between(middle, middle + timedelta(minutes=5))))
+            .order_by(TagValue.timestamp))
+
+        return list(query.tuples())
+
+    def count():
+
+        query = (TagValue
+            .select(fn.COUNT(TagValue.id))
+            .where((TagValue.tag == tag) & (TagValue.timestamp.between(middle, middle + timedelta(hours=1)))))
+
+        return query.scalar()
+
+    def current():
+
+        query = (TagValue
+            .select(TagValue.value)
+            .where(TagValue.tag == tag)
+            .order_by(TagValue.timestamp.desc())
+            .limit(1))
+
+        return list(query.tuples())
+
+    return {
+        "trend 5 min (ms)": latency(trend),
+        "count 1h (ms)": latency(count),
+        "current value (ms)": latency(current)
+    }
+
+
+def main(n_rows:int=10000000, n_tags:int=100):
+
+    dbfile = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db = SqliteDatabase(dbfile, pragmas={'journal_mode': 'wal', 'synchronous': 0})
+    proxy.initialize(db)
+    db.create_tables([Variables, Units, DataTypes, Tags, TagValue])
+    TagValue.drop_indexes()
+
+    start = datetime(2023, 1, 1)
+    stop = start + timedelta(seconds=n_rows // n_tags)
+
+    t0 = time.perf_counter()
+    tag_ids = populate(n_rows, n_tags, start)
+    print(f"{n_rows} rows - {n_tags} tags - populated in {time.perf_counter() - t0:.1f}s")
+
+    before = run_queries(tag_ids, start, stop)
+
+    t0 = time.perf_counter()
+    TagValue.create_indexes()
+    print(f"(tag, timestamp) index created in {time.perf_counter() - t0:.1f}s")
+
+    after = run_queries(tag_ids, start, stop)
+
+    print(f"{'query':<22}{'no index':>12}{'indexed':>12}")
+
+    for key in before:
+
+        print(f"{key:<22}{before[key]:>12.2f}{after[key]:>12.2f}")
+
+
+if __name__ == '__main__':
+
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
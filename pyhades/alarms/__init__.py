@@ -1,4 +1,5 @@
 from .states import AlarmState, States, Status
 from .trigger import Trigger, TriggerType
 from .alarms import Alarm
+from .journal import AlarmJournal
 
@@ -7,11 +7,10 @@ from datetime import datetime, timedelta
 from pyhades.dbmodels.alarms import AlarmStates
 from .states import AlarmState
 from ..tags import CVTEngine
-from ..dbmodels import AlarmLogging as AlarmModel
-from ..dbmodels import AlarmSummary
 from ..logger import DataLoggerEngine
 from .states import AlarmState, Status
 from .trigger import Trigger, TriggerType
+from .journal import AlarmJournal, NOTIFY
 from ..dbmodels import AlarmsDB, Tags
 
 
@@ -53,6 +52,7 @@ class Alarm:
             'weeks': 0
         }
         self._shelved_until = None
+        self._evaluator = None
         self.__default_operations()
         self._id = None
         if load:
@@ -89,6 +89,14 @@ class Alarm:
             'reset': True
         }
 
+    def __invalidate(self):
+        r"""
+        Reports a change of state, trigger or tag to the batch evaluator of the alarm, if any
+        """
+        if self._evaluator is not None:
+
+            self._evaluator.invalidate(self)
+
     def get_operations(self):
         r"""
         Get alarms operations
@@ -137,6 +145,7 @@ class Alarm:
         alarm = AlarmsDB.read_by_name(self.name)
 
         alarm.set_trigger(alarm_type=self._trigger.type.value, trigger=float(self._trigger.value))
+        self.__invalidate()
         
         return self
 
@@ -158,6 +167,7 @@ class Alarm:
         """
         self._trigger.value = value
         self._trigger.type = _type
+        self.__invalidate()
         alarm = AlarmsDB.read_by_name(self.name)
         if alarm:
             alarm.set_trigger(alarm_type=_type, trigger=float(value))
@@ -254,78 +264,35 @@ class Alarm:
     def state(self, _state):
 
         self._state = _state
-        AlarmModel.create(
-            name=self.name,
-            state=self.state.state,
-            priority=self._priority,
-            value=self._value
-        )
+        self.__invalidate()
 
-        
         if self._state.state==AlarmState.UNACK.state:
 
-            AlarmSummary.create(
-                name=self.name,
-                state=self._state.state
-            )
             self._operations['silence'] = True
             self._operations['sound'] = False
             self.audible = True
 
         elif self._state.state==AlarmState.ACKED.state:
-            
-            _alarm = AlarmSummary.read_by_alarm_id(self._id)
-    
-            if _alarm:
-                
-                _state = AlarmStates.read_by_name(name=self._state.state)
-                AlarmSummary.put(
-                    id=_alarm.id,
-                    state=_state.id,
-                    ack_time=datetime.now()
-                )
-                self._operations['silence'] = False
-                self._operations['sound'] = False
-                self.audible = False
 
-        elif self._state.state==AlarmState.RTNUN.state:
+            self._operations['silence'] = False
+            self._operations['sound'] = False
+            self.audible = False
 
-            _alarm = AlarmSummary.read_by_alarm_id(self._id)
+        elif self._state.state==AlarmState.RTNUN.state:
 
-            if _alarm:
-                _state = AlarmStates.read_by_name(name=self._state.state)
-                AlarmSummary.put(
-                    id=_alarm.id,
-                    state=_state.id,
-                    active=False
-                )
-                self._operations['silence'] = False
-                self._operations['sound'] = False
-                self.audible = False
+            self._operations['silence'] = False
+            self._operations['sound'] = False
+            self.audible = False
 
         elif self._state.state==AlarmState.NORM.state:
 
-            _alarm = AlarmSummary.read_by_alarm_id(self._id)
-
-            if _alarm:
-
-                AlarmSummary.put(
-                    id=_alarm.id,
-                    active=False
-                )
-
             self._operations['disable'] = True
             self._operations['silence'] = False
             self._operations['sound'] = False
             self.audible = False
 
-        sio = self.app.get_socketio()
-
-        if sio is not None:
-            
-            sio.emit("notify_alarm", self.serialize())
-            summary = AlarmSummary.read_lasts(lasts=100)
-            sio.emit("notify_alarm_summary", summary)
+        # Logging, summary and UI notification are done by the alarm journal
+        AlarmJournal().publish(self)
 
     def trigger_alarm(self):
         r"""
@@ -361,6 +328,7 @@ class Alarm:
         """
 
         self._enabled = True
+        self.__invalidate()
         self._operations['disable'] = True
         self._operations['enable'] = False
         self._operations['shelve'] = True
@@ -379,6 +347,7 @@ class Alarm:
         """
 
         self._enabled = False
+        self.__invalidate()
 
         self._operations['disable'] = False
         self._operations['enable'] = True
@@ -435,11 +404,7 @@ class Alarm:
 
             self._operations['sound'] = False
 
-        sio = self.app.get_socketio()
-
-        if sio is not None:
-            
-            sio.emit("notify_alarm", self.serialize())
+        AlarmJournal().publish(self, kind=NOTIFY)
 
     def sound(self):
         r"""
@@ -462,11 +427,7 @@ class Alarm:
 
                 self._operations['silence'] = False
 
-            sio = self.app.get_socketio()
-            
-            if sio is not None:
-                
-                sio.emit("notify_alarm", self.serialize())
+            AlarmJournal().publish(self, kind=NOTIFY)
         
     def reset(self):
         r"""
@@ -502,6 +463,7 @@ class Alarm:
         
         self.state = AlarmState.SHLVD
         self.audible = False
+        self.app.get_alarm_manager().schedule_unshelve(self)
 
         self._operations['acknowledge'] = False
         self._operations['enable'] = False
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""pyhades/alarms/batch.py
+
+This module implements the batch alarm evaluator, which compares
+a snapshot of the CVT with all alarm triggers in a vectorized pass.
+"""
+import math
+import threading
+import numpy as np
+from .trigger import TriggerType
+from .states import Status
+
+NONE = -1
+HIGH = 0
+LOW = 1
+BOOL = 2
+
+KINDS = {
+    TriggerType.HH: HIGH,
+    TriggerType.H: HIGH,
+    TriggerType.LL: LOW,
+    TriggerType.L: LOW,
+    TriggerType.B: BOOL
+}
+
+
+class BatchAlarmEvaluator:
+    r"""
+    Evaluates alarm triggers of many alarms at once.
+
+    Trigger values, trigger kinds and tags of the alarms are kept in NumPy arrays,
+    each pass compares the tag values with all triggers at once and calls *Alarm.update*
+    only for alarms whose condition changed since their last evaluation, or whose state,
+    trigger or tag changed meanwhile, which are reported by the alarms through *invalidate*.
+    The other evaluated alarms only get the latest tag value.
+
+    Alarms in the same state with the same condition would not change in *Alarm.update*,
+    so the alarm states and values are the same as calling *Alarm.update* on every tag change.
+
+    **Parameters**
+
+    * **alarms** (list)[Optional]: Alarm objects
+
+    Usage:
+
+    ```python
+    >>> evaluator = BatchAlarmEvaluator(alarms)
+    >>> evaluator.evaluate({'PT-01': 105.0, 'PT-02': 20.0})
+    ```
+    """
+
+    def __init__(self, alarms:list=None):
+
+        self._lock = threading.Lock()
+        self.set_alarms(alarms or list())
+
+    def set_alarms(self, alarms:list):
+        r"""
+        Builds the trigger arrays of the alarms, every alarm is evaluated on the next pass
+
+        **Parameters**
+
+        * **alarms** (list): Alarm objects
+        """
+        with self._lock:
+
+            for alarm in getattr(self, '_alarms', list()):
+
+                if alarm._evaluator is self:
+
+                    alarm._evaluator = None
+
+            self._alarms = list(alarms)
+            self._positions = {id(alarm): position for position, alarm in enumerate(self._alarms)}
+            self._tags = list(dict.fromkeys(alarm.tag for alarm in self._alarms))
+            tag_positions = {tag: position for position, tag in enumerate(self._tags)}
+            self._alarm_tags = [alarm.tag for alarm in self._alarms]
+            self._tag_index = np.array([tag_positions[tag] for tag in self._alarm_tags], dtype=np.intp)
+            self._triggers = np.full(len(self._alarms), np.nan)
+            self._kinds = np.full(len(self._alarms), NONE, dtype=np.int8)
+            self._conditions = np.zeros(len(self._alarms), dtype=bool)
+            self._dirty = np.ones(len(self._alarms), dtype=bool)
+            self._settable = np.ones(len(self._alarms), dtype=bool)
+            self._stale = False
+
+            for position, alarm in enumerate(self._alarms):
+
+                self.__set_trigger(position, alarm)
+                alarm._evaluator = self
+
+    def get_alarms(self)->list:
+
+        return self._alarms
+
+    def get_tags(self)->list:
+        r"""
+        Returns the tags binded into the evaluated alarms
+        """
+        return self._tags
+
+    def is_stale(self)->bool:
+        r"""
+        Returns True if an alarm tag changed, the arrays must be built again with *set_alarms*
+        """
+        return self._stale
+
+    def __set_trigger(self, position:int, alarm):
+
+        trigger = alarm.get_trigger()
+        kind = KINDS.get(trigger.type, NONE)
+        # Alarm.update does not set the value of disabled alarms out of the acknowledge cycle
+        self._settable[position] = alarm.enabled or alarm.state.acknowledge_status != Status.NA.value
+
+        if kind == NONE or trigger.value is None:
+
+            self._kinds[position] = NONE
+            self._triggers[position] = np.nan
+
+            return
+
+        self._kinds[position] = kind
+        self._triggers[position] = float(trigger.value)
+
+    def invalidate(self, alarm):
+        r"""
+        Marks an alarm to be evaluated on the next pass, its trigger is read again
+
+        **Parameters**
+
+        * **alarm** (Alarm): Alarm whose state, trigger or tag changed
+        """
+        with self._lock:
+
+            position = self._positions.get(id(alarm))
+
+            if position is None:
+
+                return
+
+            if self._tags[self._tag_index[position]] != alarm.tag:
+
+                self._stale = True
+
+            self.__set_trigger(position, alarm)
+            self._dirty[position] = True
+
+    def get_conditions(self, values:dict)->tuple:
+        r"""
+        Compares tag values with all triggers
+
+        **Parameters**
+
+        * **values** (dict): {tag: value}, alarms of missing or non numeric tags are not evaluated
+
+        **Returns**
+
+        * **evaluated, conditions** (tuple): Boolean arrays, alarms evaluated and alarms whose condition holds
+        """
+        tag_values = np.array([self.__to_float(values.get(tag)) for tag in self._tags], dtype=float)
+        x = tag_values[self._tag_index] if len(self._tags) else np.empty(0)
+        kinds = self._kinds
+        triggers = self._triggers
+        evaluated = ~np.isnan(x) & (kinds != NONE)
+        conditions = ((kinds == HIGH) & (x >= triggers)) | ((kinds == LOW) & (x <= triggers)) | ((kinds == BOOL) & (x == triggers))
+
+        return evaluated, conditions
+
+    def evaluate(self, values:dict)->list:
+        r"""
+        Evaluates all alarms in a vectorized pass, *Alarm.update* is called only for alarms whose condition flipped,
+        the value of the other evaluated alarms is set
+
+        **Parameters**
+
+        * **values** (dict): {tag: value} snapshot of the CVT, alarms of missing tags are not evaluated
+
+        **Returns**
+
+        * **alarms** (list): Alarms updated
+        """
+        with self._lock:
+
+            evaluated, conditions = self.get_conditions(values)
+            flipped = evaluated & ((conditions != self._conditions) | self._dirty)
+            positions = np.flatnonzero(flipped)
+            self._conditions[positions] = conditions[positions]
+            self._dirty[positions] = False
+            alarms = [self._alarms[position] for position in positions]
+            unchanged = np.flatnonzero(evaluated & ~flipped & self._settable).tolist()
+            _alarms = self._alarms
+            _tags = self._alarm_tags
+
+        # As Alarm.update does before evaluating the trigger
+        for position in unchanged:
+
+            _alarms[position]._value = values[_tags[position]]
+
+        # State changes invalidate the alarms, the lock is not held
+        for alarm in alarms:
+
+            if alarm.tag in values:
+
+                alarm.update(values[alarm.tag])
+
+        return alarms
+
+    @staticmethod
+    def __to_float(value)->float:
+
+        if value is None:
+
+            return math.nan
+
+        try:
+
+            return float(value)
+
+        except (TypeError, ValueError):
+
+            return math.nan
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""pyhades/alarms/journal.py
+
+This module implements the alarm journal, which persists alarm
+state transitions in bulk and notifies them to the UI.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from peewee import fn
+from .._singleton import Singleton
+from ..dbmodels import proxy, AlarmsDB, AlarmStates, AlarmPriorities, AlarmLogging, AlarmSummary
+from ..utils import log_detailed
+from .states import AlarmState
+
+LOG = 'log'
+TRANSITION = 'transition'
+NOTIFY = 'notify'
+KINDS = (LOG, TRANSITION, NOTIFY)
+
+AlarmEvent = namedtuple('AlarmEvent', ['kind', 'alarm', 'alarm_id', 'name', 'state', 'priority', 'value', 'timestamp'])
+
+
+class AlarmJournal(Singleton):
+    r"""
+    Publishes alarm events into the alarm journal pipeline.
+
+    Alarms publish an event on every state transition, the event is a snapshot of the alarm
+    state, priority and value at the transition. If an *AlarmJournalWorker* is running, events
+    are only enqueued and the worker persists them in bulk and notifies the UI debounced, so
+    alarm evaluation does not wait on the database nor on Socket.IO. Otherwise the event is
+    written and notified right away.
+
+    Event kinds:
+
+    * 'log': an *AlarmLogging* row
+    * 'transition': an *AlarmLogging* row, the *AlarmSummary* update and a UI notification
+    * 'notify': a UI notification only
+
+    Usage:
+
+    ```python
+    >>> from pyhades.alarms import AlarmJournal
+    >>> journal = AlarmJournal()
+    >>> journal.publish(alarm)
+    ```
+    """
+
+    def __init__(self):
+
+        self._worker = None
+
+    def set_worker(self, worker):
+        r"""
+        Sets the worker which persists the journal events, None to persist them synchronously
+
+        **Parameters**
+
+        * **worker** (AlarmJournalWorker)
+        """
+        self._worker = worker
+
+    def get_worker(self):
+
+        return self._worker
+
+    def publish(self, alarm, kind:str=TRANSITION)->AlarmEvent:
+        r"""
+        Publishes an alarm event, it is persisted and notified by the worker if it is running
+
+        **Parameters**
+
+        * **alarm** (Alarm): Alarm object
+        * **kind** (str): 'transition' by default, 'log' or 'notify'
+
+        **Returns**
+
+        * **event** (AlarmEvent)
+        """
+        if kind not in KINDS:
+
+            raise ValueError(f"Alarm event kind must be one of {KINDS}")
+
+        event = AlarmEvent(
+            kind=kind,
+            alarm=alarm,
+            alarm_id=alarm._id,
+            name=alarm.name,
+            state=alarm.state.state,
+            priority=alarm._priority,
+            value=alarm._value,
+            timestamp=datetime.now()
+        )
+
+        worker = self._worker
+
+        if worker is not None and worker.is_alive() and worker.put(event):
+
+            return event
+
+        try:
+
+            if kind != NOTIFY:
+
+                self.write([event])
+
+            self.emit([alarm], summary=kind == TRANSITION)
+
+        except Exception as e:
+            message = f"Alarm Journal: Error persisting {alarm.name} {event.state} event"
+            log_detailed(e, message)
+
+        return event
+
+    def write(self, events:list)->int:
+        r"""
+        Persists a batch of alarm events in a single transaction.
+
+        *AlarmLogging* rows are inserted with a single `insert_many`, *AlarmSummary* changes
+        of the batch are folded per alarm first, so each record is inserted or updated once.
+
+        **Parameters**
+
+        * **events** (list): AlarmEvent objects in publish order, 'notify' events are skipped
+
+        **Returns**
+
+        * **written** (int): *AlarmLogging* rows inserted
+        """
+        events = [event for event in events if event.kind != NOTIFY and event.alarm_id is not None]
+
+        if not events:
+
+            return 0
+
+        alarm_ids = {event.alarm_id for event in events}
+        alarm_ids = {_id for _id, in AlarmsDB.select(AlarmsDB.id).where(AlarmsDB.id.in_(list(alarm_ids))).tuples()}
+        states = {name: _id for _id, name in AlarmStates.select(AlarmStates.id, AlarmStates.name).tuples()}
+        priorities = {value: _id for _id, value in AlarmPriorities.select(AlarmPriorities.id, AlarmPriorities.value).tuples()}
+
+        logs = list()
+        records = list()
+        created = dict()
+        updates = dict()
+
+        for event in events:
+
+            if event.alarm_id not in alarm_ids or event.state not in states:
+
+                continue
+
+            value = self.__to_float(event.value)
+
+            if event.priority in priorities and value is not None:
+
+                logs.append({
+                    'alarm': event.alarm_id,
+                    'state': states[event.state],
+                    'priority': priorities[event.priority],
+                    'value': value,
+                    'timestamp': event.timestamp
+                })
+
+            if event.kind == TRANSITION:
+
+                self.__fold(event, states, records, created, updates)
+
+        with proxy.atomic():
+
+            if logs:
+
+                AlarmLogging.insert_many(logs).execute()
+
+            if updates:
+
+                latests = dict(
+                    AlarmSummary.select(AlarmSummary.alarm, fn.MAX(AlarmSummary.id))
+                    .where(AlarmSummary.alarm.in_(list(updates)))
+                    .group_by(AlarmSummary.alarm)
+                    .tuples()
+                )
+
+                for alarm_id, fields in updates.items():
+
+                    if alarm_id in latests:
+
+                        AlarmSummary.update(**fields).where(AlarmSummary.id == latests[alarm_id]).execute()
+
+            if records:
+
+                # Old records of alarms triggered again are not active anymore
+                AlarmSummary.update(active=False).where(AlarmSummary.alarm.in_(list(created))).execute()
+                AlarmSummary.insert_many(records).execute()
+
+        return len(logs)
+
+    @staticmethod
+    def __fold(event:AlarmEvent, states:dict, records:list, created:dict, updates:dict):
+        r"""
+        Applies the *AlarmSummary* change of a transition on the latest record of the alarm,
+        the one created in the batch if any, otherwise it is updated in the database
+        """
+        state = event.state
+        fields = dict()
+
+        if state == AlarmState.UNACK.state:
+
+            if event.alarm_id in created:
+
+                created[event.alarm_id]['active'] = False
+
+            record = {
+                'alarm': event.alarm_id,
+                'state': states[state],
+                'alarm_time': event.timestamp,
+                'ack_time': None,
+                'active': True
+            }
+            records.append(record)
+            created[event.alarm_id] = record
+
+            return
+
+        if state == AlarmState.ACKED.state:
+
+            fields = {'state': states[state], 'ack_time': event.timestamp}
+
+        elif state == AlarmState.RTNUN.state:
+
+            fields = {'state': states[state], 'active': False}
+
+        elif state == AlarmState.NORM.state:
+
+            fields = {'active': False}
+
+        if not fields:
+
+            return
+
+        if event.alarm_id in created:
+
+            created[event.alarm_id].update(fields)
+
+        else:
+
+            updates.setdefault(event.alarm_id, dict()).update(fields)
+
+    def emit(self, alarms:list, summary:bool=False):
+        r"""
+        Notifies the current state of alarms to the UI, if Socket.IO is defined
+
+        **Parameters**
+
+        * **alarms** (list): Alarm objects
+        * **summary** (bool): If True, the lasts alarm summary records are notified too
+        """
+        from ..core import PyHades
+        sio = PyHades().get_socketio()
+
+        if sio is None:
+
+            return
+
+        for alarm in alarms:
+
+            sio.emit("notify_alarm", alarm.serialize())
+
+        if summary:
+
+            sio.emit("notify_alarm_summary", AlarmSummary.read_lasts(lasts=100))
+
+    @staticmethod
+    def __to_float(value)->float:
+
+        try:
+
+            return float(value)
+
+        except (TypeError, ValueError):
+
+            return None
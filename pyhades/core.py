@@ -7,24 +7,38 @@ import time
 import sys
 import logging
 import concurrent.futures
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
 from .alarms import Alarm, TriggerType
 
 from peewee import SqliteDatabase, MySQLDatabase, PostgresqlDatabase
+from playhouse.pool import PooledSqliteDatabase, PooledMySQLDatabase, PooledPostgresqlDatabase
 
 from .utils import log_detailed, parse_config, env_var_not_defined, check_key_in_dict
 
 from ._singleton import Singleton
 
-from .workers import _ContinuosWorker, StateMachineWorker, LoggerWorker, AlarmWorker
+from .workers import _ContinuosWorker, StateMachineWorker, LoggerWorker, AlarmWorker, TagWriterWorker, ArchiveWorker, RollupWorker, RetentionWorker, AlarmJournalWorker
+
+from .logger import DataLoggerEngine
+
+from .logger.archive import Archive
+
+from .logger.rollup import Rollup, RESOLUTIONS
+
+from .logger.retention import Retention
+
+from .logger.spool import Spool, SEGMENT_SIZE, MAX_SIZE
+
+from .dbmodels import TagValue
 
 from .managers import StateMachineManager, DBManager, AlarmManager
 
 from .tags import CVTEngine
 
-from .dbmodels import SQLITE, POSTGRESQL, MYSQL
+from .dbmodels import SQLITE, POSTGRESQL, MYSQL, PERFORMANCE
+from .dbmodels.core import SQLITE_PRAGMAS, SQLITE_PERFORMANCE_PRAGMAS, SQLITE_READ_PRAGMAS
 # PyHades Status
 
 STARTED = 'Started'
@@ -61,6 +75,14 @@ class PyHades(Singleton):
         self._thread_functions = list()
         self._threads = list()
         self.workers = list()
+        self._writer = None
+        self._journal_worker = None
+        self._archive = None
+        self._archive_age = None
+        self._archive_period = 3600.0
+        self._spool = None
+        self._rollup_settings = None
+        self._retention_settings = None
         self._mode = DEVELOPMENT_MODE
         self._sio = None
         self._create_alarm_worker = False
@@ -365,8 +387,44 @@ class PyHades(Singleton):
                 db_port: ${DB_PORT}
 
             sample_time: ${DB_SAMPLE_TIME}
+            queue_size: 10000
+            flush_size: 500
+            flush_interval: 1.0
+            archive:
+                directory: history
+                age_days: 30
+                period: 3600
+            rollups:
+                resolutions: [60, 3600, 86400]
+                period: 60
+                delay: 60
+            replica:
+                db_host: ${DB_REPLICA_HOST}
+                max_lag: 5
+            retention:
+                days: 365
+                partition: month
+                groups:
+                    1.0: 90
+                tags:
+                    PT-01: 30
+                period: 3600
         ```
 
+        *queue_size*, *flush_size* and *flush_interval* are optional and configure the write-behind
+        worker that persists tag values written in the CVT.
+
+        *archive* is optional, tag values older than *age_days* are moved every *period* seconds
+        to the columnar archive in *directory*, see *set_archive*.
+
+        *rollups* is optional, tag aggregates are maintained at each resolution in seconds, see *set_rollups*.
+
+        *replica* is optional, queries and exports run on the read replica while its replication lag
+        is below *max_lag* seconds, *db_name*, *db_user*, *db_password*, *db_host* and *db_port* default
+        to the primary database ones, in development mode *db_name* is the read-only database file.
+
+        *retention* is optional, tag values older than their retention in days are removed, see *set_retention*.
+
         you can define your file based on environment variables or you can complete the file directly.
         """
         config = parse_config(config_file)
@@ -397,7 +455,7 @@ class PyHades(Singleton):
 
                         db_name = 'app.db'
 
-                    self.set_db(dbtype=SQLITE, dbfile=db_name)
+                    self.set_db(dbtype=SQLITE, dbfile=db_name, profile=db_config.get('profile'), replica=self.__get_replica_config(db_config))
 
                 else:
 
@@ -424,7 +482,13 @@ class PyHades(Singleton):
                         'port': prod_db_config['db_port'],
                         'name': prod_db_config['db_name']
                         }
-                    self.set_db(dbtype=prod_db_config['db_type'], **DATABASE)
+                    self.set_db(
+                        dbtype=prod_db_config['db_type'],
+                        pool=(db_config['pool'] or dict()) if 'pool' in db_config else None,
+                        profile=db_config.get('profile'),
+                        replica=self.__get_replica_config(db_config),
+                        **DATABASE
+                    )
 
                 else:
 
@@ -452,6 +516,87 @@ class PyHades(Singleton):
                 except:
 
                     pass
+
+            for key, setter, _type in (
+                ('queue_size', self._db_manager.set_queue_size, int),
+                ('flush_size', self._db_manager.set_flush_size, int),
+                ('flush_interval', self._db_manager.set_flush_interval, float)
+            ):
+
+                if key in db_config.keys():
+
+                    try:
+
+                        setter(_type(db_config[key]))
+
+                    except:
+
+                        logging.warning(f"Invalid {key} value in db configuration, default value is used")
+
+            if 'archive' in db_config.keys():
+
+                try:
+
+                    archive_config = db_config['archive']
+                    self.set_archive(
+                        archive_config['directory'],
+                        age_days=float(archive_config.get('age_days', 30)),
+                        period=float(archive_config.get('period', 3600)),
+                        compress=bool(archive_config.get('compress', False))
+                    )
+
+                except Exception as e:
+                    message = "Invalid archive configuration in db configuration"
+                    log_detailed(e, message)
+
+            if 'spool' in db_config.keys():
+
+                try:
+
+                    spool_config = db_config['spool']
+                    self.set_spool(
+                        spool_config['directory'],
+                        segment_size=int(spool_config.get('segment_size', SEGMENT_SIZE)),
+                        max_size=int(spool_config.get('max_size', MAX_SIZE)),
+                        retry_interval=float(spool_config.get('retry_interval', 5.0))
+                    )
+
+                except Exception as e:
+                    message = "Invalid spool configuration in db configuration"
+                    log_detailed(e, message)
+
+            if 'rollups' in db_config.keys():
+
+                try:
+
+                    rollups_config = db_config['rollups'] or dict()
+                    self.set_rollups(
+                        resolutions=[int(resolution) for resolution in rollups_config.get('resolutions', RESOLUTIONS)],
+                        period=float(rollups_config.get('period', 60)),
+                        delay=float(rollups_config.get('delay', 60))
+                    )
+
+                except Exception as e:
+                    message = "Invalid rollups configuration in db configuration"
+                    log_detailed(e, message)
+
+            if 'retention' in db_config.keys():
+
+                try:
+
+                    retention_config = db_config['retention'] or dict()
+                    days = retention_config.get('days')
+                    self.set_retention(
+                        days=float(days) if days is not None else None,
+                        tags={name: float(_days) for name, _days in (retention_config.get('tags') or dict()).items()},
+                        groups={float(period): float(_days) for period, _days in (retention_config.get('groups') or dict()).items()},
+                        partition=retention_config.get('partition'),
+                        period=float(retention_config.get('period', 3600))
+                    )
+
+                except Exception as e:
+                    message = "Invalid retention configuration in db configuration"
+                    log_detailed(e, message)
             
             self.set_dbtags(self._engine._cvt._tags, period=period, delay=init_delay)
             self._db_manager.create_tables()
@@ -463,7 +608,7 @@ class PyHades(Singleton):
             self._db_manager.create_tables()
             self.init_db()
 
-    def set_db(self, dbtype:str=SQLITE, drop_table=False, clear_default_tables=False, **kwargs):
+    def set_db(self, dbtype:str=SQLITE, drop_table=False, clear_default_tables=False, pool:dict=None, profile:str=None, replica:dict=None, **kwargs):
         r"""
         Sets the database, it supports SQLite and Postgres,
         in case of SQLite, the filename must be provided.
@@ -475,6 +620,17 @@ class PyHades(Singleton):
         * **dbfile** (str): a path to database file.
         * *drop_table** (bool): If you want to drop table.
         * **cascade** (bool): if there are some table dependency, drop it as well
+        * **pool** (dict)[Optional]: Connection pool settings, not used in development mode.
+            * **max_connections** (int): Max number of open connections, 20 by default
+            * **stale_timeout** (float): Seconds after which a connection is recycled, 300 by default
+            * **timeout** (float): Seconds to wait for a free connection, 10 by default
+        * **profile** (str)[Optional]: SQLite profile, 'performance' sets WAL with synchronous NORMAL, mmap and cache,
+        logs all tag values through the tag writer in timed transactions and runs *QueryLogger* on read-only connections
+        * **replica** (dict)[Optional]: Read database for queries and exports, writes stay on the primary database.
+            * **name**, **user**, **password**, **host**, **port**: Read replica connection, primary values by default.
+            For SQLite a read-only connection is opened on **dbfile**, the primary file by default
+            * **max_lag** (float): Max replication lag in seconds, reads go to the primary database above it
+            * **check_interval** (float): Seconds between two checks of the replica, 5 by default
         * **kwargs**: Same attributes to a postgres connection.
 
         **Returns:** `None`
@@ -483,6 +639,9 @@ class PyHades(Singleton):
 
         ```python
         >>> app.set_db(dbfile="app.db")
+        >>> app.set_db(dbfile="app.db", profile='performance')
+        >>> app.set_db(dbtype='postgresql', name='hades', user='hades', password='hades', host='127.0.0.1', port=5432, pool={'max_connections': 32})
+        >>> app.set_db(dbtype='postgresql', name='hades', user='hades', password='hades', host='10.0.0.1', port=5432, replica={'host': '10.0.0.2', 'max_lag': 5})
         ```
         """
 
@@ -492,48 +651,129 @@ class PyHades(Singleton):
 
             self._db_manager.clear_default_tables()
 
-        if self.get_mode() == DEVELOPMENT_MODE:
+        read_db = None
+        single_writer = False
+
+        if self.get_mode() == DEVELOPMENT_MODE or dbtype.lower() == SQLITE:
 
             dbfile = kwargs.get("dbfile", ":memory:")
+            pragmas = SQLITE_PRAGMAS
 
-            self._db = SqliteDatabase(dbfile, pragmas={
-                'journal_mode': 'wal',
-                'journal_size_limit': 1024,
-                'cache_size': -1024 * 64,  # 64MB
-                'foreign_keys': 1,
-                'ignore_check_constraints': 0,
-                'synchronous': 0}
-            )
+            if profile == PERFORMANCE:
 
-        elif dbtype.lower() == SQLITE:
+                pragmas = SQLITE_PERFORMANCE_PRAGMAS
+                single_writer = True
 
-            dbfile = kwargs.get("dbfile", ":memory:")
+            if (profile == PERFORMANCE or replica is not None) and dbfile != ":memory:":
 
-            self._db = SqliteDatabase(dbfile, pragmas={
-                'journal_mode': 'wal',
-                'journal_size_limit': 1024,
-                'cache_size': -1024 * 64,  # 64MB
-                'foreign_keys': 1,
-                'ignore_check_constraints': 0,
-                'synchronous': 0}
-            )
+                read_dbfile = os.path.abspath((replica or dict()).get('dbfile', dbfile))
+                read_db = SqliteDatabase(f"file:{read_dbfile}?mode=ro", uri=True, pragmas=SQLITE_READ_PRAGMAS)
+
+            if pool is not None and self.get_mode() != DEVELOPMENT_MODE:
+
+                self._db = PooledSqliteDatabase(dbfile, pragmas=pragmas, check_same_thread=False, **self.__get_pool_settings(pool))
+
+            else:
+
+                self._db = SqliteDatabase(dbfile, pragmas=pragmas)
 
         elif dbtype.lower() == MYSQL:
 
             db_name = kwargs['name']
             del kwargs['name']
-            self._db = MySQLDatabase(db_name, **kwargs)
+
+            if pool is not None:
+
+                self._db = PooledMySQLDatabase(db_name, **self.__get_pool_settings(pool), **kwargs)
+
+            else:
+
+                self._db = MySQLDatabase(db_name, **kwargs)
+
+            if replica is not None:
+
+                read_name, read_kwargs = self.__get_replica_settings(replica, db_name, kwargs)
+                read_db = PooledMySQLDatabase(read_name, **self.__get_pool_settings(pool), **read_kwargs) if pool is not None else MySQLDatabase(read_name, **read_kwargs)
 
         elif dbtype.lower() == POSTGRESQL:
 
             db_name = kwargs['name']
             del kwargs['name']
-            self._db = PostgresqlDatabase(db_name, **kwargs)
+
+            if pool is not None:
+
+                self._db = PooledPostgresqlDatabase(db_name, **self.__get_pool_settings(pool), **kwargs)
+
+            else:
+
+                self._db = PostgresqlDatabase(db_name, **kwargs)
+
+            if replica is not None:
+
+                read_name, read_kwargs = self.__get_replica_settings(replica, db_name, kwargs)
+                read_db = PooledPostgresqlDatabase(read_name, **self.__get_pool_settings(pool), **read_kwargs) if pool is not None else PostgresqlDatabase(read_name, **read_kwargs)
 
         proxy.initialize(self._db)
+        replica = replica or dict()
+        proxy.set_read_db(
+            read_db,
+            max_lag=float(replica['max_lag']) if replica.get('max_lag') is not None else None,
+            check_interval=float(replica.get('check_interval', 5.0))
+        )
+        DataLoggerEngine().set_single_writer(single_writer)
         self._db_manager.set_db(self._db)
         self._db_manager.set_dropped(drop_table)
 
+    def __get_replica_config(self, db_config:dict)->dict:
+        r"""
+        Returns the *replica* settings of the db configuration, None if it is not defined
+        """
+        if 'replica' not in db_config:
+
+            return None
+
+        replica_config = db_config['replica'] or dict()
+        keys = {
+            'db_name': 'name',
+            'db_user': 'user',
+            'db_password': 'password',
+            'db_host': 'host',
+            'db_port': 'port',
+            'max_lag': 'max_lag',
+            'check_interval': 'check_interval'
+        }
+        replica = {keys[key]: value for key, value in replica_config.items() if key in keys and value is not None}
+
+        if self.get_mode() == DEVELOPMENT_MODE and 'name' in replica:
+
+            replica['dbfile'] = replica.pop('name')
+
+        return replica
+
+    def __get_replica_settings(self, replica:dict, db_name:str, kwargs:dict)->tuple:
+        r"""
+        Returns the read replica database name and connection attributes, primary values by default
+        """
+        read_kwargs = dict(kwargs)
+
+        for key in ('user', 'password', 'host', 'port'):
+
+            if replica.get(key) is not None:
+
+                read_kwargs[key] = replica[key]
+
+        return replica.get('name', db_name), read_kwargs
+
+    def __get_pool_settings(self, pool:dict)->dict:
+        r"""
+        Returns the connection pool settings with their default values
+        """
+        return {
+            'max_connections': int(pool.get('max_connections', 20)),
+            'stale_timeout': float(pool.get('stale_timeout', 300)),
+            'timeout': float(pool.get('timeout', 10))
+        }
+
     def set_dbtags(self, tags, period=0.5, delay=1.0):
         r"""
         Sets the database tags for logging.
@@ -542,7 +782,7 @@ class PyHades(Singleton):
 
         **Parameters:**
 
-        * **tags** (list): A list of the tags.
+        * **tags** (list): A list of the tag names defined in CVTEngine, or a dict of Tag objects.
 
         **Returns:** `None`
 
@@ -556,7 +796,20 @@ class PyHades(Singleton):
         self._db_manager.set_period(period)
         self._db_manager.set_delay(delay)
 
-        for tag_name, tag_object in tags.items():
+        if isinstance(tags, dict):
+
+            tags = list(tags.values())
+
+        else:
+
+            tags = [self._engine._cvt.get_tag(name) for name in tags]
+
+        for tag_object in tags:
+
+            if tag_object is None:
+                continue
+
+            tag_name = tag_object.name
             unit = tag_object.get_unit()
             data_type = tag_object.get_data_type()
             description = tag_object.get_description()
@@ -565,6 +818,7 @@ class PyHades(Singleton):
             max_value = tag_object.get_max_value()
             tcp_source_address = tag_object.get_tcp_source_address()
             node_namespace = tag_object.get_node_namespace()
+            compression = tag_object.get_compression()
 
             self._db_manager.add_tag(
                 tag_name,
@@ -576,7 +830,8 @@ class PyHades(Singleton):
                 max_value,
                 tcp_source_address,
                 node_namespace,
-                period
+                period,
+                compression
             )
 
     def get_dbtags(self)->list:
@@ -964,7 +1219,7 @@ class PyHades(Singleton):
 
     def init_db(self)->LoggerWorker:
         r"""
-        Initialize Logger Worker
+        Initialize Logger Worker and the write-behind Tag Writer Worker
 
         **Returns**
 
@@ -982,8 +1237,196 @@ class PyHades(Singleton):
             message = "Error on db worker start-up"
             log_detailed(e, message)
 
+        self._start_writer()
+
         return db_worker
 
+    def set_archive(self, directory:str, age_days:float=30, period:float=3600.0, compress:bool=False)->Archive:
+        r"""
+        Defines the columnar archive, tag values older than *age_days* are moved from the database
+        to per-tag, per-day segment files in *directory*. Historian queries read both transparently.
+
+        **Parameters**
+
+        * **directory** (str): Archive directory
+        * **age_days** (float): Age in days of the values to archive
+        * **period** (float): Seconds between two archiving runs
+        * **compress** (bool): If True segments are compressed, otherwise they are memory mapped when read
+
+        **Returns**
+
+        * **archive**: (Archive Object)
+        """
+        self._archive = Archive(directory, compress=compress)
+        self._archive_age = timedelta(days=age_days)
+        self._archive_period = period
+        DataLoggerEngine().set_archive(self._archive)
+
+        return self._archive
+
+    def get_archive(self)->Archive:
+        r"""
+        Returns the columnar archive, None if not defined
+        """
+        return self._archive
+
+    def set_spool(self, directory:str, segment_size:int=SEGMENT_SIZE, max_size:int=MAX_SIZE, retry_interval:float=5.0)->Spool:
+        r"""
+        Defines the store-and-forward spool, tag values which can not be written because the database
+        is unreachable are appended to segment files in *directory* and replayed in order when it is back.
+        It must be called before the app runs.
+
+        **Parameters**
+
+        * **directory** (str): Spool directory
+        * **segment_size** (int): Max size in bytes of a segment file
+        * **max_size** (int): Max size in bytes of the spool, the oldest values are dropped above it
+        * **retry_interval** (float): Seconds between two replay attempts while the database is unreachable
+
+        **Returns**
+
+        * **spool**: (Spool Object)
+        """
+        self._spool = Spool(directory, segment_size=segment_size, max_size=max_size)
+        self._db_manager.set_spool(self._spool)
+        self._db_manager.set_retry_interval(retry_interval)
+
+        return self._spool
+
+    def get_spool(self)->Spool:
+        r"""
+        Returns the store-and-forward spool, None if not defined
+        """
+        return self._spool
+
+    def set_rollups(self, resolutions:list=RESOLUTIONS, period:float=60.0, delay:float=60.0):
+        r"""
+        Enables rollups, min, max, avg, count, first and last of every tag are maintained
+        at each resolution by a rollup worker. Downsampled trend queries read the coarsest
+        rollup fitting the requested resolution instead of raw values.
+
+        **Parameters**
+
+        * **resolutions** (list): Bucket widths in seconds
+        * **period** (float): Seconds between two rollup runs
+        * **delay** (float): Seconds a bucket waits after its end before being computed
+        """
+        self._rollup_settings = {'resolutions': tuple(resolutions), 'period': period, 'delay': delay}
+
+    def set_retention(self, days:float=None, tags:dict=None, groups:dict=None, partition:str=None, period:float=3600.0):
+        r"""
+        Defines how long tag values are kept, a retention worker removes older values every *period* seconds.
+
+        On PostgreSQL, with *partition*, TagValue is created partitioned by range of timestamp
+        and old values are removed by dropping whole partitions. It must be called before the
+        tables are created. Other databases delete old values in small batches.
+
+        **Parameters**
+
+        * **days** (float)[Optional]: Default retention in days, values are kept forever if not given
+        * **tags** (dict)[Optional]: Retention in days per tag name
+        * **groups** (dict)[Optional]: Retention in days per logging period, for all tags logged at that period
+        * **partition** (str)[Optional]: Partition interval, 'day', 'week' or 'month'
+        * **period** (float): Seconds between two retention runs
+
+        Usage:
+
+        ```python
+        >>> app.set_retention(days=365, groups={0.5: 30}, tags={'PT-01': 7}, partition='month')
+        ```
+        """
+        TagValue.set_partitioning(partition)
+        self._retention_settings = {
+            'days': days,
+            'tags': tags,
+            'groups': groups,
+            'period': period
+        }
+
+    def get_writer(self)->TagWriterWorker:
+        r"""
+        Returns the write-behind worker that persists tag values, None if not started
+
+        **Returns**
+
+        * **writer**: (TagWriterWorker Object)
+        """
+        return self._writer
+
+    def _start_writer(self):
+        r"""
+        Starts the write-behind worker if it is not running
+        """
+        if self._writer is not None and self._writer.is_alive():
+
+            return
+
+        try:
+
+            self._writer = TagWriterWorker(self._db_manager)
+            self._writer.daemon = True
+            self._writer.start()
+
+        except Exception as e:
+            message = "Error on tag writer worker start-up"
+            log_detailed(e, message)
+
+    def _stop_writer(self):
+        r"""
+        Stops the write-behind worker, waits until its queue is flushed
+        """
+        if self._writer is None:
+
+            return
+
+        try:
+            self._writer.stop()
+        except Exception as e:
+            message = "Error on tag writer worker stop"
+            log_detailed(e, message)
+
+    def get_journal_worker(self)->AlarmJournalWorker:
+        r"""
+        Returns the worker that persists alarm events, None if not started
+
+        **Returns**
+
+        * **journal_worker**: (AlarmJournalWorker Object)
+        """
+        return self._journal_worker
+
+    def _start_journal(self):
+        r"""
+        Starts the alarm journal worker if it is not running
+        """
+        if self._journal_worker is not None and self._journal_worker.is_alive():
+
+            return
+
+        try:
+
+            self._journal_worker = AlarmJournalWorker()
+            self._journal_worker.daemon = True
+            self._journal_worker.start()
+
+        except Exception as e:
+            message = "Error on alarm journal worker start-up"
+            log_detailed(e, message)
+
+    def _stop_journal(self):
+        r"""
+        Stops the alarm journal worker, waits until its events are persisted
+        """
+        if self._journal_worker is None:
+
+            return
+
+        try:
+            self._journal_worker.stop()
+        except Exception as e:
+            message = "Error on alarm journal worker stop"
+            log_detailed(e, message)
+
     def stop_db(self, db_worker:LoggerWorker):
         r"""
         Stops Database Worker
@@ -999,6 +1442,10 @@ class PyHades(Singleton):
         Starts all workers.
 
         * LoggerWorker
+        * AlarmJournalWorker
+        * ArchiveWorker, if an archive is defined
+        * RollupWorker, if rollups are enabled
+        * RetentionWorker, if a retention is defined
         * AlarmWorker
         * StateMachineWorker
         """
@@ -1008,6 +1455,37 @@ class PyHades(Singleton):
             db_worker = LoggerWorker(self._db_manager)
             db_worker.init_database()
             self.workers.append(db_worker)
+            self._start_writer()
+            self._start_journal()
+
+            if self._archive is not None:
+
+                archive_worker = ArchiveWorker(self._archive, self._archive_age, self._archive_period)
+                self.workers.append(archive_worker)
+
+            if self._rollup_settings is not None:
+
+                rollup = Rollup(
+                    self._db_manager.get_db(),
+                    resolutions=self._rollup_settings['resolutions'],
+                    delay=self._rollup_settings['delay'],
+                    archive=self._archive
+                )
+                DataLoggerEngine().set_rollup(rollup)
+                rollup_worker = RollupWorker(rollup, period=self._rollup_settings['period'])
+                self.workers.append(rollup_worker)
+
+            if self._retention_settings is not None:
+
+                retention = Retention(
+                    self._db_manager.get_db(),
+                    days=self._retention_settings['days'],
+                    tags=self._retention_settings['tags'],
+                    groups=self._retention_settings['groups'],
+                    table=self._db_manager.get_table()
+                )
+                retention_worker = RetentionWorker(retention, period=self._retention_settings['period'])
+                self.workers.append(retention_worker)
 
         if self._create_alarm_worker:
             alarm_manager = self.get_alarm_manager()
@@ -1065,6 +1543,10 @@ class PyHades(Singleton):
         """
         self._stop_threads()
         self._stop_workers()
+        self._stop_journal()
+        DataLoggerEngine().flush_compression()
+        self._stop_writer()
+        DataLoggerEngine().stop()
         logging.info("Manual Shutting down")
         self._status = STOPPED
         sys.exit()
@@ -1,4 +1,4 @@
-from .tags import Tags, TagValue, Variables, Units, DataTypes
+from .tags import Tags, TagValue, Variables, Units, DataTypes, TagRollup, RollupWatermark
 from .alarms import AlarmLogging, AlarmSummary, AlarmStates, AlarmsDB, AlarmPriorities, AlarmTypes
-from .core import POSTGRESQL, SQLITE, MYSQL, proxy, BaseModel
+from .core import POSTGRESQL, SQLITE, MYSQL, PERFORMANCE, CONNECTION_ERRORS, proxy, BaseModel, use_connection, with_connection, use_read_db, with_read_db
 from ..alarms.states import States
\ No newline at end of file
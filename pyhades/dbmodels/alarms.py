@@ -3,6 +3,8 @@ from peewee import *
 from datetime import datetime
 from .tags import Tags
 import requests
+import logging
+import time
 import os
 
 
@@ -18,6 +20,9 @@ except:
 
     EVENT_LOGGER_SERVICE_URL = f"http://{EVENT_LOGGER_SERVICE_HOST}:{EVENT_LOGGER_SERVICE_PORT}"
 
+EVENT_LOGGER_SERVICE_TIMEOUT = (3, 5)
+EVENT_LOGGER_SERVICE_RETRY = 30.0
+
 
 class AlarmTypes(BaseModel):
 
@@ -528,6 +533,8 @@ class AlarmSummary(BaseModel):
     return_to_service_time = DateTimeField(null=True)
     active = BooleanField(default=True)
 
+    _comments_retry_at = 0.0
+
     @classmethod
     def create(cls, name:str, state:str):
         _alarm = AlarmsDB.read_by_name(name=name)
@@ -617,17 +624,43 @@ class AlarmSummary(BaseModel):
         r"""
         Documentation here
         """
+        from pyhades import PyHades
+        alarm_manager = PyHades().get_alarm_manager()
         alarms = cls.select().where(cls.id > cls.select().count() - int(lasts)).order_by(cls.id.desc())
 
-        result = [alarm.serialize() for alarm in alarms]
+        # Records of alarms not defined in the alarm manager anymore can not be serialized
+        result = [alarm.serialize() for alarm in alarms if alarm_manager.get_alarm_by_name(alarm.alarm.name) is not None]
 
         return result
 
     def get_comments(self):
         r"""
-        Documentation here
+        Gets the comments of the alarm summary record from the event logger service.
+
+        Requests time out, once the service fails it is not requested for *EVENT_LOGGER_SERVICE_RETRY* seconds
+        and records are serialized without comments, so summaries of many records are not stalled.
         """
-        comments = requests.get(f"{EVENT_LOGGER_SERVICE_URL}/api/logs/comments/{self.id}", verify=False)
+        cls = type(self)
+
+        if time.monotonic() < cls._comments_retry_at:
+
+            return []
+
+        try:
+
+            comments = requests.get(
+                f"{EVENT_LOGGER_SERVICE_URL}/api/logs/comments/{self.id}",
+                verify=False,
+                timeout=EVENT_LOGGER_SERVICE_TIMEOUT
+            )
+
+        except requests.RequestException:
+
+            cls._comments_retry_at = time.monotonic() + EVENT_LOGGER_SERVICE_RETRY
+            logging.warning(f"Alarm Summary: Event logger service unreachable, comments skipped for {EVENT_LOGGER_SERVICE_RETRY}s")
+
+            return []
+
         if comments:
 
             return comments.json()
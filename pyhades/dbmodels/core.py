@@ -1,11 +1,412 @@
-from peewee import Proxy, Model, Expression
-
-proxy = Proxy()
+import time
+import logging
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from peewee import Proxy, Model, ModelDelete, Expression, PostgresqlDatabase, MySQLDatabase, OperationalError, InterfaceError
+from playhouse.pool import PooledDatabase
 
 SQLITE = 'sqlite'
 MYSQL = 'mysql'
 POSTGRESQL = 'postgresql'
 
+# Errors raised while the database is unreachable, other write errors are caused by the written data
+CONNECTION_ERRORS = (OperationalError, InterfaceError)
+
+# SQLite profiles
+PERFORMANCE = 'performance'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'journal_size_limit': 1024,
+    'cache_size': -1024 * 64,  # 64MB
+    'foreign_keys': 1,
+    'ignore_check_constraints': 0,
+    'synchronous': 0
+}
+SQLITE_PERFORMANCE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'journal_size_limit': 64 * 1024 * 1024,
+    'synchronous': 1,  # NORMAL, fsync on checkpoints only
+    'cache_size': -1024 * 64,  # 64MB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 2,  # MEMORY
+    'wal_autocheckpoint': 1000,
+    'foreign_keys': 1,
+    'ignore_check_constraints': 0
+}
+SQLITE_READ_PRAGMAS = {
+    'query_only': 1,
+    'cache_size': -1024 * 64,  # 64MB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 2
+}
+
+
+class DatabaseRouter(Proxy):
+    r"""
+    Proxy of the models database routing reads to a read database.
+
+    Writes always go to the primary database (*obj*), queries run by a thread
+    inside *use_read_db* go to the read database, a read replica or a read-only
+    connection, if one is set. The read database is checked at most every
+    *check_interval* seconds, reads fall back to the primary database while it
+    is down or its replication lag is above *max_lag*. The database of a block
+    is chosen when the outermost block starts and kept until it ends.
+    """
+    __slots__ = ('_read_obj', '_local', '_max_lag', '_check_interval', '_checked_at', '_healthy', '_lag', '_lock')
+
+    def __init__(self):
+
+        object.__setattr__(self, '_read_obj', None)
+        object.__setattr__(self, '_local', threading.local())
+        object.__setattr__(self, '_max_lag', None)
+        object.__setattr__(self, '_check_interval', 5.0)
+        object.__setattr__(self, '_checked_at', None)
+        object.__setattr__(self, '_healthy', True)
+        object.__setattr__(self, '_lag', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+        super(DatabaseRouter, self).__init__()
+
+    def __setattr__(self, attr, value):
+
+        if attr not in Proxy.__slots__ and attr not in DatabaseRouter.__slots__:
+
+            raise AttributeError('Cannot set attribute on proxy.')
+
+        object.__setattr__(self, attr, value)
+
+    def __getattr__(self, attr):
+
+        database = self.get_database()
+
+        if database is None:
+
+            raise AttributeError('Cannot use uninitialized Proxy.')
+
+        return getattr(database, attr)
+
+    def set_read_db(self, db, max_lag:float=None, check_interval:float=5.0):
+        r"""
+        Sets the database used by reads
+
+        **Parameters**
+
+        * **db** (Database): Read replica or read-only connection, None to read from the primary database
+        * **max_lag** (float)[Optional]: Max replication lag in seconds, not checked if not given
+        * **check_interval** (float): Seconds between two checks of the read database
+        """
+        with self._lock:
+
+            self._read_obj = db
+            self._max_lag = max_lag
+            self._check_interval = check_interval
+            self._checked_at = None
+            self._healthy = True
+            self._lag = None
+
+    def get_read_db(self):
+
+        return self._read_obj
+
+    def get_status(self)->dict:
+        r"""
+        Returns the state of the read database
+
+        **Returns**
+
+        * **status** (dict): {'read_db': bool, 'healthy': bool, 'lag': seconds or None, 'max_lag'}
+        """
+        return {
+            'read_db': self._read_obj is not None,
+            'healthy': self._healthy,
+            'lag': self._lag,
+            'max_lag': self._max_lag
+        }
+
+    def is_reading(self)->bool:
+        r"""
+        Returns True if the current thread is inside *use_read_db*
+        """
+        return getattr(self._local, 'depth', 0) > 0
+
+    def get_database(self):
+        r"""
+        Returns the database used by the current thread
+        """
+        if self.is_reading():
+
+            return self._local.database
+
+        return self.obj
+
+    @contextmanager
+    def reading(self):
+
+        depth = getattr(self._local, 'depth', 0)
+
+        if depth == 0:
+
+            self._local.database = self.__route()
+
+        self._local.depth = depth + 1
+
+        try:
+
+            yield self
+
+        finally:
+
+            self._local.depth -= 1
+
+    def __route(self):
+        r"""
+        Returns the read database if it is usable, the primary database otherwise
+        """
+        read_obj = self._read_obj
+
+        if read_obj is None:
+
+            return self.obj
+
+        now = time.monotonic()
+
+        if self._checked_at is None or now - self._checked_at >= self._check_interval:
+
+            with self._lock:
+
+                if self._checked_at is None or now - self._checked_at >= self._check_interval:
+
+                    self.__check(read_obj)
+                    self._checked_at = time.monotonic()
+
+        return read_obj if self._healthy else self.obj
+
+    def __check(self, read_obj):
+        r"""
+        Measures the replication lag of the read database, it is unhealthy if it can not be reached or lags too much
+        """
+        healthy = self._healthy
+
+        try:
+
+            self._lag = get_replication_lag(read_obj) if self._max_lag is not None else None
+            self._healthy = self._lag is None or self._lag <= self._max_lag
+
+            if not self._healthy:
+
+                reason = f"replication lag {self._lag:.1f}s above {self._max_lag}s"
+
+        except Exception as e:
+
+            self._lag = None
+            self._healthy = False
+            reason = f"unreachable ({e})"
+
+            if not read_obj.is_closed():
+
+                try:
+
+                    read_obj.close()
+
+                except Exception:
+
+                    pass
+
+        if healthy and not self._healthy:
+
+            logging.warning(f"Read database {reason}, reads go to the primary database")
+
+        elif self._healthy and not healthy:
+
+            logging.info("Read database is back, reads go to the read database")
+
+
+def get_replication_lag(db)->float:
+    r"""
+    Returns the replication lag in seconds of a database, 0 if it is not a replica
+
+    **Parameters**
+
+    * **db** (Database): PostgreSQL hot standby, MySQL replica or SQLite read connection
+    """
+    if isinstance(db, PostgresqlDatabase):
+
+        lag, = db.execute_sql(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+        ).fetchone()
+
+        return float(lag)
+
+    if isinstance(db, MySQLDatabase):
+
+        try:
+
+            cursor = db.execute_sql("SHOW REPLICA STATUS")
+
+        except Exception:
+
+            # MySQL before 8.0.22
+            cursor = db.execute_sql("SHOW SLAVE STATUS")
+
+        row = cursor.fetchone()
+
+        if row is None:
+
+            return 0.0
+
+        columns = [column[0] for column in cursor.description]
+        column = 'Seconds_Behind_Source' if 'Seconds_Behind_Source' in columns else 'Seconds_Behind_Master'
+        lag = row[columns.index(column)]
+
+        if lag is None:
+
+            raise ConnectionError("replication is not running")
+
+        return float(lag)
+
+    db.execute_sql("SELECT 1").fetchone()
+
+    return 0.0
+
+
+proxy = DatabaseRouter()
+
+
+@contextmanager
+def use_connection(db=proxy):
+    r"""
+    Uses a connection of the current thread for the duration of the block.
+
+    On a pooled database the connection is taken from the pool if the thread has none,
+    and given back at the end of the block only if it was taken by it, so threads do not
+    keep connections while they are idle. Nested blocks share the connection of the
+    outermost one. Other databases keep their connection per thread.
+
+    **Parameters**
+
+    * **db** (Database | Proxy): Database, the models proxy by default
+
+    Usage:
+
+    ```python
+    >>> with use_connection():
+    ...     TagValue.select().count()
+    ```
+    """
+    if isinstance(db, DatabaseRouter):
+
+        database = db.get_database()
+
+    else:
+
+        database = db.obj if isinstance(db, Proxy) else db
+
+    if not isinstance(database, PooledDatabase):
+
+        yield db
+        return
+
+    opened = db.is_closed()
+
+    if opened:
+
+        db.connect()
+
+    try:
+
+        yield db
+
+    finally:
+
+        if opened and not db.is_closed():
+
+            db.close()
+
+
+def with_connection(func):
+    r"""
+    Decorator running a function, or consuming a generator, inside *use_connection* of the models proxy
+    """
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def generator(*args, **kwargs):
+
+            with use_connection():
+
+                yield from func(*args, **kwargs)
+
+        return generator
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+
+        with use_connection():
+
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def use_read_db():
+    r"""
+    Runs the queries of the current thread on the read database for the duration of the block,
+    with a connection scoped to the block
+
+    Usage:
+
+    ```python
+    >>> with use_read_db():
+    ...     TagValue.select().count()
+    ```
+    """
+    with proxy.reading():
+
+        with use_connection():
+
+            yield proxy
+
+
+def with_read_db(func):
+    r"""
+    Decorator running a function inside *use_read_db*, a generator runs on the read
+    database only while it computes its next item, so the consumer still writes on the primary
+    """
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def generator(*args, **kwargs):
+
+            items = func(*args, **kwargs)
+
+            while True:
+
+                with use_read_db():
+
+                    try:
+
+                        item = next(items)
+
+                    except StopIteration:
+
+                        return
+
+                yield item
+
+        return generator
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+
+        with use_read_db():
+
+            return func(*args, **kwargs)
+
+    return wrapper
+
 
 class BaseModel(Model):
 
@@ -75,7 +476,8 @@ class BaseModel(Model):
         data = list()
         
         try:
-            data = [query.serialize() for query in cls.select()]
+            with use_read_db():
+                data = [query.serialize() for query in cls.select()]
 
             return data
 
@@ -132,6 +534,21 @@ class BaseModel(Model):
 
         return {'message': f"id {id} not exist into database"}
 
+    @classmethod
+    def delete_where(cls, where:Expression)->int:
+        r"""
+        Bulk delete of the records matching a filter, *delete* only deletes a record by its id
+
+        **Parameters**
+
+        * **where:** (Expression) Filter on the records to delete
+
+        **Returns**
+
+        * **int:** Number of deleted records
+        """
+        return ModelDelete(cls).where(where).execute()
+
     @classmethod
     def check_record(cls, id:int)->bool:
         r"""
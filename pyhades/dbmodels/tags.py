@@ -1,13 +1,16 @@
-from peewee import CharField, DateTimeField, FloatField, ForeignKeyField, fn
+from peewee import CharField, DateTimeField, FloatField, ForeignKeyField, IntegerField, fn, PostgresqlDatabase, MySQLDatabase
 from .core import BaseModel
-from datetime import datetime
-import csv
+from datetime import datetime, timedelta
 from tqdm import tqdm
-from io import StringIO
 from io import BytesIO
+import logging
 
 
 DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+TAG_VALUE_INDEX = 'tagvalue_tag_id_timestamp'
+TAG_VALUE_BRIN_INDEX = 'tagvalue_timestamp_brin'
+PARTITION_INTERVALS = ('day', 'week', 'month')
+STREAM_CHUNK_SIZE = 10000
 
 
 class Variables(BaseModel):
@@ -493,7 +496,7 @@ class Tags(BaseModel):
 
     @classmethod
     def read_by_names(cls, names):
-        query = cls.select().where(cls.name in names)
+        query = cls.select().where(cls.name.in_(list(names)))
         return query
 
     @classmethod
@@ -539,211 +542,549 @@ class TagValue(BaseModel):
     value = FloatField()
     timestamp = DateTimeField(default=datetime.now)
 
+    _partition_interval = None
+
+    class Meta:
+        indexes = (
+            (('tag', 'timestamp'), False),
+        )
 
     @classmethod
-    def export_to_csv(cls, start:datetime, end:datetime):
+    def create_table(cls, safe:bool=True, **options):
         r"""
-        Documentation here
+        Creates the table with its (tag, timestamp) index.
+
+        If the table already exists nothing is done, building the index on a large
+        historian table can take a long time and lock writes, so existing databases
+        are migrated on demand with *create_indexes*.
+
+        On PostgreSQL, if a partition interval is set with *set_partitioning*, the table
+        is created partitioned by range of timestamp.
         """
+        if safe and cls.table_exists():
 
-        tag_names_query = cls.select(fn.DISTINCT(cls.tag_id))
-        
-        tag_info = dict()
-        tag_info['timestamp'] = None
-        for tag in tag_names_query:
+            if TAG_VALUE_INDEX not in cls.get_index_names():
 
-            tag_info[tag.tag.name] = None
+                logging.info(f"{cls._meta.table_name} table has no ({TAG_VALUE_INDEX}) index, use TagValue.create_indexes to migrate it")
 
-        del tag_names_query
+            if cls._partition_interval and cls.__is_postgres() and not cls.is_partitioned():
 
-        previous_timestamp = datetime.now().strftime(DATETIME_FORMAT)[:-5]
-        tags = cls.select().where((cls.timestamp >=start) & (cls.timestamp <= end))
-        row = 0
-        with open(f'daq_tag_value_from_{start}_to_{end}.csv', 'w', newline='') as f:
-            
-            for tag in tqdm(tags, desc="Downloading csv", unit="records"):               
+                logging.warning(f"{cls._meta.table_name} table exists and is not partitioned, old values are removed with batched deletes")
 
-                timestamp = tag.timestamp.strftime(DATETIME_FORMAT)[:-5]
-                if previous_timestamp!=timestamp:
-                    
-                    if tag_info:
+            return
 
-                        if row==0:
-                    
-                            dict_writer = csv.DictWriter(f, tag_info.keys(), delimiter=",")
-                            dict_writer.writeheader()
+        if cls._partition_interval and cls.__is_postgres():
 
-                        dict_writer.writerow(tag_info)
-                        row += 1
+            cls.__create_partitioned_table()
 
-                    tag_info = dict()
-                    previous_timestamp = timestamp
-                    tag_info['timestamp'] = timestamp
-                    tag_info[tag.tag.name] = tag.value
+            return
 
-                else:
+        super(TagValue, cls).create_table(safe=safe, **options)
 
-                    tag_info[f'{tag.tag.name}'] = tag.value
+    @classmethod
+    def set_partitioning(cls, interval:str=None):
+        r"""
+        Sets the partition interval used when the table is created, PostgreSQL only
 
+        **Parameters**
+
+        * **interval** (str): 'day', 'week' or 'month', None for a regular table
+        """
+        if interval is not None and interval not in PARTITION_INTERVALS:
+
+            raise ValueError(f"{interval} partition interval is not valid, use one of {PARTITION_INTERVALS}")
+
+        cls._partition_interval = interval
 
-    ##
     @classmethod
-    def get_exported_csv(cls, start:datetime, end:datetime):
+    def get_partitioning(cls)->str:
         r"""
-        Documentation here
+        Returns the partition interval, None if the table is not partitioned
         """
+        return cls._partition_interval
 
-        tag_names_query = cls.select(fn.DISTINCT(cls.tag_id))
-        
-        tag_info = dict()
-        tag_info['timestamp'] = None
-        for tag in tag_names_query:
+    @classmethod
+    def is_partitioned(cls)->bool:
+        r"""
+        Returns True if the table is a PostgreSQL partitioned table
+        """
+        if not cls.__is_postgres():
 
-            tag_info[tag.tag.name] = None
+            return False
 
-        del tag_names_query
+        cursor = cls._meta.database.execute_sql(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            (cls._meta.table_name,)
+        )
 
-        previous_timestamp = datetime.now().strftime(DATETIME_FORMAT)[:-5]
-        tags = cls.select().where((cls.timestamp >=start) & (cls.timestamp <= end))
-        row = 0
-        
-        with StringIO() as f:
-            writer = csv.writer(f)
-            
-            for tag in tqdm(tags, desc="Downloading csv", unit="records"):               
+        return cursor.fetchone() is not None
+
+    @classmethod
+    def get_partitions(cls)->list:
+        r"""
+        Returns the range partitions of the table
 
-                timestamp = tag.timestamp.strftime(DATETIME_FORMAT)[:-5]
-                if previous_timestamp!=timestamp:
+        **Returns**
 
-                    if tag_info:
+        * **partitions** (list): [(name, lower datetime, upper datetime), ...] sorted by lower bound
+        """
+        if not cls.is_partitioned():
 
-                        if row==0:
+            return list()
 
-                            writer.writerow(tag_info.keys())
+        table = cls._meta.table_name
+        cursor = cls._meta.database.execute_sql(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            (table,)
+        )
+        partitions = list()
 
-                        writer.writerow(tag_info.values())
-                        row += 1
+        for name, in cursor.fetchall():
 
-                    tag_info = dict()
-                    previous_timestamp = timestamp
-                    tag_info['timestamp'] = timestamp
-                    tag_info[tag.tag.name] = tag.value
+            suffix = name[len(table) + 2:]
 
-                else:
+            if not name.startswith(f"{table}_p") or not suffix.isdigit():
+
+                continue
+
+            lower = datetime.strptime(suffix, '%Y%m%d')
+            partitions.append((name, lower, cls.__next_bound(lower)))
+
+        return sorted(partitions, key=lambda partition: partition[1])
 
-                    tag_info[f'{tag.tag.name}'] = tag.value
-            
-            return f.getvalue()
-        
-    #########
     @classmethod
-    def export_tags_to_csv(cls, start:datetime, end:datetime, tags:list):
+    def create_partitions(cls, start:datetime, stop:datetime)->list:
         r"""
-        Documentation here
+        Creates the partitions covering [*start*, *stop*], existing partitions are kept
+
+        **Returns**
+
+        * **partitions** (list): Names of the created partitions
         """
-        # Select tags
-        tag_names_query = cls.select(fn.DISTINCT(cls.tag_id))        
-        tag_info = dict()
-        tag_info['timestamp'] = None
-        _query = ""
-        _tags = list()
-        for tag in tag_names_query:
+        if not cls._partition_interval or not cls.is_partitioned():
 
-            if tag.tag.name in tags:
+            return list()
 
-                tag_info[tag.tag.name] = None
-                
-                _tags.append(tag.tag.id)
-            
-        del tag_names_query
+        table = cls._meta.table_name
+        existing = {name for name, _, _ in cls.get_partitions()}
+        lower = cls.__floor_bound(start)
+        created = list()
 
-        _query = f"cls.tag_id.in_(_tags)"
+        while lower <= stop:
 
+            upper = cls.__next_bound(lower)
+            name = f"{table}_p{lower.strftime('%Y%m%d')}"
 
-        previous_timestamp = datetime.now().strftime(DATETIME_FORMAT)[:-5]
+            if name not in existing:
 
-        # Creating query
-        _query += f" & (cls.timestamp >=start) & (cls.timestamp <= end)"
+                cls._meta.database.execute_sql(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{lower.strftime(DATETIME_FORMAT)}') TO ('{upper.strftime(DATETIME_FORMAT)}')"
+                )
+                created.append(name)
 
-        tags = cls.select().where(eval(_query)).order_by(cls.timestamp.asc())
-        row = 0
-        with open(f'daq_tag_value_from_{start}_to_{end}.csv', 'w', newline='') as f:
-            
-            for tag in tqdm(tags, desc="Downloading csv", unit="records"):               
+            lower = upper
+
+        return created
+
+    @classmethod
+    def drop_partitions(cls, before:datetime)->list:
+        r"""
+        Drops the partitions holding only values older than *before*, a cheap alternative to DELETE
+
+        **Returns**
+
+        * **partitions** (list): Names of the dropped partitions
+        """
+        dropped = list()
+
+        for name, _, upper in cls.get_partitions():
+
+            if upper <= before:
+
+                cls._meta.database.execute_sql(f"DROP TABLE IF EXISTS {name}")
+                dropped.append(name)
+
+        return dropped
+
+    @classmethod
+    def __is_postgres(cls)->bool:
+
+        db = cls._meta.database
+
+        return isinstance(getattr(db, 'obj', db), PostgresqlDatabase)
+
+    @classmethod
+    def __floor_bound(cls, timestamp:datetime)->datetime:
+
+        day = datetime(timestamp.year, timestamp.month, timestamp.day)
+
+        if cls._partition_interval == 'week':
+
+            return day - timedelta(days=day.weekday())
+
+        if cls._partition_interval == 'month':
+
+            return day.replace(day=1)
+
+        return day
+
+    @classmethod
+    def __next_bound(cls, lower:datetime)->datetime:
+
+        if cls._partition_interval == 'week':
+
+            return lower + timedelta(days=7)
+
+        if cls._partition_interval == 'month':
+
+            return (lower + timedelta(days=32)).replace(day=1)
+
+        return lower + timedelta(days=1)
+
+    @classmethod
+    def __create_partitioned_table(cls):
+        r"""
+        Creates the table partitioned by range of timestamp, the primary key includes the
+        partition key as required by PostgreSQL. A default partition receives values out of
+        the created ranges.
+        """
+        table = cls._meta.table_name
+        tags = Tags._meta.table_name
+        db = cls._meta.database
+        db.execute_sql(
+            f'CREATE TABLE IF NOT EXISTS "{table}" ('
+            f'"id" BIGSERIAL NOT NULL, '
+            f'"tag_id" INTEGER NOT NULL REFERENCES "{tags}" ("id"), '
+            f'"value" DOUBLE PRECISION NOT NULL, '
+            f'"timestamp" TIMESTAMP NOT NULL, '
+            f'PRIMARY KEY ("id", "timestamp")'
+            f') PARTITION BY RANGE ("timestamp")'
+        )
+        db.execute_sql(f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT')
+        cls.create_indexes()
+        now = datetime.now()
+        cls.create_partitions(now, now + timedelta(days=7))
+
+    @classmethod
+    def get_index_names(cls)->list:
+        r"""
+        Returns the index names defined on the table in database
+        """
+        db = cls._meta.database
+
+        return [index.name for index in db.get_indexes(cls._meta.table_name)]
+
+    @classmethod
+    def create_indexes(cls, profile:str='btree', concurrently:bool=False, since:datetime=None)->list:
+        r"""
+        Creates the indexes used by historian queries on an existing table (opt-in migration).
+
+        **Parameters**
+
+        * **profile** (str): 'btree' creates the composite (tag, timestamp) index, 'brin' creates
+        it plus a BRIN index on timestamp (PostgreSQL only), cheap to build and to keep on
+        append-only tables for time range scans.
+        * **concurrently** (bool): PostgreSQL only, builds the indexes without locking writes,
+        it must not be called inside a transaction.
+        * **since** (datetime)[Optional]: PostgreSQL and SQLite only, creates a partial composite index
+        that only covers rows newer than this timestamp.
+
+        **Returns**
+
+        * **statements** (list): SQL statements executed, empty if the indexes already exist
+
+        Usage:
+
+        ```python
+        >>> TagValue.create_indexes(profile='brin', concurrently=True)
+        ```
+        """
+        db = cls._meta.database
+        db = getattr(db, 'obj', db)
+        is_postgres = isinstance(db, PostgresqlDatabase)
+        is_mysql = isinstance(db, MySQLDatabase)
+        table = cls._meta.table_name
+        existing = cls.get_index_names()
+        statements = list()
+
+        if profile not in ('btree', 'brin'):
+
+            raise ValueError(f"{profile} index profile is not valid, use 'btree' or 'brin'")
+
+        if concurrently and not is_postgres:
+
+            logging.warning("Concurrent index creation is only supported on PostgreSQL, index is created with a lock")
+            concurrently = False
+
+        if since is not None and is_mysql:
+
+            logging.warning("Partial indexes are not supported on MySQL, full index is created")
+            since = None
+
+        create = "CREATE INDEX CONCURRENTLY" if concurrently else "CREATE INDEX"
 
-                timestamp = tag.timestamp.strftime(DATETIME_FORMAT)[:-5]
-                if previous_timestamp!=timestamp:
-                    
-                    if tag_info:
+        if TAG_VALUE_INDEX not in existing:
 
-                        if row==0:
-                    
-                            dict_writer = csv.DictWriter(f, tag_info.keys(), delimiter=",")
-                            dict_writer.writeheader()
+            statement = f'{create} {TAG_VALUE_INDEX} ON {table} (tag_id, timestamp)'
 
-                        dict_writer.writerow(tag_info)
-                        row += 1
+            if since is not None:
 
-                    tag_info = dict()
-                    previous_timestamp = timestamp
-                    tag_info['timestamp'] = timestamp
-                    tag_info[tag.tag.name] = tag.value
+                statement += f" WHERE timestamp >= '{since.strftime(DATETIME_FORMAT)}'"
+
+            statements.append(statement)
+
+        if profile == 'brin':
+
+            if not is_postgres:
+
+                logging.warning("BRIN indexes are only supported on PostgreSQL, btree profile is used")
+
+            elif TAG_VALUE_BRIN_INDEX not in existing:
+
+                statements.append(f'{create} {TAG_VALUE_BRIN_INDEX} ON {table} USING BRIN (timestamp)')
+
+        for statement in statements:
+
+            db.execute_sql(statement)
+
+        return statements
+
+    @classmethod
+    def drop_indexes(cls)->list:
+        r"""
+        Drops the indexes created by *create_indexes*
+
+        **Returns**
+
+        * **statements** (list): SQL statements executed
+        """
+        db = cls._meta.database
+        db = getattr(db, 'obj', db)
+        table = cls._meta.table_name
+        existing = cls.get_index_names()
+        statements = list()
+
+        for index in (TAG_VALUE_INDEX, TAG_VALUE_BRIN_INDEX):
+
+            if index in existing:
+
+                if isinstance(db, MySQLDatabase):
+
+                    statements.append(f'DROP INDEX {index} ON {table}')
 
                 else:
 
-                    tag_info[f'{tag.tag.name}'] = tag.value
+                    statements.append(f'DROP INDEX {index}')
+
+        for statement in statements:
 
+            db.execute_sql(statement)
+
+        return statements
+
+    @classmethod
+    def stream(cls, start:datetime=None, stop:datetime=None, tags:list=None, chunk_size:int=STREAM_CHUNK_SIZE, by_tag:bool=False, include_start:bool=False, include_stop:bool=False):
+        r"""
+        Iterates over logged values in chunks, so memory stays flat whatever the range is.
+
+        Rows are read with keyset pagination on (timestamp, id) of a single `tag IN (...)` query:
+        every chunk is a bounded range scan starting after the last row read, no OFFSET and no
+        server-side cursor is needed, and only one chunk is held in memory.
+
+        Bounds are excluded by default, as in *QueryLogger.query_trends*.
+
+        **Parameters**
+
+        * **start** (datetime)[Optional]: Range start
+        * **stop** (datetime)[Optional]: Range stop
+        * **tags** (list)[Optional]: Tag names, all tags if not given
+        * **chunk_size** (int): Max number of rows per chunk
+        * **by_tag** (bool): If True, tags are streamed one after the other, otherwise
+        chunks are sorted by timestamp across all tags
+        * **include_start** (bool): Rows at *start* are included
+        * **include_stop** (bool): Rows at *stop* are included
+
+        **Returns**
+
+        * **chunks** (generator): Lists of (id, tag_id, timestamp, value) tuples
+
+        Usage:
+
+        ```python
+        >>> for chunk in TagValue.stream(start, stop, tags=['PT-01', 'PT-02']):
+                for _id, tag_id, timestamp, value in chunk:
+                    ...
+        ```
+        """
+        where = list()
+
+        if start:
+
+            where.append(cls.timestamp >= start if include_start else cls.timestamp > start)
+
+        if stop:
+
+            where.append(cls.timestamp <= stop if include_stop else cls.timestamp < stop)
+
+        if tags is not None:
+
+            tag_ids = [tag.id for tag in Tags.read_by_names(tags)]
+
+            if not tag_ids:
+
+                return
+
+        elif by_tag:
+
+            tag_ids = [tag_id for tag_id, in Tags.select(Tags.id).order_by(Tags.id).tuples()]
+
+        else:
+
+            tag_ids = None
+
+        if by_tag:
+
+            for tag_id in tag_ids:
+
+                yield from cls.__paginate(where + [cls.tag == tag_id], chunk_size)
+
+            return
+
+        if tag_ids is not None:
+
+            where.append(cls.tag.in_(tag_ids))
+
+        yield from cls.__paginate(where, chunk_size)
+
+    @classmethod
+    def __paginate(cls, where:list, chunk_size:int):
+        r"""
+        Iterates over the rows matching *where* in (timestamp, id) order with keyset pagination
+        """
+        query = (cls
+            .select(cls.id, cls.tag, cls.timestamp, cls.value)
+            .order_by(cls.timestamp, cls.id)
+            .limit(chunk_size))
+        chunk = cls.__fetch(query.where(*where) if where else query)
+
+        while chunk:
+
+            yield chunk
+
+            if len(chunk) < chunk_size:
+
+                break
+
+            _id, _, timestamp, _ = chunk[-1]
+            after = (cls.timestamp > timestamp) | ((cls.timestamp == timestamp) & (cls.id > _id))
+            chunk = cls.__fetch(query.where(*where, after))
+
+    @classmethod
+    def __fetch(cls, query)->list:
+        r"""
+        Fetches (id, tag_id, timestamp, value) rows from the raw cursor, SQLite timestamps
+        are parsed with *datetime.fromisoformat*, much faster than field conversion
+        """
+        rows = cls._meta.database.execute(query).fetchall()
+
+        if rows and isinstance(rows[0][2], str):
+
+            parse = datetime.fromisoformat
+            rows = [(_id, tag_id, parse(timestamp), value) for _id, tag_id, timestamp, value in rows]
+
+        return rows
+
+
+    @classmethod
+    def export_to_csv(cls, start:datetime, end:datetime):
+        r"""
+        Exports the values of all tags logged between *start* and *end* to
+        'daq_tag_value_from_{start}_to_{end}.csv', one row per tenth of second
+
+        **Returns**
+
+        * **rows** (int): Number of data rows written
+        """
+        return cls.__export(f'daq_tag_value_from_{start}_to_{end}.csv', start, end)
+
+    @classmethod
+    def get_exported_csv(cls, start:datetime, end:datetime):
+        r"""
+        Returns the values of all tags logged between *start* and *end* as a CSV string, one row per tenth of second
+        """
+        return cls.__export(None, start, end)
+
+    @classmethod
+    def export_tags_to_csv(cls, start:datetime, end:datetime, tags:list):
+        r"""
+        Exports the values of *tags* logged between *start* and *end* to
+        'daq_tag_value_from_{start}_to_{end}.csv', one row per tenth of second
+
+        **Returns**
+
+        * **rows** (int): Number of data rows written
+        """
+        return cls.__export(f'daq_tag_value_from_{start}_to_{end}.csv', start, end, tags=tags)
 
     @classmethod
     def get_exported_tags_csv(cls, start:datetime, end:datetime, tags:list):
         r"""
-        Documentation here
+        Returns the values of *tags* logged between *start* and *end* as a CSV string, one row per tenth of second
         """
-        # Select tags
-        tag_names_query = cls.select(fn.DISTINCT(cls.tag_id))        
-        tag_info = dict()
-        tag_info['timestamp'] = None
-        _query = ""
-        _tags = list()
-        for tag in tag_names_query:
+        return cls.__export(None, start, end, tags=tags)
 
-            if tag.tag.name in tags:
+    @classmethod
+    def __export(cls, filename:str, start:datetime, end:datetime, tags:list=None):
+        r"""
+        Exports through the logger export engine, the progress bar is updated once per chunk
+        """
+        from ..logger.export import Exporter
 
-                tag_info[tag.tag.name] = None
-                    
-                _tags.append(tag.tag.id)
-                
-        del tag_names_query
+        exporter = Exporter()
 
-        _query = f"cls.tag_id.in_(_tags)"
+        with tqdm(desc="Downloading csv", unit="records") as bar:
 
+            def progress(done, total):
 
-        previous_timestamp = datetime.now().strftime(DATETIME_FORMAT)[:-5]
+                bar.total = total
+                bar.update(done - bar.n)
 
-        # Creating query
-        _query += f" & (cls.timestamp >=start) & (cls.timestamp <= end)"
+            if filename is None:
 
-        tags = cls.select().where(eval(_query)).order_by(cls.timestamp.asc())
-        
-        with StringIO() as f:
-            writer = csv.writer(f)
-            writer.writerow(tag_info.keys())
+                return exporter.to_string(start, end, tags=tags, progress=progress)
 
-            for tag in tqdm(tags, desc="Downloading csv", unit="records"):               
+            return exporter.to_csv(filename, start, end, tags=tags, progress=progress)
 
-                timestamp = tag.timestamp.strftime(DATETIME_FORMAT)[:-5]
-                if previous_timestamp!=timestamp:
 
-                    if tag_info:
+class TagRollup(BaseModel):
+    r"""
+    Aggregates of a tag over a time bucket, one row per (tag, resolution, bucket).
 
-                        writer.writerow(tag_info.values())
+    *resolution* is the bucket width in seconds and *bucket* the bucket start.
+    """
 
-                    tag_info = dict()
-                    previous_timestamp = timestamp
-                    tag_info['timestamp'] = timestamp
-                    tag_info[tag.tag.name] = tag.value
+    tag = ForeignKeyField(Tags, backref='rollups', on_delete='CASCADE')
+    resolution = IntegerField()
+    bucket = DateTimeField()
+    min = FloatField()
+    max = FloatField()
+    avg = FloatField()
+    count = IntegerField()
+    first = FloatField()
+    last = FloatField()
 
-                else:
-                    tag_info[f'{tag.tag.name}'] = tag.value
-            
-            return f.getvalue()
\ No newline at end of file
+    class Meta:
+        indexes = (
+            (('tag', 'resolution', 'bucket'), True),
+        )
+
+
+class RollupWatermark(BaseModel):
+    r"""
+    Rollup progress per resolution, all buckets before *watermark* are complete.
+    """
+
+    resolution = IntegerField(unique=True)
+    watermark = DateTimeField()
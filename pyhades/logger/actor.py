@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/actor.py
+
+This module implements the DB actor, a single thread which runs
+all the database commands of the data logger engine.
+"""
+import queue
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from datetime import datetime
+
+from ..dbmodels import Tags, use_connection
+from ..utils import log_detailed
+
+WRITE_TAG = 'write_tag'
+WRITE_TAGS = 'write_tags'
+READ_TAG = 'read_tag'
+ACTIONS = (WRITE_TAG, WRITE_TAGS, READ_TAG)
+BATCH_SIZE = 500
+
+Command = namedtuple('Command', ['action', 'parameters', 'future'])
+STOP = object()
+
+
+class DBActor(threading.Thread):
+    r"""
+    Runs the database commands of the data logger engine in its own thread.
+
+    Callers submit typed commands and get a *concurrent.futures.Future* back, so they
+    are never blocked by SQL: writes can be fired and forgotten, reads awaited. The
+    actor uses its own connection and executes commands in order, consecutive
+    *write_tag* and *write_tags* commands are coalesced into a single insert of
+    at most *batch_size* rows, their futures are resolved with True if the rows
+    were written.
+
+    **Parameters**
+
+    * **logger** (DataLogger): Data logger executing the commands
+    * **batch_size** (int): Max rows of a coalesced insert
+    """
+
+    def __init__(self, logger, batch_size:int=BATCH_SIZE):
+
+        super(DBActor, self).__init__(daemon=True)
+
+        self._logger = logger
+        self._batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self._commands = 0
+        self._batches = 0
+        self._written = 0
+        self._failed = 0
+
+    def submit(self, action:str, **parameters)->Future:
+        r"""
+        Enqueues a command, never blocks
+
+        **Parameters**
+
+        * **action** (str): 'write_tag', 'write_tags' or 'read_tag'
+        * **parameters**: Command parameters, *tag* and *value* for 'write_tag', *tags* for 'write_tags', *tag* for 'read_tag'
+
+        **Returns**
+
+        * **future** (Future): Resolved with the command result
+        """
+        if action not in ACTIONS:
+
+            raise ValueError(f"Unknown database command {action}")
+
+        if action == WRITE_TAG and parameters.get('timestamp') is None:
+
+            parameters['timestamp'] = datetime.now()
+
+        future = Future()
+
+        with self._lock:
+
+            if self._stopped:
+
+                raise RuntimeError("DB actor is stopped")
+
+            self._queue.put(Command(action, parameters, future))
+
+        return future
+
+    def get_queue_depth(self)->int:
+        r"""
+        Returns the number of commands waiting to be executed
+        """
+        return self._queue.qsize()
+
+    def get_metrics(self)->dict:
+        r"""
+        Gets DB actor metrics
+
+        **Returns**
+
+        * **metrics** (dict): Queue depth, executed commands, inserts, written and failed rows
+        """
+        return {
+            "queue_depth": self.get_queue_depth(),
+            "commands": self._commands,
+            "batches": self._batches,
+            "written": self._written,
+            "failed": self._failed
+        }
+
+    def is_stopped(self)->bool:
+        r"""
+        Returns True once the actor does not accept commands anymore
+        """
+        return self._stopped
+
+    def stop(self, timeout:float=None):
+        r"""
+        Stops the actor once the commands already submitted are executed
+
+        **Parameters**
+
+        * **timeout** (float)[Optional]: Max time in seconds to wait for the pending commands
+        """
+        with self._lock:
+
+            if not self._stopped:
+
+                self._stopped = True
+                self._queue.put(STOP)
+
+        if self.is_alive() and threading.current_thread() is not self:
+
+            self.join(timeout)
+
+    def __get_commands(self, command:Command)->tuple:
+        r"""
+        Collects the write commands queued after *command* until *batch_size* rows are reached
+
+        **Returns**
+
+        * **writes, next** (tuple): Write commands to coalesce and the command taken out of the queue which
+        stopped the collection, None if there is not
+        """
+        writes = [command]
+        rows = self.__count(command)
+
+        while rows < self._batch_size:
+
+            try:
+
+                _command = self._queue.get_nowait()
+
+            except queue.Empty:
+
+                break
+
+            if _command is STOP or _command.action == READ_TAG:
+
+                return writes, _command
+
+            writes.append(_command)
+            rows += self.__count(_command)
+
+        return writes, None
+
+    def __count(self, command:Command)->int:
+
+        return len(command.parameters['tags']) if command.action == WRITE_TAGS else 1
+
+    def __write(self, writes:list):
+        r"""
+        Writes the rows of several write commands in a single insert
+        """
+        names = {command.parameters['tag'] for command in writes if command.action == WRITE_TAG}
+        tag_ids = {tag.name: tag.id for tag in Tags.read_by_names(list(names))} if names else dict()
+        rows = list()
+        commands = list()
+
+        for command in writes:
+
+            parameters = command.parameters
+
+            if command.action == WRITE_TAGS:
+
+                rows.extend(parameters['tags'])
+                commands.append(command)
+
+            elif parameters['tag'] in tag_ids:
+
+                rows.append({'tag': tag_ids[parameters['tag']], 'value': parameters['value'], 'timestamp': parameters['timestamp']})
+                commands.append(command)
+
+            else:
+
+                self._failed += 1
+                command.future.set_result(False)
+
+        if not rows:
+
+            return
+
+        result = self._logger.write_tags(rows)
+        self._batches += 1
+
+        if result:
+
+            self._written += len(rows)
+
+        else:
+
+            self._failed += len(rows)
+
+        for command in commands:
+
+            command.future.set_result(result)
+
+    def __execute(self, command:Command):
+        r"""
+        Executes a command, write commands queued after it are coalesced
+
+        **Returns**
+
+        * **next** (Command): Command taken out of the queue and not executed yet, None if there is not
+        """
+        commands = list()
+        pending = None
+
+        try:
+
+            if command.action == READ_TAG:
+
+                commands = [command] if command.future.set_running_or_notify_cancel() else list()
+
+            else:
+
+                writes, pending = self.__get_commands(command)
+                commands = [_command for _command in writes if _command.future.set_running_or_notify_cancel()]
+
+            self._commands += len(commands)
+
+            if commands:
+
+                with use_connection():
+
+                    if command.action == READ_TAG:
+
+                        command.future.set_result(self._logger.read_tag(command.parameters['tag']))
+
+                    else:
+
+                        self.__write(commands)
+
+        except Exception as e:
+
+            for _command in commands:
+
+                if not _command.future.done():
+
+                    _command.future.set_exception(e)
+
+            message = "DB Actor: Error executing database command"
+            log_detailed(e, message)
+
+        return pending
+
+    def run(self):
+
+        command = None
+
+        while True:
+
+            if command is None:
+
+                command = self._queue.get()
+
+            if command is STOP:
+
+                break
+
+            command = self.__execute(command)
+
+        logging.info("DB actor shutdown successfully!")
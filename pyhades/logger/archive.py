@@ -0,0 +1,510 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/archive.py
+
+This module implements the cold storage of the historian, TagValue rows
+older than a given age are moved out of the database into immutable
+per-tag, per-day columnar segment files.
+
+Segments are NumPy structured arrays (timestamp epoch microseconds, value),
+saved as .npy files read with memory mapping (zero-copy), or as compressed
+.npz files. A JSON manifest indexes all segments.
+
+Directory layout:
+
+```
+directory/
+    manifest.json
+    <tag_id>/
+        2023-01-01.npy
+        2023-01-02.npy
+```
+"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from peewee import fn
+
+from ..dbmodels import Tags, TagValue
+from .columnar import fetch_series
+from .dialect import to_epoch_us, from_epoch_us
+
+SEGMENT_DTYPE = np.dtype([('timestamp', '<i8'), ('value', '<f8')])
+MANIFEST = 'manifest.json'
+DAY = timedelta(days=1)
+
+
+class Archive:
+    r"""
+    Columnar cold storage for TagValue series.
+
+    **Parameters**
+
+    * **directory** (str): Archive root directory, created if it does not exist
+    * **compress** (bool): If True new segments are compressed .npz files, otherwise
+    .npy files read with memory mapping
+
+    Usage:
+
+    ```python
+    >>> archive = Archive('history')
+    >>> archive.archive(db, before=datetime.now() - timedelta(days=30))
+    864000
+    >>> archive.read([1, 2], start_us, stop_us)
+    {1: (epoch_us int64 array, values float64 array), 2: (...)}
+    ```
+    """
+
+    def __init__(self, directory:str, compress:bool=False):
+
+        self._directory = directory
+        self._compress = compress
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments = self.__load_manifest()
+
+    def get_directory(self)->str:
+
+        return self._directory
+
+    def get_segments(self, tag_id:int, start_us:int=None, stop_us:int=None)->list:
+        r"""
+        Returns the manifest entries of a tag overlapping [*start_us*, *stop_us*], sorted by day
+
+        **Returns**
+
+        * **segments** (list): [{'day', 'file', 'start', 'stop', 'count', 'min', 'max'}, ...]
+        """
+        with self._lock:
+
+            segments = dict(self._segments.get(str(tag_id), dict()))
+
+        result = list()
+
+        for day in sorted(segments):
+
+            segment = segments[day]
+
+            if start_us is not None and segment['stop'] < start_us:
+
+                continue
+
+            if stop_us is not None and segment['start'] > stop_us:
+
+                continue
+
+            result.append(dict(segment, day=day))
+
+        return result
+
+    def get_oldest(self)->int:
+        r"""
+        Returns the oldest archived timestamp in epoch microseconds, None if the archive is empty
+        """
+        with self._lock:
+
+            starts = [segment['start'] for segments in self._segments.values() for segment in segments.values()]
+
+        return min(starts) if starts else None
+
+    def read(self, tag_ids:list, start_us:int, stop_us:int, include_start:bool=True, include_stop:bool=False)->dict:
+        r"""
+        Reads archived series in a range.
+
+        Memory mapped segments are sliced without copy, a tag spanning several
+        segments is concatenated.
+
+        **Parameters**
+
+        * **tag_ids** (list): Tag ids
+        * **start_us** (int): Range start in epoch microseconds
+        * **stop_us** (int): Range stop in epoch microseconds
+        * **include_start** (bool): Rows at *start_us* are included
+        * **include_stop** (bool): Rows at *stop_us* are included
+
+        **Returns**
+
+        * **series** (dict): {tag_id: (epoch_us int64 array, values float64 array)}, only tags with archived values in the range
+        """
+        result = dict()
+
+        for tag_id in tag_ids:
+
+            timestamps = list()
+            values = list()
+
+            for segment in self.get_segments(tag_id, start_us, stop_us):
+
+                data = self.__load_segment(segment['file'])
+                x = data['timestamp']
+                lo, hi = self.__slice(x, start_us, stop_us, include_start, include_stop)
+
+                if hi > lo:
+
+                    timestamps.append(x[lo:hi])
+                    values.append(data['value'][lo:hi])
+
+            if len(timestamps) == 1:
+
+                result[tag_id] = (timestamps[0], values[0])
+
+            elif timestamps:
+
+                result[tag_id] = (np.concatenate(timestamps), np.concatenate(values))
+
+        return result
+
+    def count(self, tag_ids:list, start_us:int=None, stop_us:int=None, include_start:bool=True, include_stop:bool=False)->int:
+        r"""
+        Counts archived values in a range, segments are sliced but not copied
+
+        **Parameters**
+
+        * **tag_ids** (list): Tag ids
+        * **start_us** (int)[Optional]: Range start in epoch microseconds
+        * **stop_us** (int)[Optional]: Range stop in epoch microseconds
+        * **include_start** (bool): Rows at *start_us* are included
+        * **include_stop** (bool): Rows at *stop_us* are included
+
+        **Returns**
+
+        * **count** (int): Number of archived values
+        """
+        count = 0
+
+        for tag_id in tag_ids:
+
+            for segment in self.get_segments(tag_id, start_us, stop_us):
+
+                x = self.__load_segment(segment['file'])['timestamp']
+                lo, hi = self.__slice(x, start_us, stop_us, include_start, include_stop)
+                count += max(hi - lo, 0)
+
+        return count
+
+    def read_last(self, tag_id:int, stop_us:int=None, include_stop:bool=True)->tuple:
+        r"""
+        Reads the last archived value of a tag before *stop_us*, only the segments from
+        the newest one backwards are read until a value is found
+
+        **Parameters**
+
+        * **tag_id** (int): Tag id
+        * **stop_us** (int)[Optional]: Range stop in epoch microseconds, the last archived value if not given
+        * **include_stop** (bool): A value at *stop_us* is returned
+
+        **Returns**
+
+        * **sample** (tuple): (epoch us, value), None if there is not
+        """
+        for segment in reversed(self.get_segments(tag_id, None, stop_us)):
+
+            data = self.__load_segment(segment['file'])
+            _, hi = self.__slice(data['timestamp'], None, stop_us, True, include_stop)
+
+            if hi > 0:
+
+                return int(data['timestamp'][hi - 1]), float(data['value'][hi - 1])
+
+        return None
+
+    def get_tag_ids(self, start_us:int=None, stop_us:int=None)->list:
+        r"""
+        Returns the ids of the tags with segments overlapping [*start_us*, *stop_us*], sorted
+        """
+        with self._lock:
+
+            tag_ids = [int(tag_id) for tag_id in self._segments]
+
+        return sorted(tag_id for tag_id in tag_ids if self.get_segments(tag_id, start_us, stop_us))
+
+    def stream(self, tag_ids:list, start_us:int=None, stop_us:int=None, chunk_size:int=10000, include_start:bool=True, include_stop:bool=False):
+        r"""
+        Iterates over archived values in chunks sorted by timestamp across tags, like *TagValue.stream*.
+
+        Segments are read one day at a time, so memory is bounded by the values of a day.
+
+        **Parameters**
+
+        * **tag_ids** (list): Tag ids
+        * **start_us** (int)[Optional]: Range start in epoch microseconds
+        * **stop_us** (int)[Optional]: Range stop in epoch microseconds
+        * **chunk_size** (int): Max number of rows per chunk
+        * **include_start** (bool): Rows at *start_us* are included
+        * **include_stop** (bool): Rows at *stop_us* are included
+
+        **Returns**
+
+        * **chunks** (generator): Lists of (None, tag_id, timestamp, value) tuples, archived values have no id
+        """
+        days = dict()
+
+        for tag_id in tag_ids:
+
+            for segment in self.get_segments(tag_id, start_us, stop_us):
+
+                days.setdefault(segment['day'], list()).append((tag_id, segment['file']))
+
+        for day in sorted(days):
+
+            tags = list()
+            timestamps = list()
+            values = list()
+
+            for tag_id, filename in days[day]:
+
+                data = self.__load_segment(filename)
+                lo, hi = self.__slice(data['timestamp'], start_us, stop_us, include_start, include_stop)
+
+                if hi > lo:
+
+                    tags.append(np.full(hi - lo, tag_id, dtype=np.int64))
+                    timestamps.append(data['timestamp'][lo:hi])
+                    values.append(data['value'][lo:hi])
+
+            if not tags:
+
+                continue
+
+            tags = np.concatenate(tags)
+            timestamps = np.concatenate(timestamps)
+            values = np.concatenate(values)
+            order = np.lexsort((tags, timestamps))
+
+            for start in range(0, len(order), chunk_size):
+
+                rows = order[start:start + chunk_size]
+
+                yield [
+                    (None, tag_id, from_epoch_us(timestamp), value)
+                    for tag_id, timestamp, value in zip(tags[rows].tolist(), timestamps[rows].tolist(), values[rows].tolist())
+                ]
+
+    @staticmethod
+    def __slice(x:np.ndarray, start_us:int, stop_us:int, include_start:bool, include_stop:bool)->tuple:
+        r"""
+        Returns the (lo, hi) positions of the sorted timestamps *x* in a range, bounds not given are open
+        """
+        lo = 0 if start_us is None else np.searchsorted(x, start_us, side='left' if include_start else 'right')
+        hi = len(x) if stop_us is None else np.searchsorted(x, stop_us, side='right' if include_stop else 'left')
+
+        return int(lo), int(hi)
+
+    def write_segment(self, tag_id:int, day:str, timestamps:np.ndarray, values:np.ndarray):
+        r"""
+        Writes the segment of a tag for a day, values already archived that day are merged,
+        duplicated (timestamp, value) samples are kept once
+
+        **Parameters**
+
+        * **tag_id** (int): Tag id
+        * **day** (str): Day as 'YYYY-MM-DD'
+        * **timestamps** (np.ndarray): Epoch microseconds
+        * **values** (np.ndarray): Values
+        """
+        data = np.empty(len(timestamps), dtype=SEGMENT_DTYPE)
+        data['timestamp'] = timestamps
+        data['value'] = values
+
+        with self._lock:
+
+            segments = self._segments.setdefault(str(tag_id), dict())
+
+            if day in segments:
+
+                data = np.concatenate((np.array(self.__load_segment(segments[day]['file'])), data))
+
+            # Sorted by (timestamp, value)
+            data = np.unique(data)
+
+            folder = os.path.join(self._directory, str(tag_id))
+            os.makedirs(folder, exist_ok=True)
+            filename = os.path.join(str(tag_id), f"{day}.npz" if self._compress else f"{day}.npy")
+            path = os.path.join(self._directory, filename)
+            temp = f"{path}.tmp"
+
+            with open(temp, 'wb') as f:
+
+                if self._compress:
+
+                    np.savez_compressed(f, data=data)
+
+                else:
+
+                    np.save(f, data)
+
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(temp, path)
+
+            if day in segments and segments[day]['file'] != filename:
+
+                os.remove(os.path.join(self._directory, segments[day]['file']))
+
+            segments[day] = {
+                'file': filename,
+                'start': int(data['timestamp'][0]),
+                'stop': int(data['timestamp'][-1]),
+                'count': len(data),
+                'min': float(data['value'].min()),
+                'max': float(data['value'].max())
+            }
+            self.__save_manifest()
+
+    def archive(self, db, before:datetime)->int:
+        r"""
+        Moves TagValue rows older than the day of *before* into segments, one day and one tag at a time.
+
+        Rows are deleted from the database only after their segment and the manifest are on disk,
+        if the process stops in between they are merged again on the next run.
+
+        **Parameters**
+
+        * **db** (Database | Proxy): Database to archive from
+        * **before** (datetime): Only whole days before this datetime are archived
+
+        **Returns**
+
+        * **rows** (int): Number of archived rows
+        """
+        cutoff = datetime(before.year, before.month, before.day)
+        query = (TagValue
+            .select(TagValue.tag, fn.MIN(TagValue.timestamp))
+            .where(TagValue.timestamp < cutoff)
+            .group_by(TagValue.tag)
+            .tuples())
+        archived = 0
+
+        for tag_id, oldest in list(query):
+
+            if isinstance(oldest, str):
+
+                oldest = datetime.fromisoformat(oldest)
+
+            day = datetime(oldest.year, oldest.month, oldest.day)
+
+            while day < cutoff:
+
+                where = (TagValue.tag == tag_id) & (TagValue.timestamp >= day) & (TagValue.timestamp < day + DAY)
+                timestamps, values = fetch_series(db, [tag_id], where)[tag_id]
+
+                if len(timestamps):
+
+                    self.write_segment(tag_id, day.strftime('%Y-%m-%d'), timestamps, values)
+
+                    with db.atomic():
+
+                        TagValue.delete_where(where)
+
+                    archived += len(timestamps)
+
+                day += DAY
+
+        if archived:
+
+            logging.info(f"{archived} tag values archived in {self._directory}")
+
+        return archived
+
+    def __load_segment(self, filename:str)->np.ndarray:
+
+        path = os.path.join(self._directory, filename)
+
+        if filename.endswith('.npz'):
+
+            with np.load(path) as data:
+
+                return data['data']
+
+        return np.load(path, mmap_mode='r')
+
+    def __load_manifest(self)->dict:
+
+        path = os.path.join(self._directory, MANIFEST)
+
+        if not os.path.exists(path):
+
+            return dict()
+
+        with open(path) as f:
+
+            return json.load(f)['segments']
+
+    def __save_manifest(self):
+
+        path = os.path.join(self._directory, MANIFEST)
+        temp = f"{path}.tmp"
+
+        with open(temp, 'w') as f:
+
+            json.dump({'version': 1, 'segments': self._segments}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp, path)
+
+
+def merge_series(cold:dict, hot:dict)->dict:
+    r"""
+    Prepends archived series to database series, archived days are always older than database rows
+
+    **Parameters**
+
+    * **cold** (dict): {tag_id: (epoch_us array, values array)} read from the archive
+    * **hot** (dict): {tag_id: (epoch_us array, values array)} read from the database
+    """
+    result = dict(hot)
+
+    for tag_id, (x, y) in cold.items():
+
+        if tag_id in hot and len(hot[tag_id][0]):
+
+            result[tag_id] = (np.concatenate((x, hot[tag_id][0])), np.concatenate((y, hot[tag_id][1])))
+
+        else:
+
+            result[tag_id] = (x, y)
+
+    return result
+
+
+def stream_rows(archive, start:datetime=None, stop:datetime=None, tags:list=None, chunk_size:int=10000, include_start:bool=False, include_stop:bool=False):
+    r"""
+    Iterates over tag values in chunks sorted by timestamp, archived days first, then database rows,
+    as *TagValue.stream* does for database rows only
+
+    **Parameters**
+
+    * **archive** (Archive): Columnar archive, None to read the database only
+    * **start** (datetime)[Optional]: Range start
+    * **stop** (datetime)[Optional]: Range stop
+    * **tags** (list)[Optional]: Tag names, all tags if not given
+    * **chunk_size** (int): Max number of rows per chunk
+    * **include_start** (bool): Rows at *start* are included
+    * **include_stop** (bool): Rows at *stop* are included
+
+    **Returns**
+
+    * **chunks** (generator): Lists of (id, tag_id, timestamp, value) tuples, id is None for archived values
+    """
+    if archive is not None:
+
+        start_us = to_epoch_us(start) if start else None
+        stop_us = to_epoch_us(stop) if stop else None
+
+        if tags is None:
+
+            tag_ids = archive.get_tag_ids(start_us, stop_us)
+
+        else:
+
+            tag_ids = [tag.id for tag in Tags.read_by_names(tags)]
+
+        yield from archive.stream(tag_ids, start_us, stop_us, chunk_size, include_start, include_stop)
+
+    yield from TagValue.stream(start, stop, tags=tags, chunk_size=chunk_size, include_start=include_start, include_stop=include_stop)
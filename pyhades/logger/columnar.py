@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/columnar.py
+
+This module implements columnar reads of TagValue series,
+rows are copied straight from the database cursor into NumPy
+buffers, no model instance nor dict is created per row.
+"""
+import numpy as np
+from peewee import fn
+
+from ..dbmodels import TagValue
+from .dialect import epoch_us
+
+FETCH_SIZE = 10000
+
+
+def fetch_series(db, tag_ids:list, where, fetch_size:int=FETCH_SIZE)->dict:
+    r"""
+    Reads TagValue series as NumPy arrays.
+
+    Rows are counted per tag first, so buffers are preallocated, then the
+    cursor is consumed with *fetchmany* and each chunk is copied into the
+    buffers of its tags.
+
+    **Parameters**
+
+    * **db** (Database | Proxy): Database to read from
+    * **tag_ids** (list): Tag ids
+    * **where** (Expression): Filter on TagValue rows, must restrict rows to *tag_ids*
+    * **fetch_size** (int): Number of rows fetched from the cursor at once
+
+    **Returns**
+
+    * **series** (dict): {tag_id: (epoch_us int64 array, values float64 array)}, sorted by timestamp
+    """
+    counts = (TagValue
+        .select(TagValue.tag, fn.COUNT(TagValue.id))
+        .where(where)
+        .group_by(TagValue.tag)
+        .tuples())
+    sizes = {tag_id: 0 for tag_id in tag_ids}
+    sizes.update(dict(counts))
+    buffers = {
+        tag_id: (np.empty(size, dtype=np.int64), np.empty(size, dtype=np.float64))
+        for tag_id, size in sizes.items()
+    }
+    filled = {tag_id: 0 for tag_id in tag_ids}
+
+    query = (TagValue
+        .select(TagValue.tag, epoch_us(db, TagValue.timestamp), TagValue.value)
+        .where(where)
+        .order_by(TagValue.tag, TagValue.timestamp))
+    cursor = db.execute(query)
+
+    try:
+
+        while True:
+
+            rows = cursor.fetchmany(fetch_size)
+
+            if not rows:
+
+                break
+
+            tags, timestamps, values = zip(*rows)
+            tags = np.asarray(tags)
+            timestamps = np.asarray(timestamps, dtype=np.int64)
+            values = np.asarray(values, dtype=np.float64)
+            # Rows are sorted by tag, so each tag is a contiguous slice of the chunk
+            bounds = np.flatnonzero(tags[1:] != tags[:-1]) + 1
+            starts = np.concatenate(([0], bounds))
+            ends = np.concatenate((bounds, [len(tags)]))
+
+            for start, end in zip(starts.tolist(), ends.tolist()):
+
+                tag_id = tags[start].item()
+                x, y = buffers[tag_id]
+                offset = filled[tag_id]
+                size = offset + end - start
+
+                if size > len(x):
+                    # Rows inserted between the count and the read
+                    x = np.resize(x, size)
+                    y = np.resize(y, size)
+                    buffers[tag_id] = (x, y)
+
+                x[offset:size] = timestamps[start:end]
+                y[offset:size] = values[start:end]
+                filled[tag_id] = size
+
+    finally:
+
+        cursor.close()
+
+    return {tag_id: (x[:filled[tag_id]], y[:filled[tag_id]]) for tag_id, (x, y) in buffers.items()}
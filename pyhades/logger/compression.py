@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/compression.py
+
+This module implements historian compression, tag values are filtered
+before being logged so only the samples needed to rebuild the signal
+within a given deviation are inserted in TagValue.
+
+* **deadband**: a value is logged when it moves more than the deviation away
+from the last logged value, the signal is rebuilt as a step (sample and hold).
+* **swinging_door**: a value is logged when the previous values can no longer
+be joined to the last logged one by a straight line within the deviation,
+the signal is rebuilt by linear interpolation.
+
+The deviation is absolute, or a percent of the tag span (max_value - min_value).
+A max time heartbeat logs flat tags at least once every *max_time* seconds.
+"""
+import threading
+from datetime import datetime
+import numpy as np
+
+DEADBAND = 'deadband'
+SWINGING_DOOR = 'swinging_door'
+METHODS = (DEADBAND, SWINGING_DOOR)
+STEP = 'step'
+LINEAR = 'linear'
+
+
+class Compressor:
+    r"""
+    Compression state of a tag.
+
+    **Parameters**
+
+    * **method** (str): 'deadband' or 'swinging_door'
+    * **deviation** (float): Allowed deviation, in engineering units or in percent of *span*
+    * **percent** (bool): If True *deviation* is a percent of *span*
+    * **span** (float)[Optional]: Tag span, required by percent deviations
+    * **max_time** (float)[Optional]: Max seconds between two logged values
+
+    Usage:
+
+    ```python
+    >>> compressor = Compressor(DEADBAND, deviation=0.5, max_time=600)
+    >>> compressor.add(datetime.now(), 10.0)
+    [(datetime.datetime(2023, 1, 1, 0, 0), 10.0)]
+    >>> compressor.add(datetime.now(), 10.2)
+    []
+    ```
+    """
+
+    def __init__(self, method:str=DEADBAND, deviation:float=0.0, percent:bool=False, span:float=None, max_time:float=None):
+
+        if method not in METHODS:
+
+            raise ValueError(f"Compression method must be one of {METHODS}, not {method}")
+
+        if percent:
+
+            if not span:
+
+                raise ValueError("A tag span is required by a percent deviation")
+
+            deviation = abs(span) * deviation / 100.0
+
+        self._method = method
+        self._deviation = abs(float(deviation))
+        self._max_time = max_time
+        self._lock = threading.Lock()
+        self._received = 0
+        self._logged = 0
+        # Last logged sample, last received sample not logged yet
+        self._archived = None
+        self._snapshot = None
+        # Swinging door slopes
+        self._lower = None
+        self._upper = None
+
+    def get_method(self)->str:
+
+        return self._method
+
+    def get_deviation(self)->float:
+
+        return self._deviation
+
+    def get_interpolation(self)->str:
+        r"""
+        Returns how logged values are rebuilt, 'linear' for swinging door, 'step' otherwise
+        """
+        if self._method == SWINGING_DOOR:
+
+            return LINEAR
+
+        return STEP
+
+    def get_stats(self)->dict:
+        r"""
+        Returns compression counters
+
+        **Returns**
+
+        * **stats** (dict): {'method', 'deviation', 'received', 'logged', 'ratio'}, ratio is received / logged
+        """
+        with self._lock:
+
+            received = self._received
+            logged = self._logged
+
+        return {
+            'method': self._method,
+            'deviation': self._deviation,
+            'received': received,
+            'logged': logged,
+            'ratio': received / logged if logged else None
+        }
+
+    def add(self, timestamp:datetime, value)->list:
+        r"""
+        Adds a sample
+
+        **Parameters**
+
+        * **timestamp** (datetime): Sample timestamp
+        * **value** (float, int, bool, str): Sample value
+
+        **Returns**
+
+        * **samples** (list): [(timestamp, value), ...] samples to log, oldest first
+        """
+        with self._lock:
+
+            self._received += 1
+            result = self.__add(timestamp, value)
+            self._logged += len(result)
+
+        return result
+
+    def flush(self)->list:
+        r"""
+        Returns the last received sample if it is not logged yet, so a stopped logger does not lose the signal end
+
+        **Returns**
+
+        * **samples** (list): [(timestamp, value)] or []
+        """
+        with self._lock:
+
+            if self._snapshot is None:
+
+                return list()
+
+            result = [self.__on_door(*self._snapshot)]
+            self.__archive(*result[0])
+            self._logged += 1
+
+        return result
+
+    def __add(self, timestamp:datetime, value)->list:
+
+        archived = self._archived
+
+        if archived is None:
+
+            self.__archive(timestamp, value)
+
+            return [(timestamp, value)]
+
+        if timestamp <= archived[0]:
+
+            return list()
+
+        try:
+
+            _value = float(value)
+
+        except (TypeError, ValueError):
+
+            _value = None
+
+        # Values which are not numbers are logged on change
+        if _value is None or isinstance(value, bool):
+
+            if value != archived[1] or self.__heartbeat(timestamp):
+
+                self.__archive(timestamp, value)
+
+                return [(timestamp, value)]
+
+            return list()
+
+        if self._method == DEADBAND:
+
+            if abs(_value - archived[1]) > self._deviation or self.__heartbeat(timestamp):
+
+                self.__archive(timestamp, value)
+
+                return [(timestamp, value)]
+
+            self._snapshot = (timestamp, value)
+
+            return list()
+
+        result = list()
+
+        if not self.__door_open(timestamp, _value):
+
+            # The previous sample is the end of the last line within the deviation
+            result.append(self.__on_door(*self._snapshot))
+            self.__archive(*result[-1])
+            self.__door_open(timestamp, _value)
+
+        if self.__heartbeat(timestamp):
+
+            result.append(self.__on_door(timestamp, value))
+            self.__archive(*result[-1])
+
+        else:
+
+            self._snapshot = (timestamp, value)
+
+        return result
+
+    def __door_open(self, timestamp:datetime, value:float)->bool:
+        r"""
+        Narrows the door of the last logged sample with a new sample, returns False when the door is closed
+        """
+        archived_timestamp, archived_value = self._archived
+        dt = (timestamp - archived_timestamp).total_seconds()
+        lower = (value - self._deviation - archived_value) / dt
+        upper = (value + self._deviation - archived_value) / dt
+
+        if self._lower is not None:
+
+            lower = max(lower, self._lower)
+            upper = min(upper, self._upper)
+
+        if lower > upper:
+
+            return False
+
+        self._lower = lower
+        self._upper = upper
+
+        return True
+
+    def __on_door(self, timestamp:datetime, value)->tuple:
+        r"""
+        Moves a sample into the door of the last logged sample, so the line joining them
+        stays within the deviation of all the samples in between
+        """
+        if self._lower is None or self._method != SWINGING_DOOR:
+
+            return timestamp, value
+
+        archived_timestamp, archived_value = self._archived
+        dt = (timestamp - archived_timestamp).total_seconds()
+        slope = (value - archived_value) / dt
+
+        if self._lower <= slope <= self._upper:
+
+            return timestamp, value
+
+        return timestamp, archived_value + min(max(slope, self._lower), self._upper) * dt
+
+    def __heartbeat(self, timestamp:datetime)->bool:
+
+        if self._max_time is None:
+
+            return False
+
+        return (timestamp - self._archived[0]).total_seconds() >= self._max_time
+
+    def __archive(self, timestamp:datetime, value):
+
+        self._archived = (timestamp, float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value)
+        self._snapshot = None
+        self._lower = None
+        self._upper = None
+
+
+def interpolate(x:np.ndarray, y:np.ndarray, at:np.ndarray, method:str=STEP)->np.ndarray:
+    r"""
+    Rebuilds a compressed series at given instants
+
+    **Parameters**
+
+    * **x** (np.ndarray): Logged timestamps, sorted
+    * **y** (np.ndarray): Logged values
+    * **at** (np.ndarray): Instants to evaluate, same unit as *x*
+    * **method** (str): 'step' holds the last logged value, 'linear' joins logged values by lines
+
+    **Returns**
+
+    * **values** (np.ndarray): Values at *at*, NaN where the signal is unknown
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    at = np.asarray(at)
+    result = np.full(len(at), np.nan)
+
+    if not len(x):
+
+        return result
+
+    if method == LINEAR:
+
+        inside = (at >= x[0]) & (at <= x[-1])
+        result[inside] = np.interp(at[inside], x, y)
+
+        return result
+
+    index = np.searchsorted(x, at, side='right') - 1
+    known = index >= 0
+    result[known] = y[index[known]]
+
+    return result
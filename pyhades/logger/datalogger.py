@@ -12,13 +12,15 @@ from ..dbmodels import (
     AlarmStates, 
     Variables, 
     Units,
-    DataTypes)
+    DataTypes,
+    CONNECTION_ERRORS)
 
 from ..alarms.trigger import TriggerType
 import json, os
 from ..src import get_directory
 from ..alarms.states import AlarmState
 import logging
+from datetime import datetime
 
 
 class DataLogger:
@@ -39,6 +41,7 @@ class DataLogger:
     def __init__(self):
 
         self._db = None
+        self._spool = None
 
     def set_db(self, db):
 
@@ -48,6 +51,14 @@ class DataLogger:
         
         return self._db
 
+    def set_spool(self, spool):
+
+        self._spool = spool
+
+    def get_spool(self):
+
+        return self._spool
+
     def set_tag(
         self, 
         tag, 
@@ -159,23 +170,45 @@ class DataLogger:
         self._db.drop_tables(tables, safe=True)
 
     def write_tag(self, tag, value):
+        timestamp = datetime.now()
+        trend = None
         try:
             trend = Tags.read_by_name(tag)
-            tag_value = TagValue.create(tag=trend, value=value)
+            tag_value = TagValue.create(tag=trend, value=value, timestamp=timestamp)
             tag_value.save()
         except Exception as e:
             logging.warning(f"Rollback done in database due to conflicts writing tag")
-            conn = self._db.connection()
-            conn.rollback()
+            self.__rollback()
 
-    def write_tags(self, tags:list):
+            # Values rejected because of their data would never be replayed
+            if self._spool is not None and trend is not None and isinstance(e, CONNECTION_ERRORS):
+
+                self._spool.append([(trend.id, value, timestamp)])
+
+    def write_tags(self, tags:list)->bool:
 
         try:
             TagValue.insert_many(tags).execute()
+            return True
         except Exception as e:
             logging.warning(f"Rollback done in database due to conflicts writing tags")
+            self.__rollback()
+
+            if self._spool is not None and isinstance(e, CONNECTION_ERRORS):
+
+                self._spool.append([(tag['tag'], tag['value'], tag.get('timestamp')) for tag in tags])
+
+            return False
+
+    def __rollback(self):
+        r"""
+        Rolls back the current transaction, the database may be unreachable
+        """
+        try:
             conn = self._db.connection()
             conn.rollback()
+        except Exception as e:
+            logging.warning(f"Database unreachable, rollback not done")
 
     def read_tag(self, tag):
         try:
@@ -183,12 +216,18 @@ class DataLogger:
             trend = query.where(Tags.name == tag).get()
             
             period = trend.period
-            values = trend.values.select()
-            
-            result = dict()
+            t0 = None
+            values = list()
 
-            t0 = values[0].timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            values = [value.value for value in values]
+            for chunk in TagValue.stream(tags=[tag], by_tag=True):
+
+                if t0 is None:
+
+                    t0 = chunk[0][2].strftime('%Y-%m-%d %H:%M:%S')
+
+                values.extend(value for _, _, _, value in chunk)
+
+            result = dict()
 
             result["t0"] = t0
             result["dt"] = period
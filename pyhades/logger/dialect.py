@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/dialect.py
+
+This module implements database dialect helpers, SQL expressions
+that differ between SQLite, PostgreSQL and MySQL.
+
+Naive timestamps are converted to epoch microseconds as if they were UTC,
+the same convention is used to convert datetimes in python (*to_epoch_us*),
+so both sides always agree whatever the database time zone is.
+"""
+from datetime import datetime, timedelta
+from peewee import fn, SQL, Expression, PostgresqlDatabase, MySQLDatabase
+from ..dbmodels import SQLITE, POSTGRESQL, MYSQL
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def get_dialect(db)->str:
+    r"""
+    Returns the dialect name of a database object
+
+    **Parameters**
+
+    * **db** (Database | Proxy): SQLite, PostgreSQL or MySQL peewee database
+
+    **Returns**
+
+    * **dialect** (str): 'sqlite', 'postgresql' or 'mysql'
+    """
+    db = getattr(db, 'obj', db)
+
+    if isinstance(db, PostgresqlDatabase):
+
+        return POSTGRESQL
+
+    if isinstance(db, MySQLDatabase):
+
+        return MYSQL
+
+    return SQLITE
+
+
+def to_epoch_us(timestamp:datetime)->int:
+    r"""
+    Converts a naive datetime to epoch microseconds
+    """
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def to_epoch_ms(timestamp:datetime)->int:
+    r"""
+    Converts a naive datetime to epoch milliseconds, UTC as *to_epoch_us*
+    """
+    return to_epoch_us(timestamp) // 1000
+
+
+def from_epoch_us(epoch_us:int)->datetime:
+    r"""
+    Converts epoch microseconds to a naive datetime
+    """
+    return EPOCH + timedelta(microseconds=int(epoch_us))
+
+
+def epoch_us(db, column):
+    r"""
+    Returns an SQL expression converting a timestamp column to epoch microseconds (integer)
+
+    **Parameters**
+
+    * **db** (Database | Proxy): Database the expression is executed on
+    * **column** (Field): DateTimeField
+    """
+    dialect = get_dialect(db)
+
+    if dialect == POSTGRESQL:
+
+        return (fn.date_part('epoch', column).coerce(False) * 1000000).cast('BIGINT')
+
+    if dialect == MYSQL:
+
+        return fn.TIMESTAMPDIFF(SQL('MICROSECOND'), '1970-01-01 00:00:00', column).coerce(False)
+
+    # SQLite stores 'YYYY-MM-DD HH:MM:SS[.ffffff]' strings, seconds and microseconds are parsed apart
+    seconds = fn.strftime('%s', column).coerce(False).cast('INTEGER')
+    microseconds = fn.substr(column, 21, 6).coerce(False).cast('INTEGER')
+
+    return seconds * 1000000 + microseconds
+
+
+def integer_division(db, lhs, rhs):
+    r"""
+    Returns an SQL expression for the integer division of two integer expressions
+    """
+    if get_dialect(db) == MYSQL:
+
+        return Expression(lhs, 'DIV', rhs)
+
+    return lhs / rhs
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/downsampling.py
+
+This module implements trend downsampling, to bound the number of
+points returned by historian queries whatever the queried time range is.
+
+Two methods are supported:
+
+* **buckets**: the range is split in *max_points* time buckets, min, max,
+avg and count of each bucket are computed in SQL.
+* **lttb**: Largest-Triangle-Three-Buckets, keeps the *max_points* raw points
+that best preserve the visual shape of the series, computed with NumPy.
+"""
+from itertools import groupby
+from operator import itemgetter
+from datetime import datetime
+import numpy as np
+from peewee import fn
+
+from ..dbmodels import TagValue
+from .dialect import epoch_us, integer_division, to_epoch_us
+from .columnar import fetch_series
+from .archive import merge_series
+
+BUCKETS = 'buckets'
+LTTB = 'lttb'
+
+
+def lttb(x:np.ndarray, y:np.ndarray, n_out:int)->np.ndarray:
+    r"""
+    Largest-Triangle-Three-Buckets downsampling.
+
+    **Parameters**
+
+    * **x** (np.ndarray): Sorted x values
+    * **y** (np.ndarray): y values
+    * **n_out** (int): Number of points to keep
+
+    **Returns**
+
+    * **indexes** (np.ndarray): Indexes of the selected points, first and last points are always kept
+    """
+    n = len(x)
+
+    if n_out >= n or n_out < 3:
+
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    x = x - x[0]
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    indexes = np.empty(n_out, dtype=np.int64)
+    indexes[0] = 0
+    indexes[-1] = n - 1
+    selected = 0
+
+    for i in range(n_out - 2):
+
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        cx = x[next_start:next_end].mean()
+        cy = y[next_start:next_end].mean()
+        ax = x[selected]
+        ay = y[selected]
+        areas = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        selected = start + int(np.argmax(areas))
+        indexes[i + 1] = selected
+
+    return indexes
+
+
+def bucketize(x:np.ndarray, y:np.ndarray, start_us:int, width:int)->list:
+    r"""
+    Computes min, max, avg and count per time bucket of a sorted series with NumPy,
+    same output as *Downsampler.buckets* for one tag
+    """
+    if not len(x):
+
+        return list()
+
+    buckets = (np.asarray(x) - start_us) // width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(buckets)])
+    y = np.asarray(y)
+    sums = np.add.reduceat(y, starts)
+
+    return list(zip(
+        (start_us + buckets[starts] * width).tolist(),
+        np.minimum.reduceat(y, starts).tolist(),
+        np.maximum.reduceat(y, starts).tolist(),
+        (sums / counts).tolist(),
+        counts.tolist()
+    ))
+
+
+def merge_buckets(*series:list)->list:
+    r"""
+    Merges bucket lists of the same tag and bucket width, buckets found in several lists are combined
+    """
+    merged = dict()
+
+    for rows in series:
+
+        for start, _min, _max, avg, count in rows:
+
+            if start in merged:
+
+                __min, __max, _avg, _count = merged[start]
+                total = _count + count
+                merged[start] = (min(__min, _min), max(__max, _max), (_avg * _count + avg * count) / total, total)
+
+            else:
+
+                merged[start] = (_min, _max, avg, count)
+
+    return [(start, *merged[start]) for start in sorted(merged)]
+
+
+class Downsampler:
+    r"""
+    Dialect-aware trend downsampling engine for TagValue series.
+
+    **Parameters**
+
+    * **db** (Database | Proxy): SQLite, PostgreSQL or MySQL database
+    * **archive** (Archive)[Optional]: Cold storage read along with the database
+    * **rollup** (Rollup)[Optional]: Rollups used by *buckets* when their resolution fits the bucket width
+
+    Usage:
+
+    ```python
+    >>> downsampler = Downsampler(db)
+    >>> downsampler.buckets([1, 2], start, stop, max_points=1000)
+    {1: [(epoch_us, min, max, avg, count), ...], 2: [...]}
+    ```
+    """
+
+    def __init__(self, db, archive=None, rollup=None):
+
+        self._db = db
+        self._archive = archive
+        self._rollup = rollup
+
+    @staticmethod
+    def get_bucket_width(start:datetime, stop:datetime, max_points:int)->int:
+        r"""
+        Returns the bucket width in microseconds so the range holds at most *max_points* buckets
+        """
+        span = max(to_epoch_us(stop) - to_epoch_us(start), 1)
+
+        return max(-(-span // max(int(max_points), 1)), 1)
+
+    def _range(self, tag_ids:list, start:datetime, stop:datetime):
+
+        return (
+            (TagValue.tag.in_(list(tag_ids))) &
+            (TagValue.timestamp >= start) &
+            (TagValue.timestamp < stop)
+        )
+
+    def buckets(self, tag_ids:list, start:datetime, stop:datetime, max_points:int)->dict:
+        r"""
+        Computes min, max, avg and count per time bucket in SQL.
+
+        If rollups are defined, the coarsest complete rollup not wider than the bucket
+        width is read instead of raw values, raw values are only aggregated at the range edges
+        not covered by rollup buckets. Rollup buckets are assigned to the bucket they start in.
+
+        **Parameters**
+
+        * **tag_ids** (list): Tag ids
+        * **start** (datetime): Range start (included)
+        * **stop** (datetime): Range stop (excluded)
+        * **max_points** (int): Max number of buckets per tag
+
+        **Returns**
+
+        * **buckets** (dict): {tag_id: [(bucket_start_epoch_us, min, max, avg, count), ...]}, empty buckets are omitted
+        """
+        start_us = to_epoch_us(start)
+        width = self.get_bucket_width(start, stop, max_points)
+        route = self._rollup.route(start, stop, width) if self._rollup is not None else None
+
+        if route is None:
+
+            return self._buckets(tag_ids, start, stop, start_us, width)
+
+        resolution, _start, _stop = route
+        head = self._buckets(tag_ids, start, _start, start_us, width)
+        tail = self._buckets(tag_ids, _stop, stop, start_us, width)
+        body = self._rollup.read(tag_ids, _start, _stop, resolution, start_us, width)
+
+        return {tag_id: merge_buckets(head[tag_id], body.get(tag_id, list()), tail[tag_id]) for tag_id in tag_ids}
+
+    def _buckets(self, tag_ids:list, start:datetime, stop:datetime, origin_us:int, width:int)->dict:
+        r"""
+        Computes buckets of *width* microseconds from *origin_us* in [*start*, *stop*) from raw values
+        """
+        result = {tag_id: list() for tag_id in tag_ids}
+
+        if start >= stop:
+
+            return result
+
+        bucket = integer_division(self._db, epoch_us(self._db, TagValue.timestamp) - origin_us, width)
+
+        query = (TagValue
+            .select(
+                TagValue.tag,
+                bucket.alias('bucket'),
+                fn.MIN(TagValue.value),
+                fn.MAX(TagValue.value),
+                fn.AVG(TagValue.value),
+                fn.COUNT(TagValue.id))
+            .where(self._range(tag_ids, start, stop))
+            .group_by(TagValue.tag, bucket)
+            .order_by(TagValue.tag, bucket)
+            .tuples())
+
+        for tag_id, rows in groupby(query, key=itemgetter(0)):
+
+            result[tag_id] = [
+                (origin_us + int(_bucket) * width, _min, _max, float(_avg), _count)
+                for _, _bucket, _min, _max, _avg, _count in rows
+            ]
+
+        if self._archive is not None:
+
+            for tag_id, (x, y) in self._archive.read(tag_ids, to_epoch_us(start), to_epoch_us(stop)).items():
+
+                result[tag_id] = merge_buckets(bucketize(x, y, origin_us, width), result[tag_id])
+
+        return result
+
+    def raw(self, tag_ids:list, start:datetime, stop:datetime)->dict:
+        r"""
+        Fetches raw series as NumPy arrays, timestamps are converted to epoch microseconds in SQL.
+
+        **Returns**
+
+        * **series** (dict): {tag_id: (epoch_us int64 array, values float64 array)}
+        """
+        series = fetch_series(self._db, tag_ids, self._range(tag_ids, start, stop))
+
+        if self._archive is not None:
+
+            series = merge_series(self._archive.read(tag_ids, to_epoch_us(start), to_epoch_us(stop)), series)
+
+        return series
+
+    def lttb(self, tag_ids:list, start:datetime, stop:datetime, max_points:int)->dict:
+        r"""
+        Selects at most *max_points* raw points per tag with LTTB.
+
+        **Returns**
+
+        * **series** (dict): {tag_id: (epoch_us int64 array, values float64 array)}
+        """
+        result = dict()
+
+        for tag_id, (x, y) in self.raw(tag_ids, start, stop).items():
+
+            indexes = lttb(x, y, max_points)
+            result[tag_id] = (x[indexes], y[indexes])
+
+        return result
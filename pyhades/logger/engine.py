@@ -2,11 +2,15 @@
 """pyhades/logger/engine.py
 
 This module implements a singleton layer above the DataLogger class,
-in a thread-safe mode.
+in a thread-safe mode, database commands are run by a DB actor thread.
 """
 
 import threading
+from concurrent.futures import Future
+from datetime import datetime
 from .datalogger import DataLogger
+from .compression import Compressor
+from .actor import DBActor, WRITE_TAG, WRITE_TAGS, READ_TAG, BATCH_SIZE
 from .._singleton import Singleton
 
 
@@ -22,13 +26,16 @@ class DataLoggerEngine(Singleton):
 
         self._logger = DataLogger()
         self._logging_tags = list()
+        self._writer = None
+        self._archive = None
+        self._rollup = None
+        self._sampled_tags = frozenset()
+        self._compressors = dict()
+        self._single_writer = False
 
-        self._request_lock = threading.Lock()
-        self._response_lock = threading.Lock()
-
-        self._response = None
-
-        self._response_lock.acquire()
+        self._batch_size = BATCH_SIZE
+        self._actor = None
+        self._actor_lock = threading.Lock()
 
     def set_db(self, db):
         r"""
@@ -48,6 +55,254 @@ class DataLoggerEngine(Singleton):
         """
         return self._logger.get_db()
 
+    def set_spool(self, spool):
+        r"""
+        Registers the store-and-forward spool, tag values which can not be written in the database are appended to it
+
+        **Parameters**
+
+        * **spool** (Spool): Disk spool, None to drop values on database errors
+        """
+        self._logger.set_spool(spool)
+
+    def get_spool(self):
+        r"""
+        Returns the registered spool, None if not defined
+        """
+        return self._logger.get_spool()
+
+    def set_writer(self, writer):
+        r"""
+        Registers the write-behind worker used by *log_values*
+
+        **Parameters**
+
+        * **writer** (TagWriterWorker): Running writer worker, None to write through the DB actor
+        """
+        self._writer = writer
+
+    def get_writer(self):
+        r"""
+        Returns the registered write-behind worker, None if not defined
+        """
+        return self._writer
+
+    def set_single_writer(self, single_writer:bool):
+        r"""
+        If True, values logged by the period samplers are written by the write-behind worker too,
+        so all tag values are inserted by a single connection in timed transactions
+
+        **Parameters**
+
+        * **single_writer** (bool): Single writer flag
+        """
+        self._single_writer = single_writer
+
+    def get_single_writer(self)->bool:
+
+        return self._single_writer
+
+    def set_archive(self, archive):
+        r"""
+        Registers the cold storage read by historian queries along with the database
+
+        **Parameters**
+
+        * **archive** (Archive): Columnar archive, None to read the database only
+        """
+        self._archive = archive
+
+    def get_archive(self):
+        r"""
+        Returns the registered cold storage, None if not defined
+        """
+        return self._archive
+
+    def set_rollup(self, rollup):
+        r"""
+        Registers the rollups used by downsampled historian queries
+
+        **Parameters**
+
+        * **rollup** (Rollup): Rollups, None to aggregate raw values only
+        """
+        self._rollup = rollup
+
+    def get_rollup(self):
+        r"""
+        Returns the registered rollups, None if not defined
+        """
+        return self._rollup
+
+    def add_sampled_tags(self, tag_ids:list):
+        r"""
+        Registers tags logged periodically by a sampler, their CVT writes are no longer logged by *log_values*
+
+        **Parameters**
+
+        * **tag_ids** (list): Tag ids in database
+        """
+        self._sampled_tags = self._sampled_tags | frozenset(tag_ids)
+
+    def remove_sampled_tags(self, tag_ids:list):
+        r"""
+        Unregisters tags logged periodically by a sampler
+
+        **Parameters**
+
+        * **tag_ids** (list): Tag ids in database
+        """
+        self._sampled_tags = self._sampled_tags - frozenset(tag_ids)
+
+    def get_sampled_tags(self)->frozenset:
+        r"""
+        Returns ids of the tags logged periodically by a sampler
+        """
+        return self._sampled_tags
+
+    def set_compression(self, tag_id:int, method:str, deviation:float=0.0, percent:bool=False, span:float=None, max_time:float=None):
+        r"""
+        Sets the compression of a tag, its values are filtered before being logged
+
+        **Parameters**
+
+        * **tag_id** (int): Tag id in database
+        * **method** (str): 'deadband' or 'swinging_door'
+        * **deviation** (float): Allowed deviation, in engineering units or in percent of *span*
+        * **percent** (bool): If True *deviation* is a percent of *span*
+        * **span** (float)[Optional]: Tag span, required by percent deviations
+        * **max_time** (float)[Optional]: Max seconds between two logged values
+        """
+        self._compressors = dict(self._compressors)
+        self._compressors[tag_id] = Compressor(method, deviation=deviation, percent=percent, span=span, max_time=max_time)
+
+    def remove_compression(self, tag_id:int):
+        r"""
+        Removes the compression of a tag, all its values are logged
+        """
+        self._compressors = {_id: compressor for _id, compressor in self._compressors.items() if _id != tag_id}
+
+    def get_compression(self, tag_id:int):
+        r"""
+        Returns the compressor of a tag, None if its values are not compressed
+        """
+        return self._compressors.get(tag_id)
+
+    def get_compression_stats(self)->dict:
+        r"""
+        Returns compression counters of each compressed tag
+
+        **Returns**
+
+        * **stats** (dict): {tag_id: {'method', 'deviation', 'received', 'logged', 'ratio'}}
+        """
+        return {tag_id: compressor.get_stats() for tag_id, compressor in self._compressors.items()}
+
+    def compress(self, values:list)->list:
+        r"""
+        Filters tag values through the compression of their tags, values of tags without compression are kept
+
+        **Parameters**
+
+        * **values** (list): List of (tag_id, value, timestamp) tuples
+
+        **Returns**
+
+        * **values** (list): List of (tag_id, value, timestamp) tuples to log
+        """
+        compressors = self._compressors
+
+        if not compressors:
+
+            return values
+
+        result = list()
+
+        for tag_id, value, timestamp in values:
+
+            compressor = compressors.get(tag_id)
+
+            if compressor is None:
+
+                result.append((tag_id, value, timestamp))
+                continue
+
+            result.extend((tag_id, _value, _timestamp) for _timestamp, _value in compressor.add(timestamp, value))
+
+        return result
+
+    def flush_compression(self):
+        r"""
+        Logs the last received value of each compressed tag if it is not logged yet
+        """
+        values = list()
+
+        for tag_id, compressor in self._compressors.items():
+
+            values.extend((tag_id, value, timestamp) for timestamp, value in compressor.flush())
+
+        if values:
+
+            self.write_tags([{'tag': tag_id, 'value': value, 'timestamp': timestamp} for tag_id, value, timestamp in values])
+
+    def log_values(self, values:list):
+        r"""
+        Logs tag values in database, they are enqueued into the write-behind worker
+        if it is running, otherwise they are written by the DB actor.
+
+        Values of tags logged periodically by a sampler are skipped, values of
+        compressed tags are filtered by their compressor.
+
+        **Parameters**
+
+        * **values** (list): List of (tag_id, value, timestamp) tuples
+        """
+        sampled_tags = self._sampled_tags
+
+        if sampled_tags:
+
+            values = [value for value in values if value[0] not in sampled_tags]
+
+            if not values:
+
+                return
+
+        values = self.compress(values)
+
+        if not values:
+
+            return
+
+        return self.write_values(values)
+
+    def write_values(self, values:list):
+        r"""
+        Writes tag values, they are enqueued into the write-behind worker if it is running,
+        otherwise, or if it is stopping, they are written by the DB actor
+
+        **Parameters**
+
+        * **values** (list): List of (tag_id, value, timestamp) tuples
+        """
+        writer = self._writer
+
+        if writer is not None and writer.is_alive():
+
+            # Values put while the writer stops are not drained anymore, they are written here
+            stop_event = writer.get_stop_event()
+            values = [
+                (tag_id, value, timestamp) for tag_id, value, timestamp in values
+                if not writer.put(tag_id, value, timestamp) and stop_event.is_set()
+            ]
+
+            if not values:
+
+                return
+
+        tags = [{'tag': tag_id, 'value': value, 'timestamp': timestamp} for tag_id, value, timestamp in values]
+
+        return self.write_tags(tags)
+
     def create_tables(self, tables):
         r"""
         Create default PyHades database tables
@@ -105,161 +360,133 @@ class DataLoggerEngine(Singleton):
             node_namespace=node_namespace
         )
 
-    def write_tag(self, tag, value):
+    def write_tag(self, tag, value)->Future:
         r"""
-        Writes value to tag into database on a thread-safe mechanism
+        Writes value to tag into database through the DB actor, never blocks
 
         **Parameters**
 
         * **tag** (str): Tag name in database
         * **value** (float): Value to write in tag
-        """
-        _query = dict()
-        _query["action"] = "write_tag"
-
-        _query["parameters"] = dict()
-        _query["parameters"]["tag"] = tag
-        _query["parameters"]["value"] = value
 
-        self.request(_query)
-        result = self.response()
+        **Returns**
 
-        return result
+        * **future** (Future): Resolved with True once the value is written
+        """
+        return self.request(WRITE_TAG, tag=tag, value=value, timestamp=datetime.now())
 
-    def write_tags(self, tags:list):
+    def write_tags(self, tags:list)->Future:
         r"""
-        Writes value to tag into database on a thread-safe mechanism
+        Writes tag values into database through the DB actor, never blocks
 
         **Parameters**
 
-        * **tag** (str): Tag name in database
-        * **value** (float): Value to write in tag
-        """
-        _query = dict()
-        _query["action"] = "write_tags"
-
-        _query["parameters"] = dict()
-        _query["parameters"]["tags"] = tags
+        * **tags** (list): List of {'tag': tag id, 'value': value, 'timestamp': timestamp} dicts
 
-        self.request(_query)
-        result = self.response()
+        **Returns**
 
-        return result
+        * **future** (Future): Resolved with True once the values are written
+        """
+        return self.request(WRITE_TAGS, tags=tags)
 
-    def read_tag(self, tag):
+    def read_tag(self, tag, timeout:float=None):
         r"""
-        Read tag value from database on a thread-safe mechanism
+        Read tag value from database through the DB actor, values written before are read
 
         **Parameters**
 
         * **tag** (str): Tag name in database
+        * **timeout** (float)[Optional]: Max time in seconds to wait for the DB actor
 
         **Returns**
 
-        * **value** (float): Tag value requested
+        * **value** (dict): Tag values requested
         """
-        _query = dict()
-        _query["action"] = "read_tag"
+        return self.request(READ_TAG, tag=tag).result(timeout)
 
-        _query["parameters"] = dict()
-        _query["parameters"]["tag"] = tag
+    def request(self, action:str, **parameters)->Future:
+        r"""
+        Submits a database command to the DB actor, the actor is started on the first command
 
-        self.request(_query)
-        result = self.response()
+        **Parameters**
 
-        if result["result"]:
-            
-            return result["response"]
+        * **action** (str): 'write_tag', 'write_tags' or 'read_tag'
+        * **parameters**: Command parameters
 
-    def request(self, _query):
-        r"""
-        Documentation here
+        **Returns**
+
+        * **future** (Future): Resolved with the command result
         """
-        self._request_lock.acquire()
+        while True:
 
-        action = _query["action"]
+            try:
 
-        if action == "write_tag":
+                return self.get_actor().submit(action, **parameters)
 
-            try:
-                parameters = _query["parameters"]
+            except RuntimeError:
 
-                tag = parameters["tag"]
-                value = parameters["value"]
+                # The actor was stopped meanwhile, the next one takes the command
+                with self._actor_lock:
 
-                self._logger.write_tag(tag, value)
+                    if self._actor is not None and self._actor.is_stopped():
 
-                self._response = {
-                    "result": True
-                }
-            except Exception as e:
-                self._response = {
-                    "result": False
-                }
+                        self._actor = None
 
-        elif action == "write_tags":
+    def get_actor(self)->DBActor:
+        r"""
+        Returns the running DB actor, it is started if needed
+        """
+        actor = self._actor
 
-            try:
-                parameters = _query["parameters"]
+        if actor is not None:
 
-                tags = parameters["tags"]
+            return actor
 
-                self._logger.write_tags(tags)
+        with self._actor_lock:
 
-                self._response = {
-                    "result": True
-                }
-            except Exception as e:
-                self._response = {
-                    "result": False
-                }
-        
-        elif action == "read_tag":
+            if self._actor is None:
 
-            try:
+                self._actor = DBActor(self._logger, batch_size=self._batch_size)
+                self._actor.start()
 
-                parameters = _query["parameters"]
+            return self._actor
 
-                tag = parameters["tag"]
+    def set_batch_size(self, batch_size:int):
+        r"""
+        Sets the max rows of an insert of coalesced writes, used by the next DB actor
 
-                result = self._logger.read_tag(tag)
-                
-                self._response = {
-                    "result": True,
-                    "response": result
-                }
-            except Exception as e:
-                self._response = {
-                    "result": False,
-                    "response": None
-                }
+        **Parameters**
 
-        self._response_lock.release()
+        * **batch_size** (int): Max rows
+        """
+        self._batch_size = batch_size
 
-    def response(self):
+    def stop(self, timeout:float=None):
         r"""
-        Documentation here
+        Stops the DB actor once the commands already submitted are executed,
+        a new actor is started by the next command
+
+        **Parameters**
+
+        * **timeout** (float)[Optional]: Max time in seconds to wait for the pending commands
         """
-        self._response_lock.acquire()
+        with self._actor_lock:
 
-        result = self._response
+            actor = self._actor
+            self._actor = None
 
-        self._request_lock.release()
+        if actor is not None:
 
-        return result
+            actor.stop(timeout)
 
     def __getstate__(self):
 
-        self._response_lock.release()
         state = self.__dict__.copy()
-        del state['_request_lock']
-        del state['_response_lock']
+        del state['_actor_lock']
+        state['_actor'] = None
         return state
 
     def __setstate__(self, state):
         
         self.__dict__.update(state)
-        self._request_lock = threading.Lock()
-        self._response_lock = threading.Lock()
-
-        self._response_lock.acquire()
+        self._actor_lock = threading.Lock()
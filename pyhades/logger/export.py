@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/export.py
+
+This module implements the historian export engine, TagValue rows are
+pivoted into a wide table, one row per time bucket and one column per tag,
+and written to CSV or gzip-compressed CSV.
+
+Rows are read with *TagValue.stream*, archived days first, and pivoted chunk
+by chunk with NumPy, so memory stays flat whatever the exported range is.
+"""
+import csv
+import gzip
+from io import StringIO
+from datetime import datetime
+import numpy as np
+from peewee import fn
+
+from ..dbmodels import Tags, TagValue, with_read_db
+from .engine import DataLoggerEngine
+from .archive import stream_rows
+from .dialect import to_epoch_us
+
+BUCKET_US = 100000
+CHUNK_SIZE = 50000
+
+
+class Exporter:
+    r"""
+    Wide CSV export of logged tag values.
+
+    Values of a tag are bucketed by *bucket_us* microseconds (tenth of a second by default),
+    the last value of each tag in a bucket is kept and missing values are left empty.
+    Unlike trend queries, both range bounds are included, as CSV exports always did.
+
+    **Parameters**
+
+    * **bucket_us** (int): Bucket width in microseconds
+    * **chunk_size** (int): Rows read from database and pivoted at once
+
+    Usage:
+
+    ```python
+    >>> exporter = Exporter()
+    >>> exporter.to_csv('history.csv.gz', start, stop, tags=['PT-01', 'PT-02'])
+    86400
+    ```
+    """
+
+    def __init__(self, bucket_us:int=BUCKET_US, chunk_size:int=CHUNK_SIZE):
+
+        self.bucket_us = bucket_us
+        self.chunk_size = chunk_size
+        # Timestamps keep the sub-second digits the bucket width resolves, tenths by default
+        digits = max(7 - len(str(bucket_us)), 0)
+        self._width = 20 + digits if digits else 19
+
+    def get_columns(self, start:datetime, stop:datetime, tags:list=None)->list:
+        r"""
+        Returns the exported tags as (id, name), *tags* order is kept,
+        if *tags* is not given, tags with values in the range, archived or not, sorted by id
+
+        **Parameters**
+
+        * **start** (datetime): Range start (included)
+        * **stop** (datetime): Range stop (included)
+        * **tags** (list)[Optional]: Tag names
+        """
+        if tags is not None:
+
+            names = {tag.name: tag.id for tag in Tags.read_by_names(tags)}
+
+            return [(names[name], name) for name in tags if name in names]
+
+        query = (TagValue
+            .select(fn.DISTINCT(TagValue.tag))
+            .where((TagValue.timestamp >= start) & (TagValue.timestamp <= stop))
+            .tuples())
+        tag_ids = {tag_id for tag_id, in query}
+        archive = DataLoggerEngine().get_archive()
+
+        if archive is not None:
+
+            tag_ids.update(archive.get_tag_ids(to_epoch_us(start), to_epoch_us(stop)))
+
+        tag_ids = sorted(tag_ids)
+
+        if not tag_ids:
+
+            return list()
+
+        names = {tag.id: tag.name for tag in Tags.select(Tags.id, Tags.name).where(Tags.id.in_(tag_ids))}
+
+        return [(tag_id, names[tag_id]) for tag_id in tag_ids]
+
+    @with_read_db
+    def iter_rows(self, start:datetime, stop:datetime, tags:list=None, progress=None):
+        r"""
+        Iterates over the exported table in blocks of rows, the first block is the header
+
+        **Parameters**
+
+        * **start** (datetime): Range start (included)
+        * **stop** (datetime): Range stop (included)
+        * **tags** (list)[Optional]: Tag names, tags with values in the range if not given
+        * **progress** (callable)[Optional]: Called with (records done, records total) after each chunk
+
+        **Returns**
+
+        * **rows** (generator): Lists of rows, ['timestamp', tag, ...] then [timestamp, value, ...]
+        """
+        columns = self.get_columns(start, stop, tags)
+
+        yield [['timestamp'] + [name for _, name in columns]]
+
+        if not columns:
+
+            return
+
+        tag_ids = np.array([tag_id for tag_id, _ in columns])
+        order = np.argsort(tag_ids)
+        archive = DataLoggerEngine().get_archive()
+        total = None
+        done = 0
+
+        if progress:
+
+            total = (TagValue
+                .select(fn.COUNT(TagValue.id))
+                .where(
+                    (TagValue.tag.in_(tag_ids.tolist())) &
+                    (TagValue.timestamp >= start) &
+                    (TagValue.timestamp <= stop))
+                .scalar())
+
+            if archive is not None:
+
+                total += archive.count(tag_ids.tolist(), to_epoch_us(start), to_epoch_us(stop), include_stop=True)
+
+        pending = None
+        stream = stream_rows(
+            archive,
+            start,
+            stop,
+            tags=[name for _, name in columns],
+            chunk_size=self.chunk_size,
+            include_start=True,
+            include_stop=True
+        )
+
+        for chunk in stream:
+
+            _, _tags, timestamps, values = zip(*chunk)
+            buckets = np.array(timestamps, dtype='datetime64[us]').astype(np.int64) // self.bucket_us
+            _columns = order[np.searchsorted(tag_ids, np.array(_tags), sorter=order)]
+            values = np.array(values, dtype=np.float64)
+
+            if pending is not None:
+
+                buckets = np.concatenate((pending[0], buckets))
+                _columns = np.concatenate((pending[1], _columns))
+                values = np.concatenate((pending[2], values))
+
+            # The last bucket may continue in the next chunk
+            last = buckets[-1]
+            complete = buckets < last
+            pending = (buckets[~complete], _columns[~complete], values[~complete])
+            rows = self.__pivot(buckets[complete], _columns[complete], values[complete], len(columns))
+
+            if rows:
+
+                yield rows
+
+            if progress:
+
+                done += len(chunk)
+                progress(done, total)
+
+        if pending is not None:
+
+            yield self.__pivot(*pending, len(columns))
+
+    def __pivot(self, buckets:np.ndarray, columns:np.ndarray, values:np.ndarray, n_columns:int)->list:
+        r"""
+        Pivots time sorted (bucket, column, value) triplets into rows, the last value of a column in a bucket wins
+        """
+        if not len(buckets):
+
+            return list()
+
+        stamps, rows = np.unique(buckets, return_inverse=True)
+        table = np.full((len(stamps), n_columns), np.nan)
+        # Keep the last occurrence of each (row, column)
+        keys = rows * n_columns + columns
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last
+        table[rows[last], columns[last]] = values[last]
+
+        cells = table.astype(object)
+        cells[np.isnan(table)] = ''
+        stamps = np.datetime_as_string((stamps * self.bucket_us).astype('datetime64[us]'), unit='us')
+        stamps = np.char.replace(stamps, 'T', ' ')
+        stamps = [stamp[:self._width] for stamp in stamps.tolist()]
+
+        return np.column_stack((np.array(stamps, dtype=object), cells)).tolist()
+
+    def write(self, f, start:datetime, stop:datetime, tags:list=None, progress=None)->int:
+        r"""
+        Writes the exported table to a text file object
+
+        **Returns**
+
+        * **rows** (int): Number of data rows written
+        """
+        writer = csv.writer(f)
+        written = -1
+
+        for rows in self.iter_rows(start, stop, tags=tags, progress=progress):
+
+            writer.writerows(rows)
+            written += len(rows)
+
+        return written
+
+    def to_csv(self, filename:str, start:datetime, stop:datetime, tags:list=None, compress:bool=None, progress=None)->int:
+        r"""
+        Exports to a CSV file
+
+        **Parameters**
+
+        * **filename** (str): File path
+        * **start** (datetime): Range start (included)
+        * **stop** (datetime): Range stop (included)
+        * **tags** (list)[Optional]: Tag names, tags with values in the range if not given
+        * **compress** (bool)[Optional]: Gzip the file, by default when *filename* ends with '.gz'
+        * **progress** (callable)[Optional]: Called with (records done, records total) after each chunk
+
+        **Returns**
+
+        * **rows** (int): Number of data rows written
+        """
+        if compress is None:
+
+            compress = filename.endswith('.gz')
+
+        if compress:
+
+            with gzip.open(filename, 'wt', newline='') as f:
+
+                return self.write(f, start, stop, tags=tags, progress=progress)
+
+        with open(filename, 'w', newline='') as f:
+
+            return self.write(f, start, stop, tags=tags, progress=progress)
+
+    def to_string(self, start:datetime, stop:datetime, tags:list=None, progress=None)->str:
+        r"""
+        Exports to a CSV string
+        """
+        with StringIO() as f:
+
+            self.write(f, start, stop, tags=tags, progress=progress)
+
+            return f.getvalue()
@@ -33,7 +33,8 @@ class LogTable(dict):
         max_value, 
         tcp_source_address, 
         node_namespace, 
-        period
+        period,
+        compression=None
     ):
 
         if not self.validate(period, tag):
@@ -46,11 +47,11 @@ class LogTable(dict):
 
         if period in self.keys():
 
-            self[period].append((tag, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace))
+            self[period].append((tag, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace, compression))
 
         else:
 
-            self[period] = [(tag, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace)]
+            self[period] = [(tag, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace, compression)]
 
     def get_groups(self):
 
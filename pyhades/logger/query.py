@@ -6,9 +6,17 @@ to retrieve history, trends and waveforms from database.
 """
 
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+import numpy as np
 
 from .engine import DataLoggerEngine
-from ..dbmodels import Tags, TagValue
+from .downsampling import Downsampler, BUCKETS, LTTB
+from .dialect import from_epoch_us, to_epoch_us, to_epoch_ms
+from .archive import merge_series, stream_rows
+from .columnar import fetch_series
+from .compression import interpolate, STEP
+from ..dbmodels import Tags, TagValue, proxy, with_read_db
 
 
 DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
@@ -49,132 +57,113 @@ class QueryLogger:
         
         return trend.start
 
+    @with_read_db
     def query_waveform(self, tag, start, stop):
+        r"""
+        Gets the waveform of a tag between *start* and *stop*, archived days included.
+
+        **Returns**
 
+        * **result** (dict): {'t0': first timestamp with DATETIME_FORMAT, 'dt': tag period, 'values': [value, ...]}
+        """
         trend = Tags.select().where(Tags.name == tag).order_by(Tags.start).get()
-        start = datetime.strptime(start, DATETIME_FORMAT)
-        stop = datetime.strptime(stop, DATETIME_FORMAT)
         period = trend.period
-        values= trend.values.select().where((TagValue.timestamp > start) & (TagValue.timestamp < stop)).order_by(TagValue.timestamp.asc())
+        series = self.query_trends_arrays(start, stop, tag)[tag]
+        timestamps = series['timestamps']
         result = dict()
-        t0 = values[0].timestamp.strftime(DATETIME_FORMAT)
+        t0 = from_epoch_us(int(timestamps[0]) // 1000).strftime(DATETIME_FORMAT) if len(timestamps) else None
         result["t0"] = t0
         result["dt"] = period
-        result["values"] = values
+        result["values"] = series['values'].tolist()
 
         return result
 
-    def query_trend(self, tag, start, stop):
+    @with_read_db
+    def query_trend(self, tag, start, stop, max_points:int=None, method:str=LTTB):
+        r"""
+        Gets the trend of a tag between *start* and *stop*, bounds are excluded and archived days are included.
 
-        trend = Tags.select().where(Tags.name == tag).order_by(Tags.start).get()
-        start = datetime.strptime(start, DATETIME_FORMAT)
-        stop = datetime.strptime(stop, DATETIME_FORMAT)
-        values = trend.values.select().where((TagValue.timestamp > start) & (TagValue.timestamp < stop)).order_by(TagValue.timestamp.asc())
-        result = dict()
-        values = [{"x": value.timestamp.strftime(DATETIME_FORMAT), "y": value.value} for value in values]
-        result["values"] = values
+        **Parameters**
 
-        return result
+        * **tag** (str): Tag name
+        * **start** (str): Start datetime with DATETIME_FORMAT (excluded)
+        * **stop** (str): Stop datetime with DATETIME_FORMAT (excluded)
+        * **max_points** (int)[Optional]: If given the trend is downsampled to at most *max_points* points
+        * **method** (str): Downsampling method, 'lttb' or 'buckets'
+
+        **Returns**
+
+        * **result** (dict): {'values': [{"x": timestamp, "y": value}, ...]}
+        """
+        if max_points:
+
+            result = self.query_trends(start, stop, tag, max_points=max_points, method=method)
+
+            return {"values": result[tag]['values']}
+
+        result = self.query_trends(start, stop, tag)
+
+        return {"values": result[tag]['values']}
     
+    @with_read_db
     def get_oldest_record(self):
         r"""
-        Documentation here
-        """
-        cursor = self._logger.get_db().cursor()
-        query = f"""
-SELECT * FROM tagvalue
-ORDER BY id ASC LIMIT 1
+        Gets the first logged tag value, partitioned tables included
+
+        **Returns**
+
+        * **record** (tuple): (id, tag_id, value, timestamp)
         """
-        cursor.execute(query)
-        record_id, tag_id, tag_value, timestamp = cursor.fetchall()[0]
-        return record_id, tag_id, tag_value, timestamp
+        return self.__get_record(TagValue.id.asc())
 
+    @with_read_db
     def get_current_record(self):
         r"""
-        Documentation here
-        """
-        cursor = self._logger.get_db().cursor()
-        query = f"""
-SELECT * FROM tagvalue
-ORDER BY id DESC LIMIT 1
+        Gets the last logged tag value, partitioned tables included
+
+        **Returns**
+
+        * **record** (tuple): (id, tag_id, value, timestamp)
         """
-        cursor.execute(query)
-        record_id, tag_id, tag_value, timestamp = cursor.fetchall()[0]
-        return record_id, tag_id, tag_value, timestamp
+        return self.__get_record(TagValue.id.desc())
+
+    def __get_record(self, order):
+
+        return (TagValue
+            .select(TagValue.id, TagValue.tag, TagValue.value, TagValue.timestamp)
+            .order_by(order)
+            .limit(1)
+            .tuples()
+            .get())
     
-    def query_trend_modified(self, start, stop, *tags):
+    @with_read_db
+    def query_trend_modified(self, start, stop, *tags, max_points:int=10000):
         r"""
-        Documentation here
-        """
-        _, _, _, current_record_timestamp = self.get_current_record()
-        _, _, _, oldest_record_timestamp = self.get_oldest_record()
-        start = datetime.strptime(start, DATETIME_FORMAT)
-        if start < oldest_record_timestamp:
-            start = oldest_record_timestamp
-        stop = datetime.strptime(stop, DATETIME_FORMAT)
-        if stop > current_record_timestamp:
-            stop = current_record_timestamp
-        seconds = (stop-start).total_seconds()
-        inner_list = [[] for _ in range(len(tags))]
-        outer_query = ""
-        for tag in tags:
-            tag_id = self.tag_engine.serialize_tag_by_name(tag)["id"]
-            outer_query += f'AVG("value") FILTER (WHERE tag_id = {tag_id}) as VAR{tag_id},'
-        
-        outer_query = outer_query[:-1]
-        interval = self.tag_engine._config['modules']['daq']['interval']
-        points_to_get = seconds / interval
-        # if points_to_get < 5000:
-        #     truncate_to = "milliseconds"
-        if points_to_get < 10000:
-            truncate_to = "seconds"
-        elif points_to_get >= 10000 and points_to_get < 300000:
-            truncate_to = "minutes"
-        elif points_to_get >= 300000 and points_to_get < 18000000:
-            truncate_to = "hours"
-        else:
-            truncate_to = "days"
+        Gets the trends of many tags averaged in time buckets, so each trend has at most *max_points* points.
 
-        result = {tag: {
-            'values': list(),
-            'unit': self.tag_engine.get_unit(tag)
-        } for tag in tags}
-        cursor = self._logger.get_db().cursor()
-        query = f"""
-SELECT
-    ts,
-    {outer_query}
-FROM (
-  SELECT
-      date_trunc('{truncate_to}', timestamp) as ts,
-      tag_id,
-      value
-  FROM tagvalue
-  WHERE timestamp BETWEEN '{start}' AND '{stop}' 
-  ORDER BY ts) as tv
-GROUP BY ts
-ORDER BY ts;
+        Buckets are computed in SQL on SQLite, PostgreSQL and MySQL, from the coarsest
+        rollup that fits the bucket width when rollups are defined.
+
+        **Parameters**
+
+        * **start** (str): Start datetime with DATETIME_FORMAT
+        * **stop** (str): Stop datetime with DATETIME_FORMAT
+        * **tags** (str): Tag names
+        * **max_points** (int): Max number of points per trend
+
+        **Returns**
+
+        * **result** (dict): {tag: {'values': [{"x": timestamp, "y": average}, ...], 'unit': unit}}
         """
-        cursor.execute(query)
-        query_result = cursor.fetchall()
-        for timestamp, *data in query_result:
-            
-            for i, value in enumerate(data):
+        result = self.query_trends(start, stop, *tags, max_points=max_points, method=BUCKETS)
 
-                if value is not None:
-                
-                    inner_list[i].append(
-                        {
-                            "x": timestamp.strftime(DATETIME_FORMAT),
-                            "y": value
-                        }
-                    )
-        for i, element in enumerate(inner_list):
+        for tag in tags:
 
-            result[tags[i]]['values'] = element
+            result[tag]['values'] = [{"x": value["x"], "y": value["y"]} for value in result[tag]['values']]
 
         return result
 
+    @with_read_db
     def query_last(self, tag, seconds=None, waveform=False):
 
         stop = datetime.now()
@@ -193,18 +182,18 @@ ORDER BY ts;
 
         return self.query_trend(tag, start, stop)
 
+    @with_read_db
     def query_first(self, tag, seconds=None, waveform=False):
 
-        tag_values = self.get_values(tag)
-        start = tag_values[0].timestamp
+        start = self.__get_first(Tags.read_by_name(tag).id)
 
         if seconds:
             
-            stop = start + seconds
+            stop = start + timedelta(seconds=seconds)
 
         else:
 
-            stop = start + self.get_period(tag)
+            stop = start + timedelta(seconds=self.get_period(tag))
 
         start = start.strftime(DATETIME_FORMAT)
         stop = stop.strftime(DATETIME_FORMAT)
@@ -214,7 +203,8 @@ ORDER BY ts;
         
         return self.query_trend(tag, start, stop)
 
-    def query_lasts(self, seconds=None, *tags):
+    @with_read_db
+    def query_lasts(self, seconds=None, *tags, epoch_ms:bool=False):
         r"""
         Documentation here
         """
@@ -228,8 +218,9 @@ ORDER BY ts;
         stop = stop.strftime(DATETIME_FORMAT)
         start = start.strftime(DATETIME_FORMAT)
 
-        return self.query_trends(start, stop, *tags)
+        return self.query_trends(start, stop, *tags, epoch_ms=epoch_ms)
 
+    @with_read_db
     def query_current(self, *tags):
         r"""
         Documentation here
@@ -237,20 +228,37 @@ ORDER BY ts;
         result = dict()
         timestamp = datetime.now().strftime(DATETIME_FORMAT)[:-5]
         
-        for tag in tags:
-        
-            trend = Tags.select().where(Tags.name==tag).order_by(Tags.start).get()
-            if trend:
-                value = trend.values.select().order_by(TagValue.timestamp.desc())
-                if value:
-                    value = value.get()
-                    result[value.tag.name] = {"x": timestamp, "y": value.value}
+        for tag in Tags.read_by_names(tags):
+
+            _, values = self.__get_boundary(tag.id, None, before=True)
+
+            if len(values):
+
+                result[tag.name] = {"x": timestamp, "y": values[0].item()}
         
         return result
 
-    def query_trends(self, start, stop, *tags):
+    @with_read_db
+    def query_trends(self, start, stop, *tags, epoch_ms:bool=False, max_points:int=None, method:str=LTTB):
         r"""
-        Documentation here
+        Gets the trends of many tags between *start* and *stop*, bounds are excluded.
+
+        All series are fetched with a single range query sorted by (tag, timestamp)
+        and split in one pass, days moved to the archive are read from their segments.
+
+        **Parameters**
+
+        * **start** (str): Start datetime with DATETIME_FORMAT (excluded)
+        * **stop** (str): Stop datetime with DATETIME_FORMAT (excluded)
+        * **tags** (str): Tag names
+        * **epoch_ms** (bool): If True, "x" values are epoch milliseconds (int) instead of formatted strings
+        * **max_points** (int)[Optional]: If given each trend is downsampled to at most *max_points* points
+        * **method** (str): Downsampling method, 'lttb' keeps the most significant raw points,
+        'buckets' returns time buckets with their average as "y" and their "min", "max" and "count"
+
+        **Returns**
+
+        * **result** (dict): {tag: {'values': [{"x": timestamp, "y": value}, ...], 'unit': unit}}
         """        
         start = datetime.strptime(start, DATETIME_FORMAT)
         stop = datetime.strptime(stop, DATETIME_FORMAT)
@@ -258,20 +266,360 @@ ORDER BY ts;
             'values': list(),
             'unit': self.tag_engine.get_unit(tag)
         } for tag in tags}
-        
 
-        for tag in tags:
+        tag_names = {tag.id: tag.name for tag in Tags.read_by_names(tags)}
 
-            trend = Tags.select().where(Tags.name==tag).get()
-            
-            values = trend.values.select().where((TagValue.timestamp > start) & (TagValue.timestamp < stop)).order_by(TagValue.timestamp.asc())
+        if not tag_names:
+
+            return result
+
+        if max_points:
+
+            self.__query_downsampled(result, tag_names, start, stop, max_points, method, epoch_ms)
+
+            return result
+
+        query = (TagValue
+            .select(TagValue.tag, TagValue.timestamp, TagValue.value)
+            .where(
+                (TagValue.tag.in_(list(tag_names.keys()))) & 
+                (TagValue.timestamp > start) & 
+                (TagValue.timestamp < stop))
+            .order_by(TagValue.tag, TagValue.timestamp.asc())
+            .tuples())
+
+        for tag_id, rows in groupby(query, key=itemgetter(0)):
+
+            if epoch_ms:
 
-            for value in values:
-                
-                result[tag]['values'].append({"x": value.timestamp.strftime(DATETIME_FORMAT), "y": value.value})
+                values = [{"x": to_epoch_ms(timestamp), "y": value} for _, timestamp, value in rows]
+
+            else:
+
+                values = [{"x": timestamp.isoformat(sep=' ', timespec='microseconds'), "y": value} for _, timestamp, value in rows]
+
+            result[tag_names[tag_id]]['values'] = values
+
+        archive = self._logger.get_archive()
+
+        if archive is not None:
+
+            cold = archive.read(list(tag_names.keys()), to_epoch_us(start), to_epoch_us(stop), include_start=False)
+
+            for tag_id, (timestamps, values) in cold.items():
+
+                if epoch_ms:
+
+                    _values = [{"x": timestamp // 1000, "y": value} for timestamp, value in zip(timestamps.tolist(), values.tolist())]
+
+                else:
+
+                    timestamps = [from_epoch_us(timestamp) for timestamp in timestamps.tolist()]
+                    _values = [{"x": timestamp.isoformat(sep=' ', timespec='microseconds'), "y": value} for timestamp, value in zip(timestamps, values.tolist())]
+
+                result[tag_names[tag_id]]['values'] = _values + result[tag_names[tag_id]]['values']
 
         return result
 
+    @with_read_db
+    def stream_trends(self, start, stop, *tags, chunk_size:int=10000, epoch_ms:bool=False):
+        r"""
+        Iterates over the trends of many tags between *start* and *stop* in chunks sorted by timestamp,
+        for ranges too large to be loaded at once. Bounds are excluded, as in *query_trends*, and
+        archived days are streamed before database rows.
+
+        **Parameters**
+
+        * **start** (str): Start datetime with DATETIME_FORMAT (excluded)
+        * **stop** (str): Stop datetime with DATETIME_FORMAT (excluded)
+        * **tags** (str): Tag names
+        * **chunk_size** (int): Max number of values per chunk
+        * **epoch_ms** (bool): If True, "x" values are epoch milliseconds (int) instead of formatted strings
+
+        **Returns**
+
+        * **chunks** (generator): {tag: [{"x": timestamp, "y": value}, ...]} per chunk
+        """
+        start = datetime.strptime(start, DATETIME_FORMAT)
+        stop = datetime.strptime(stop, DATETIME_FORMAT)
+        tag_names = {tag.id: tag.name for tag in Tags.read_by_names(tags)}
+
+        stream = stream_rows(self._logger.get_archive(), start, stop, tags=list(tag_names.values()), chunk_size=chunk_size)
+
+        for chunk in stream:
+
+            result = dict()
+
+            for tag_id, rows in groupby(sorted(chunk, key=itemgetter(1)), key=itemgetter(1)):
+
+                if epoch_ms:
+
+                    values = [{"x": to_epoch_ms(timestamp), "y": value} for _, _, timestamp, value in rows]
+
+                else:
+
+                    values = [{"x": timestamp.isoformat(sep=' ', timespec='microseconds'), "y": value} for _, _, timestamp, value in rows]
+
+                result[tag_names[tag_id]] = values
+
+            yield result
+
+    @with_read_db
+    def query_trend_arrays(self, tag, start, stop):
+        r"""
+        Gets the trend of a tag between *start* and *stop* as NumPy arrays.
+
+        **Parameters**
+
+        * **tag** (str): Tag name
+        * **start** (str): Start datetime with DATETIME_FORMAT
+        * **stop** (str): Stop datetime with DATETIME_FORMAT
+
+        **Returns**
+
+        * **result** (dict): {'timestamps': epoch ns int64 array, 'values': float64 array, 'unit': unit}
+        """
+        return self.query_trends_arrays(start, stop, tag)[tag]
+
+    @with_read_db
+    def query_trends_arrays(self, start, stop, *tags):
+        r"""
+        Gets the trends of many tags between *start* and *stop* as NumPy arrays.
+
+        Rows are copied from the database cursor into preallocated buffers, it is
+        the fast path for analytics on long ranges. Timestamps are the logged naive
+        datetimes as epoch nanoseconds, use `timestamps.astype('datetime64[ns]')`
+        to get them back as datetimes. Archived days are read from their segments.
+        Bounds are excluded, as in *query_trends*.
+
+        **Parameters**
+
+        * **start** (str): Start datetime with DATETIME_FORMAT (excluded)
+        * **stop** (str): Stop datetime with DATETIME_FORMAT (excluded)
+        * **tags** (str): Tag names
+
+        **Returns**
+
+        * **result** (dict): {tag: {'timestamps': epoch ns int64 array, 'values': float64 array, 'unit': unit}}
+        """
+        start = datetime.strptime(start, DATETIME_FORMAT)
+        stop = datetime.strptime(stop, DATETIME_FORMAT)
+        result = {tag: {
+            'timestamps': np.empty(0, dtype=np.int64),
+            'values': np.empty(0, dtype=np.float64),
+            'unit': self.tag_engine.get_unit(tag)
+        } for tag in tags}
+
+        tag_names = {tag.id: tag.name for tag in Tags.read_by_names(tags)}
+
+        if not tag_names:
+
+            return result
+
+        where = (
+            (TagValue.tag.in_(list(tag_names.keys()))) &
+            (TagValue.timestamp > start) &
+            (TagValue.timestamp < stop))
+        series = fetch_series(proxy, list(tag_names.keys()), where)
+        archive = self._logger.get_archive()
+
+        if archive is not None:
+
+            cold = archive.read(list(tag_names.keys()), to_epoch_us(start), to_epoch_us(stop), include_start=False)
+            series = merge_series(cold, series)
+
+        for tag_id, (timestamps, values) in series.items():
+
+            result[tag_names[tag_id]]['timestamps'] = timestamps * 1000
+            result[tag_names[tag_id]]['values'] = values
+
+        return result
+
+    @with_read_db
+    def query_trends_interpolated(self, start, stop, *tags, period:float=1.0):
+        r"""
+        Rebuilds the trends of many tags at regular instants between *start* and *stop*.
+
+        Compressed tags only log the samples needed to rebuild their signal, values are
+        held from the last logged sample ('step') or interpolated between logged samples
+        for swinging door compression ('linear'). The last sample before *start* and the
+        first one after *stop* are read too, so the whole range is rebuilt.
+
+        **Parameters**
+
+        * **start** (str): Start datetime with DATETIME_FORMAT
+        * **stop** (str): Stop datetime with DATETIME_FORMAT
+        * **tags** (str): Tag names
+        * **period** (float): Seconds between two instants
+
+        **Returns**
+
+        * **result** (dict): {tag: {'timestamps': epoch ns int64 array, 'values': float64 array, 'unit': unit}}
+        """
+        _start = datetime.strptime(start, DATETIME_FORMAT)
+        _stop = datetime.strptime(stop, DATETIME_FORMAT)
+        at = np.arange(to_epoch_us(_start), to_epoch_us(_stop) + 1, int(period * 1000000), dtype=np.int64)
+        result = self.query_trends_arrays(start, stop, *tags)
+
+        for tag in Tags.read_by_names(tags):
+
+            before = self.__get_boundary(tag.id, _start, before=True)
+            after = self.__get_boundary(tag.id, _stop, before=False)
+            x = np.concatenate((before[0], result[tag.name]['timestamps'] // 1000, after[0]))
+            y = np.concatenate((before[1], result[tag.name]['values'], after[1]))
+            compressor = self._logger.get_compression(tag.id)
+            method = compressor.get_interpolation() if compressor is not None else STEP
+
+            result[tag.name]['timestamps'] = at * 1000
+            result[tag.name]['values'] = interpolate(x, y, at, method)
+
+        return result
+
+    @with_read_db
+    def query_compression(self, *tags)->dict:
+        r"""
+        Gets the compression counters of tags, all compressed tags if no tag is given
+
+        **Returns**
+
+        * **result** (dict): {tag: {'method', 'deviation', 'received', 'logged', 'ratio'}}
+        """
+        stats = self._logger.get_compression_stats()
+        result = dict()
+
+        if not stats:
+
+            return result
+
+        for tag_id, name in Tags.select(Tags.id, Tags.name).where(Tags.id.in_(list(stats.keys()))).tuples():
+
+            if not tags or name in tags:
+
+                result[name] = stats[tag_id]
+
+        return result
+
+    def __get_boundary(self, tag_id:int, timestamp:datetime, before:bool, include:bool=True)->tuple:
+        r"""
+        Reads the last logged sample at or before *timestamp*, or the first one at or after it,
+        archived days are read if the database has no sample
+
+        **Parameters**
+
+        * **tag_id** (int): Tag id
+        * **timestamp** (datetime): Boundary, None for the last or first sample of the tag
+        * **before** (bool): If True the last sample before *timestamp* is read, otherwise the first one after it
+        * **include** (bool): A sample at *timestamp* is returned
+
+        **Returns**
+
+        * **sample** (tuple): (epoch us array, values array) with zero or one element
+        """
+        query = TagValue.select(TagValue.timestamp, TagValue.value).where(TagValue.tag == tag_id)
+
+        if before:
+
+            if timestamp is not None:
+
+                query = query.where(TagValue.timestamp <= timestamp if include else TagValue.timestamp < timestamp)
+
+            query = query.order_by(TagValue.timestamp.desc())
+
+        else:
+
+            if timestamp is not None:
+
+                query = query.where(TagValue.timestamp >= timestamp if include else TagValue.timestamp > timestamp)
+
+            query = query.order_by(TagValue.timestamp)
+
+        row = query.limit(1).tuples().first()
+        archive = self._logger.get_archive()
+
+        if row is None and before and archive is not None:
+
+            stop_us = to_epoch_us(timestamp) if timestamp is not None else None
+            sample = archive.read_last(tag_id, stop_us, include_stop=include)
+
+            if sample is not None:
+
+                return np.array([sample[0]], dtype=np.int64), np.array([sample[1]], dtype=np.float64)
+
+        if row is None:
+
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        _timestamp, value = row
+
+        if isinstance(_timestamp, str):
+
+            _timestamp = datetime.fromisoformat(_timestamp)
+
+        return np.array([to_epoch_us(_timestamp)], dtype=np.int64), np.array([value], dtype=np.float64)
+
+    def __get_first(self, tag_id:int)->datetime:
+        r"""
+        Returns the timestamp of the first value of a tag, archived days included, None if there is not
+        """
+        archive = self._logger.get_archive()
+
+        if archive is not None:
+
+            segments = archive.get_segments(tag_id)
+
+            if segments:
+
+                return from_epoch_us(segments[0]['start'])
+
+        timestamps, _ = self.__get_boundary(tag_id, None, before=False)
+
+        if len(timestamps):
+
+            return from_epoch_us(timestamps[0].item())
+
+        return None
+
+    def __query_downsampled(self, result:dict, tag_names:dict, start:datetime, stop:datetime, max_points:int, method:str, epoch_ms:bool):
+        r"""
+        Fills *result* with downsampled trends
+        """
+        downsampler = Downsampler(proxy, self._logger.get_archive(), self._logger.get_rollup())
+
+        def x(timestamp_us):
+
+            if epoch_ms:
+
+                return int(timestamp_us) // 1000
+
+            return from_epoch_us(timestamp_us).isoformat(sep=' ', timespec='microseconds')
+
+        if method == BUCKETS:
+
+            buckets = downsampler.buckets(list(tag_names.keys()), start, stop, max_points)
+
+            for tag_id, rows in buckets.items():
+
+                result[tag_names[tag_id]]['values'] = [
+                    {"x": x(timestamp), "y": avg, "min": _min, "max": _max, "count": count}
+                    for timestamp, _min, _max, avg, count in rows
+                ]
+
+        elif method == LTTB:
+
+            series = downsampler.lttb(list(tag_names.keys()), start, stop, max_points)
+
+            for tag_id, (timestamps, values) in series.items():
+
+                result[tag_names[tag_id]]['values'] = [
+                    {"x": x(timestamp), "y": value}
+                    for timestamp, value in zip(timestamps.tolist(), values.tolist())
+                ]
+
+        else:
+
+            raise ValueError(f"{method} downsampling method is not valid, use '{LTTB}' or '{BUCKETS}'")
+
+    @with_read_db
     def query_values(self, stop, *tags):
         r"""
         Documentation here
@@ -284,9 +632,9 @@ ORDER BY ts;
             try:
 
                 trend = Tags.select().where(Tags.name==tag).get()
-                value = trend.values.select().where(TagValue.timestamp < stop).order_by(TagValue.timestamp.desc()).limit(1)
+                _, values = self.__get_boundary(trend.id, stop, before=True, include=False)
                 result[tag] = {
-                    'value': value[0].value if value else None,
+                    'value': values[0].item() if len(values) else None,
                     'unit': self.tag_engine.get_unit(tag)
                 }
             
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/retention.py
+
+This module implements retention policies for logged tag values.
+
+On a partitioned PostgreSQL table whole partitions older than the longest
+retention are dropped. Values of tags kept for a shorter time, and values
+on SQLite and MySQL, are deleted per tag in small batches using the
+(tag, timestamp) index, so the logger is never locked for long.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from ..dbmodels import Tags, TagValue
+
+BATCH_SIZE = 5000
+# Days of partitions created ahead
+AHEAD_DAYS = 7
+
+
+class Retention:
+    r"""
+    Retention policy engine.
+
+    **Parameters**
+
+    * **db** (Database | Proxy): Database holding TagValue
+    * **days** (float)[Optional]: Default retention in days, values are kept forever if not given
+    * **tags** (dict)[Optional]: Retention in days per tag name, overrides *groups* and *days*
+    * **groups** (dict)[Optional]: Retention in days per logging period group of *table*, overrides *days*
+    * **table** (LogTable)[Optional]: Logged tags grouped by period, required by *groups*
+    * **batch_size** (int): Max number of rows deleted per transaction
+
+    Usage:
+
+    ```python
+    >>> retention = Retention(db, days=90, tags={'PT-01': 7})
+    >>> retention.apply()
+    {'partitions': ['tagvalue_p20230101'], 'deleted': 604800}
+    ```
+    """
+
+    def __init__(self, db, days:float=None, tags:dict=None, groups:dict=None, table=None, batch_size:int=BATCH_SIZE):
+
+        self._db = db
+        self._days = days
+        self._tags = dict(tags or dict())
+        self._groups = dict(groups or dict())
+        self._table = table
+        self._batch_size = batch_size
+
+    def get_tag_days(self)->dict:
+        r"""
+        Returns the retention in days of the tags with their own or their group retention
+
+        **Returns**
+
+        * **days** (dict): {tag name: days}
+        """
+        days = dict()
+
+        if self._table is not None:
+
+            for period, _days in self._groups.items():
+
+                if period in self._table.get_groups():
+
+                    for tag in self._table.get_tags(period):
+
+                        days[tag[0]] = _days
+
+        days.update(self._tags)
+
+        return days
+
+    def get_policy(self)->dict:
+        r"""
+        Returns the retention of each tag
+
+        **Returns**
+
+        * **policy** (dict): {tag_id: days}, tags kept forever are not included
+        """
+        policy = dict()
+        tag_days = self.get_tag_days()
+
+        for tag_id, name in Tags.select(Tags.id, Tags.name).tuples():
+
+            days = tag_days.get(name, self._days)
+
+            if days is not None:
+
+                policy[tag_id] = days
+
+        return policy
+
+    def get_partition_cutoff(self, now:datetime)->datetime:
+        r"""
+        Returns the datetime before which partitions can be dropped, None if some values are kept forever
+        """
+        if self._days is None:
+
+            return None
+
+        tag_days = list(self.get_tag_days().values())
+
+        if any(days is None for days in tag_days):
+
+            return None
+
+        return now - timedelta(days=max([self._days, *tag_days]))
+
+    def apply(self, now:datetime=None)->dict:
+        r"""
+        Removes values older than their retention and creates the partitions of the coming days
+
+        **Parameters**
+
+        * **now** (datetime)[Optional]: Current datetime
+
+        **Returns**
+
+        * **result** (dict): {'partitions': dropped partition names, 'deleted': deleted rows}
+        """
+        now = now or datetime.now()
+        dropped = list()
+
+        if TagValue.is_partitioned():
+
+            TagValue.create_partitions(now, now + timedelta(days=AHEAD_DAYS))
+            cutoff = self.get_partition_cutoff(now)
+
+            if cutoff is not None:
+
+                dropped = TagValue.drop_partitions(cutoff)
+
+        deleted = 0
+
+        for tag_id, days in self.get_policy().items():
+
+            deleted += self.delete(tag_id, now - timedelta(days=days))
+
+        if dropped or deleted:
+
+            logging.info(f"Retention: {len(dropped)} partitions dropped, {deleted} tag values deleted")
+
+        return {'partitions': dropped, 'deleted': deleted}
+
+    def delete(self, tag_id:int, before:datetime)->int:
+        r"""
+        Deletes the values of a tag older than *before* in batches, one transaction per batch
+
+        **Returns**
+
+        * **deleted** (int): Number of deleted rows
+        """
+        where = (TagValue.tag == tag_id) & (TagValue.timestamp < before)
+        deleted = 0
+
+        while True:
+
+            ids = [_id for _id, in TagValue.select(TagValue.id).where(where).limit(self._batch_size).tuples()]
+
+            if not ids:
+
+                break
+
+            with self._db.atomic():
+
+                TagValue.delete_where(where & (TagValue.id.in_(ids)))
+
+            deleted += len(ids)
+
+            if len(ids) < self._batch_size:
+
+                break
+
+        return deleted
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/rollup.py
+
+This module implements rollups, min, max, avg, count, first and last of
+each tag over fixed time buckets (1 minute, 1 hour and 1 day by default),
+stored in the TagRollup table.
+
+Rollups are maintained by watermark: for each resolution all buckets before
+the watermark are complete, each run computes the buckets between the watermark
+and the current time minus a delay, replaces them in a single transaction and
+moves the watermark forward. A run can be repeated or interrupted at any time
+without side effects. The finest resolution is computed from raw values, coarser
+ones from the finer rollup they are a multiple of.
+"""
+import logging
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+import numpy as np
+from peewee import fn
+
+from ..dbmodels import Tags, TagValue, TagRollup, RollupWatermark
+from .columnar import fetch_series
+from .archive import merge_series
+from .dialect import to_epoch_us, from_epoch_us
+from .downsampling import merge_buckets
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+# Buckets computed per transaction
+BATCH_BUCKETS = 60
+INSERT_SIZE = 100
+
+
+def aggregate(x:np.ndarray, y:np.ndarray, resolution_us:int)->tuple:
+    r"""
+    Aggregates a time sorted series in buckets aligned on multiples of *resolution_us*
+
+    **Returns**
+
+    * **aggregates** (tuple): bucket start (epoch us), min, max, avg, count, first and last arrays
+    """
+    buckets = np.asarray(x) // resolution_us * resolution_us
+    y = np.asarray(y, dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+    counts = ends - starts
+
+    return (
+        buckets[starts],
+        np.minimum.reduceat(y, starts),
+        np.maximum.reduceat(y, starts),
+        np.add.reduceat(y, starts) / counts,
+        counts,
+        y[starts],
+        y[ends - 1]
+    )
+
+
+def combine(buckets:np.ndarray, mins:np.ndarray, maxs:np.ndarray, avgs:np.ndarray, counts:np.ndarray, firsts:np.ndarray, lasts:np.ndarray, resolution_us:int)->tuple:
+    r"""
+    Aggregates time sorted rollup buckets into coarser buckets aligned on multiples of *resolution_us*
+
+    **Returns**
+
+    * **aggregates** (tuple): bucket start (epoch us), min, max, avg, count, first and last arrays
+    """
+    parents = np.asarray(buckets) // resolution_us * resolution_us
+    starts = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+    ends = np.r_[starts[1:], len(parents)]
+    _counts = np.add.reduceat(counts, starts)
+
+    return (
+        parents[starts],
+        np.minimum.reduceat(mins, starts),
+        np.maximum.reduceat(maxs, starts),
+        np.add.reduceat(avgs * counts, starts) / _counts,
+        _counts,
+        firsts[starts],
+        lasts[ends - 1]
+    )
+
+
+def floor_datetime(timestamp:datetime, resolution:int)->datetime:
+    r"""
+    Floors a naive datetime to a multiple of *resolution* seconds since epoch
+    """
+    resolution_us = resolution * 1000000
+
+    return from_epoch_us(to_epoch_us(timestamp) // resolution_us * resolution_us)
+
+
+def ceil_datetime(timestamp:datetime, resolution:int)->datetime:
+    r"""
+    Ceils a naive datetime to a multiple of *resolution* seconds since epoch
+    """
+    resolution_us = resolution * 1000000
+
+    return from_epoch_us(-(-to_epoch_us(timestamp) // resolution_us) * resolution_us)
+
+
+class Rollup:
+    r"""
+    Rollup maintenance and reads.
+
+    **Parameters**
+
+    * **db** (Database | Proxy): Database holding TagValue and TagRollup
+    * **resolutions** (tuple): Bucket widths in seconds
+    * **delay** (float): Seconds a bucket waits after its end before being computed, so late writes are included
+    * **archive** (Archive)[Optional]: Cold storage read along with raw values
+
+    Usage:
+
+    ```python
+    >>> rollup = Rollup(db)
+    >>> rollup.update()
+    {60: 1440, 3600: 24, 86400: 1}
+    ```
+    """
+
+    def __init__(self, db, resolutions:tuple=RESOLUTIONS, delay:float=60.0, archive=None):
+
+        self._db = db
+        self._resolutions = tuple(sorted(set(int(resolution) for resolution in resolutions)))
+        self._delay = timedelta(seconds=delay)
+        self._archive = archive
+
+    def get_resolutions(self)->tuple:
+
+        return self._resolutions
+
+    def get_source(self, resolution:int)->int:
+        r"""
+        Returns the finer resolution *resolution* is computed from, None if it is computed from raw values
+        """
+        sources = [source for source in self._resolutions if source < resolution and resolution % source == 0]
+
+        if sources:
+
+            return sources[-1]
+
+    def get_watermark(self, resolution:int)->datetime:
+        r"""
+        Returns the datetime before which all buckets of *resolution* are complete, None if nothing is computed yet
+        """
+        watermark = RollupWatermark.get_or_none(RollupWatermark.resolution == resolution)
+
+        if watermark:
+
+            return watermark.watermark
+
+    def update(self, now:datetime=None)->dict:
+        r"""
+        Computes all complete buckets after the watermark of each resolution
+
+        **Parameters**
+
+        * **now** (datetime)[Optional]: Current datetime
+
+        **Returns**
+
+        * **buckets** (dict): {resolution: number of buckets written}
+        """
+        now = now or datetime.now()
+
+        return {resolution: self.__update(resolution, now) for resolution in self._resolutions}
+
+    def route(self, start:datetime, stop:datetime, width_us:int):
+        r"""
+        Picks the coarsest resolution not wider than *width_us* with complete buckets in the range
+
+        **Returns**
+
+        * **route** (tuple): (resolution, first bucket start, last bucket stop) or None if no rollup can be used
+        """
+        for resolution in reversed(self._resolutions):
+
+            if resolution * 1000000 > width_us:
+
+                continue
+
+            watermark = self.get_watermark(resolution)
+
+            if watermark is None:
+
+                continue
+
+            _start = ceil_datetime(start, resolution)
+            _stop = min(floor_datetime(stop, resolution), watermark)
+
+            if _stop > _start:
+
+                return resolution, _start, _stop
+
+    def read(self, tag_ids:list, start:datetime, stop:datetime, resolution:int, origin_us:int, width_us:int)->dict:
+        r"""
+        Reads rollup buckets in [*start*, *stop*) and aggregates them in buckets of *width_us* from *origin_us*
+
+        **Returns**
+
+        * **buckets** (dict): {tag_id: [(bucket_start_epoch_us, min, max, avg, count), ...]}
+        """
+        query = (TagRollup
+            .select(TagRollup.tag, TagRollup.bucket, TagRollup.min, TagRollup.max, TagRollup.avg, TagRollup.count)
+            .where(
+                (TagRollup.tag.in_(list(tag_ids))) &
+                (TagRollup.resolution == resolution) &
+                (TagRollup.bucket >= start) &
+                (TagRollup.bucket < stop))
+            .order_by(TagRollup.tag, TagRollup.bucket)
+            .tuples())
+        result = dict()
+
+        for tag_id, rows in groupby(query, key=itemgetter(0)):
+
+            result[tag_id] = merge_buckets([
+                (origin_us + (to_epoch_us(bucket) - origin_us) // width_us * width_us, _min, _max, avg, count)
+                for _, bucket, _min, _max, avg, count in rows
+            ])
+
+        return result
+
+    def __update(self, resolution:int, now:datetime)->int:
+
+        source = self.get_source(resolution)
+        limit = floor_datetime(now - self._delay, resolution)
+
+        if source is not None:
+
+            source_watermark = self.get_watermark(source)
+
+            if source_watermark is None:
+
+                return 0
+
+            limit = min(limit, floor_datetime(source_watermark, resolution))
+
+        watermark = self.get_watermark(resolution)
+
+        if watermark is None:
+
+            oldest = self.__get_oldest(source)
+
+            if oldest is None:
+
+                return 0
+
+            watermark = floor_datetime(oldest, resolution)
+
+        written = 0
+
+        while watermark < limit:
+
+            stop = min(watermark + timedelta(seconds=resolution * BATCH_BUCKETS), limit)
+            rows = self.__compute(resolution, source, watermark, stop)
+            self.__write(resolution, watermark, stop, rows)
+            written += len(rows)
+            watermark = stop
+
+        return written
+
+    def __get_oldest(self, source:int)->datetime:
+        r"""
+        Returns the oldest timestamp a resolution can be computed from
+        """
+        if source is not None:
+
+            oldest = (TagRollup
+                .select(fn.MIN(TagRollup.bucket))
+                .where(TagRollup.resolution == source)
+                .scalar())
+
+        else:
+
+            oldest = TagValue.select(fn.MIN(TagValue.timestamp)).scalar()
+
+            if self._archive is not None:
+
+                archived = self._archive.get_oldest()
+
+                if archived is not None:
+
+                    archived = from_epoch_us(archived)
+
+                    if isinstance(oldest, str):
+
+                        oldest = datetime.fromisoformat(oldest)
+
+                    oldest = min(oldest, archived) if oldest else archived
+
+        if isinstance(oldest, str):
+
+            oldest = datetime.fromisoformat(oldest)
+
+        return oldest
+
+    def __compute(self, resolution:int, source:int, start:datetime, stop:datetime)->list:
+        r"""
+        Computes the buckets of a resolution in [*start*, *stop*) as TagRollup rows
+        """
+        resolution_us = resolution * 1000000
+        rows = list()
+
+        if source is None:
+
+            tag_ids = [tag_id for tag_id, in Tags.select(Tags.id).tuples()]
+
+            if not tag_ids:
+
+                return rows
+
+            where = (
+                (TagValue.tag.in_(tag_ids)) &
+                (TagValue.timestamp >= start) &
+                (TagValue.timestamp < stop))
+            series = fetch_series(self._db, tag_ids, where)
+
+            if self._archive is not None:
+
+                series = merge_series(self._archive.read(tag_ids, to_epoch_us(start), to_epoch_us(stop)), series)
+
+            aggregates = {tag_id: aggregate(x, y, resolution_us) for tag_id, (x, y) in series.items() if len(x)}
+
+        else:
+
+            query = (TagRollup
+                .select(
+                    TagRollup.tag,
+                    TagRollup.bucket,
+                    TagRollup.min,
+                    TagRollup.max,
+                    TagRollup.avg,
+                    TagRollup.count,
+                    TagRollup.first,
+                    TagRollup.last)
+                .where(
+                    (TagRollup.resolution == source) &
+                    (TagRollup.bucket >= start) &
+                    (TagRollup.bucket < stop))
+                .order_by(TagRollup.tag, TagRollup.bucket)
+                .tuples())
+            aggregates = dict()
+
+            for tag_id, _rows in groupby(query, key=itemgetter(0)):
+
+                _, buckets, mins, maxs, avgs, counts, firsts, lasts = zip(*_rows)
+                aggregates[tag_id] = combine(
+                    np.array([to_epoch_us(bucket) for bucket in buckets], dtype=np.int64),
+                    np.array(mins), np.array(maxs), np.array(avgs), np.array(counts, dtype=np.int64),
+                    np.array(firsts), np.array(lasts),
+                    resolution_us
+                )
+
+        for tag_id, columns in aggregates.items():
+
+            for bucket, _min, _max, avg, count, first, last in zip(*[column.tolist() for column in columns]):
+
+                rows.append((tag_id, resolution, from_epoch_us(bucket), _min, _max, avg, count, first, last))
+
+        return rows
+
+    def __write(self, resolution:int, start:datetime, stop:datetime, rows:list):
+        r"""
+        Replaces the buckets of a resolution in [*start*, *stop*) and moves its watermark to *stop*, in one transaction
+        """
+        fields = [
+            TagRollup.tag,
+            TagRollup.resolution,
+            TagRollup.bucket,
+            TagRollup.min,
+            TagRollup.max,
+            TagRollup.avg,
+            TagRollup.count,
+            TagRollup.first,
+            TagRollup.last
+        ]
+
+        with self._db.atomic():
+
+            TagRollup.delete_where(
+                (TagRollup.resolution == resolution) &
+                (TagRollup.bucket >= start) &
+                (TagRollup.bucket < stop)
+            )
+
+            for index in range(0, len(rows), INSERT_SIZE):
+
+                TagRollup.insert_many(rows[index:index + INSERT_SIZE], fields=fields).execute()
+
+            updated = (RollupWatermark
+                .update(watermark=stop)
+                .where(RollupWatermark.resolution == resolution)
+                .execute())
+
+            if not updated:
+
+                RollupWatermark.insert(resolution=resolution, watermark=stop).execute()
+
+        logging.debug(f"Rollup {resolution}s: {len(rows)} buckets computed until {stop}")
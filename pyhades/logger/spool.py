@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""pyhades/logger/spool.py
+
+This module implements the store-and-forward spool of the logger, tag values
+which can not be written in the database are appended to a local log and
+replayed in order, in bulk, when the database is back.
+
+The spool is a directory of append-only segment files. Each segment starts
+with a magic header followed by fixed size records:
+
+```
+crc32 (uint32) | tag_id (uint32) | timestamp epoch us (int64) | value (float64)
+```
+
+The CRC covers the record payload, corrupted records are skipped on replay and
+a partial record left by a crash is truncated when the spool is opened. Records
+are written and fsynced once per appended batch. The replay position is kept
+in a cursor file, segments are deleted once replayed. When the spool exceeds
+*max_size* the oldest segments are dropped.
+"""
+import os
+import json
+import zlib
+import struct
+import logging
+import threading
+from datetime import datetime
+
+from .dialect import to_epoch_us, from_epoch_us
+
+HEADER = b'HDSPOOL1'
+RECORD = struct.Struct('<IIqd')
+PAYLOAD = struct.Struct('<Iqd')
+CURSOR = 'cursor.json'
+SEGMENT_SIZE = 16 * 1024 * 1024
+MAX_SIZE = 1024 * 1024 * 1024
+BATCH_SIZE = 500
+
+
+class Spool:
+    r"""
+    Segmented append-only log of tag values.
+
+    **Parameters**
+
+    * **directory** (str): Spool directory, created if it does not exist
+    * **segment_size** (int): Max size in bytes of a segment file
+    * **max_size** (int): Max size in bytes of the spool, the oldest segments are dropped above it
+
+    Usage:
+
+    ```python
+    >>> spool = Spool('spool')
+    >>> spool.append([(1, 10.0, datetime.now())])
+    1
+    >>> spool.replay(lambda batch: TagValue.insert_many(batch, fields=[TagValue.tag, TagValue.value, TagValue.timestamp]).execute())
+    1
+    ```
+    """
+
+    def __init__(self, directory:str, segment_size:int=SEGMENT_SIZE, max_size:int=MAX_SIZE):
+
+        self._directory = directory
+        self._segment_size = max(segment_size, len(HEADER) + RECORD.size)
+        self._max_size = max(max_size, self._segment_size)
+        self._lock = threading.Lock()
+        self._file = None
+
+        self._appended = 0
+        self._replayed = 0
+        self._dropped = 0
+        self._corrupt = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.__load()
+
+    def get_directory(self)->str:
+
+        return self._directory
+
+    def get_pending(self)->int:
+        r"""
+        Returns the number of records waiting to be replayed
+        """
+        return self._pending
+
+    def get_size(self)->int:
+        r"""
+        Returns the size in bytes of all segments
+        """
+        with self._lock:
+
+            return sum(self._sizes.values())
+
+    def get_metrics(self)->dict:
+        r"""
+        Gets spool metrics
+
+        **Returns**
+
+        * **metrics** (dict): Segments count, size in bytes, max size, pending records, appended,
+        replayed, dropped and corrupted records since the spool was opened
+        """
+        with self._lock:
+
+            result = dict()
+
+            result["segments"] = len(self._sizes)
+            result["size"] = sum(self._sizes.values())
+            result["max_size"] = self._max_size
+            result["pending"] = self._pending
+            result["appended"] = self._appended
+            result["replayed"] = self._replayed
+            result["dropped"] = self._dropped
+            result["corrupt"] = self._corrupt
+
+        return result
+
+    def append(self, samples:list)->int:
+        r"""
+        Appends tag values at the end of the spool, they are on disk when this method returns
+
+        **Parameters**
+
+        * **samples** (list): List of (tag_id, value, timestamp) tuples
+
+        **Returns**
+
+        * **appended** (int): Number of appended records
+        """
+        if not samples:
+
+            return 0
+
+        records = list()
+
+        for tag_id, value, timestamp in samples:
+
+            payload = PAYLOAD.pack(int(tag_id), to_epoch_us(timestamp or datetime.now()), float(value))
+            records.append(struct.pack('<I', zlib.crc32(payload)) + payload)
+
+        with self._lock:
+
+            capacity = (self._segment_size - self._sizes[self._active]) // RECORD.size
+            index = 0
+
+            while index < len(records):
+
+                if capacity <= 0:
+
+                    self.__sync()
+                    self.__rotate()
+                    capacity = (self._segment_size - len(HEADER)) // RECORD.size
+
+                chunk = records[index:index + capacity]
+                self._file.write(b''.join(chunk))
+                self._sizes[self._active] += len(chunk) * RECORD.size
+                index += len(chunk)
+                capacity -= len(chunk)
+
+            self.__sync()
+            self._appended += len(records)
+            self._pending += len(records)
+            self.__enforce_max_size()
+
+        return len(records)
+
+    def replay(self, write, batch_size:int=BATCH_SIZE)->int:
+        r"""
+        Replays spooled records in order, the replay position moves forward only after
+        *write* returns, if it raises the exception is propagated and the batch is replayed next time.
+        *write* must only raise while the database is unreachable and skip the records rejected because
+        of their data, otherwise the replay would be stuck on them.
+
+        **Parameters**
+
+        * **write** (callable): Called with batches of (tag_id, value, timestamp) tuples
+        * **batch_size** (int): Max number of records per batch
+
+        **Returns**
+
+        * **replayed** (int): Number of replayed records
+        """
+        replayed = 0
+
+        while True:
+
+            with self._lock:
+
+                batch, position, read = self.__read(batch_size)
+
+            if not read:
+
+                break
+
+            if batch:
+
+                write(batch)
+
+            with self._lock:
+
+                self.__commit(position, read)
+
+            replayed += len(batch)
+
+        if replayed:
+
+            logging.info(f"Spool: {replayed} tag values replayed")
+
+        return replayed
+
+    def close(self):
+
+        with self._lock:
+
+            if self._file is not None:
+
+                self._file.close()
+                self._file = None
+
+    def __path(self, segment:int)->str:
+
+        return os.path.join(self._directory, f"{segment:012d}.spool")
+
+    def __load(self):
+        r"""
+        Finds segments and the cursor, truncates a partial record at the end of the last segment
+        """
+        segments = sorted(int(name.split('.')[0]) for name in os.listdir(self._directory) if name.endswith('.spool'))
+        self._sizes = dict()
+
+        for segment in segments:
+
+            size = os.path.getsize(self.__path(segment))
+            valid = len(HEADER) + max(size - len(HEADER), 0) // RECORD.size * RECORD.size
+
+            if size != valid:
+
+                with open(self.__path(segment), 'r+b') as f:
+
+                    f.truncate(valid)
+
+            self._sizes[segment] = valid
+
+        cursor = (segments[0], len(HEADER)) if segments else (0, len(HEADER))
+        path = os.path.join(self._directory, CURSOR)
+
+        if os.path.exists(path):
+
+            with open(path) as f:
+
+                _cursor = json.load(f)
+
+            if _cursor['segment'] in self._sizes:
+
+                cursor = (_cursor['segment'], min(_cursor['offset'], self._sizes[_cursor['segment']]))
+
+        self._cursor = cursor
+        self._pending = sum(
+            (size - (cursor[1] if segment == cursor[0] else len(HEADER))) // RECORD.size
+            for segment, size in self._sizes.items() if segment >= cursor[0]
+        )
+
+        if segments:
+
+            self._active = segments[-1]
+            self._file = open(self.__path(self._active), 'ab')
+
+        else:
+
+            self._active = -1
+            self.__rotate()
+
+    def __rotate(self):
+        r"""
+        Starts a new segment
+        """
+        if self._file is not None:
+
+            self._file.close()
+
+        self._active += 1
+        self._file = open(self.__path(self._active), 'ab')
+        self._file.write(HEADER)
+        self._sizes[self._active] = len(HEADER)
+
+        if self._cursor[0] < self._active and self._cursor[0] not in self._sizes:
+
+            self._cursor = (self._active, len(HEADER))
+
+    def __sync(self):
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def __read(self, batch_size:int)->tuple:
+        r"""
+        Reads up to *batch_size* records from the cursor
+
+        **Returns**
+
+        * **batch** (tuple): (valid samples, position after the last read record, number of read records)
+        """
+        segment, offset = self._cursor
+        batch = list()
+        read = 0
+
+        for _segment in sorted(self._sizes):
+
+            if _segment < segment or read >= batch_size:
+
+                continue
+
+            if _segment > segment:
+
+                offset = len(HEADER)
+
+            size = self._sizes[_segment]
+            count = min((size - offset) // RECORD.size, batch_size - read)
+
+            if count <= 0:
+
+                segment = _segment
+                continue
+
+            with open(self.__path(_segment), 'rb') as f:
+
+                f.seek(offset)
+                data = f.read(count * RECORD.size)
+
+            for index, (crc, tag_id, timestamp, value) in enumerate(RECORD.iter_unpack(data)):
+
+                read += 1
+
+                if crc != zlib.crc32(data[index * RECORD.size + 4:(index + 1) * RECORD.size]):
+
+                    self._corrupt += 1
+                    continue
+
+                batch.append((tag_id, value, from_epoch_us(timestamp)))
+
+            segment = _segment
+            offset += count * RECORD.size
+
+        return batch, (segment, offset), read
+
+    def __commit(self, position:tuple, read:int):
+        r"""
+        Moves the cursor to *position* and deletes replayed segments
+        """
+        segment, offset = position
+
+        for _segment in sorted(self._sizes):
+
+            if _segment < segment and _segment != self._active:
+
+                os.remove(self.__path(_segment))
+                del self._sizes[_segment]
+
+        if segment == self._active and offset == self._sizes[segment] and offset > len(HEADER):
+
+            # Everything is replayed, the active segment is replaced by an empty one
+            self._file.close()
+            self._file = None
+            os.remove(self.__path(segment))
+            del self._sizes[segment]
+            self._cursor = (segment + 1, len(HEADER))
+            self.__rotate()
+
+        else:
+
+            self._cursor = (segment, offset)
+
+        self._pending = max(self._pending - read, 0)
+        self._replayed += read
+        self.__save_cursor()
+
+    def __enforce_max_size(self):
+        r"""
+        Drops the oldest segments while the spool is bigger than *max_size*
+        """
+        while sum(self._sizes.values()) > self._max_size and len(self._sizes) > 1:
+
+            oldest = min(self._sizes)
+            offset = self._cursor[1] if self._cursor[0] == oldest else len(HEADER)
+            dropped = max(self._sizes[oldest] - offset, 0) // RECORD.size
+            os.remove(self.__path(oldest))
+            del self._sizes[oldest]
+            self._dropped += dropped
+            self._pending -= dropped
+
+            if self._cursor[0] <= oldest:
+
+                self._cursor = (min(self._sizes), len(HEADER))
+                self.__save_cursor()
+
+            logging.warning(f"Spool: max size reached, {dropped} tag values dropped")
+
+    def __save_cursor(self):
+
+        path = os.path.join(self._directory, CURSOR)
+        temp = f"{path}.tmp"
+
+        with open(temp, 'w') as f:
+
+            json.dump({'segment': self._cursor[0], 'offset': self._cursor[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp, path)
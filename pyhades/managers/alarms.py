@@ -2,31 +2,59 @@
 """pyhades/managers/alarms.py
 This module implements Alarm Manager.
 """
+import heapq
+import itertools
+import threading
 from datetime import datetime
-import queue
 from .._singleton import Singleton
-from ..tags import CVTEngine, TagObserver
-from ..dbmodels import AlarmLogging as AlarmModel
+from ..tags import CVTEngine, TagObserver, CoalescingQueue
+from ..tags.change_queue import QUEUE_SIZE, DROP_OLDEST
 from ..dbmodels import AlarmsDB
 from ..alarms import AlarmState
 from ..alarms.alarms import Alarm
+from ..alarms.batch import BatchAlarmEvaluator
+from ..alarms.journal import AlarmJournal, LOG
 
 
 class AlarmManager(Singleton):
     r"""
     This class implements all definitions for the Alarm Management System
+
+    Alarms are indexed by id, by name and by tag, so a tag change only evaluates
+    the alarms bound to that tag. *evaluate* checks the triggers of many tags at once
+    with a batch evaluator.
     """
 
     def __init__(self):
 
         self._alarms = dict()
-        self._tag_queue = queue.Queue()
-
-    def get_queue(self)->queue.Queue:
+        self._alarms_by_name = dict()
+        self._alarms_by_tag = dict()
+        self._evaluator = None
+        self._tag_queue = CoalescingQueue()
+        self._deadlines = list()
+        self._deadlines_lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    def get_queue(self)->CoalescingQueue:
         r"""
-        Documentation here
+        Returns the queue of tag changes, it keeps only the latest change of each tag
         """
         return self._tag_queue
+
+    def set_queue(self, maxsize:int=QUEUE_SIZE, policy:str=DROP_OLDEST):
+        r"""
+        Defines the queue of tag changes, it must be called before the alarm worker is started
+
+        Tags whose changes are dropped are evaluated again by the alarm worker on its next cycle,
+        with 'block' CVT writes wait for the alarm worker instead.
+
+        **Paramters**
+
+        * **maxsize**: (int) Max pending tags
+        * **policy**: (str) Overflow policy, 'drop_oldest', 'drop_newest' or 'block'
+        """
+        self._tag_queue = CoalescingQueue(maxsize=maxsize, policy=policy)
     
     def append_alarm(self, alarm:Alarm):
         r"""
@@ -40,7 +68,40 @@ class AlarmManager(Singleton):
 
         * **None**
         """
-        self._alarms[f'{alarm._id}'] = alarm
+        key = f'{alarm._id}'
+
+        if key in self._alarms:
+
+            self.__unindex(key, self._alarms[key])
+
+        self._alarms[key] = alarm
+        self.__index(key, alarm)
+        self._evaluator = None
+
+    def __index(self, key:str, alarm:Alarm):
+        r"""
+        Adds an alarm to the name and tag indexes
+        """
+        self._alarms_by_name[alarm.name] = alarm
+        self._alarms_by_tag.setdefault(alarm.tag, dict())[key] = alarm
+
+    def __unindex(self, key:str, alarm:Alarm):
+        r"""
+        Removes an alarm from the name and tag indexes
+        """
+        if self._alarms_by_name.get(alarm.name) is alarm:
+
+            self._alarms_by_name.pop(alarm.name)
+
+        alarms = self._alarms_by_tag.get(alarm.tag)
+
+        if alarms is not None:
+
+            alarms.pop(key, None)
+
+            if not alarms:
+
+                self._alarms_by_tag.pop(alarm.tag)
 
     def update_alarm(self, id:int, **kwargs)->dict:
         r"""
@@ -60,8 +121,17 @@ class AlarmManager(Singleton):
         * **alarm** (dict) Alarm Object jsonable
         """
         alarm = self._alarms[str(id)]
-        alarm = alarm.update_alarm_definition(**kwargs)
-        self._alarms[str(id)] = alarm
+        self.__unindex(str(id), alarm)
+
+        try:
+
+            alarm = alarm.update_alarm_definition(**kwargs)
+
+        finally:
+
+            self._alarms[str(id)] = alarm
+            self.__index(str(id), alarm)
+
         return alarm.serialize()
 
     def delete_alarm(self, id:int):
@@ -77,18 +147,18 @@ class AlarmManager(Singleton):
         if alarm:
 
             AlarmsDB.delete(id)    
-            self._alarms.pop(str(id))
+            self.__unindex(str(id), self._alarms.pop(str(id)))
+            self._evaluator = None
 
     def load_alarms_from_db(self):
         r"""
         Load alarms into alarm manager from database
         """
-        manager_alarms = [alarm.name for id, alarm in self.get_alarms().items()]
         db_alarms = AlarmsDB.read_all()
 
         for db_alarm in db_alarms:
 
-            if db_alarm['name'] not in manager_alarms:
+            if db_alarm['name'] not in self._alarms_by_name:
                 
                 db_alarm.pop('id')
                 alarm_trigger = {
@@ -112,10 +182,7 @@ class AlarmManager(Singleton):
 
         * **alarm** (Alarm Object)
         """
-        
-        if str(id) in self._alarms.keys():
-
-            return self._alarms[str(id)]
+        return self._alarms.get(str(id))
     
     def get_alarm_by_name(self, name:str)->Alarm:
         r"""
@@ -129,12 +196,8 @@ class AlarmManager(Singleton):
 
         * **alarm** (Alarm Object)
         """
-        for id, alarm in self._alarms.items():
-            
-            if name == alarm.name:
+        return self._alarms_by_name.get(name)
 
-                return self._alarms[str(id)]
-        
     def get_alarms_by_tag(self, tag:str)->dict:
         r"""
         Gets all alarms associated to some tag
@@ -147,14 +210,7 @@ class AlarmManager(Singleton):
 
         * **alarm** (dict) of alarm objects
         """
-        alarms = dict()
-        for id, alarm in self._alarms.items():
-            
-            if tag == alarm.tag:
-                
-                alarms[id] = alarm
-
-        return alarms
+        return dict(self._alarms_by_tag.get(tag, dict()))
 
     def get_alarm_by_tag(self, tag:str)->dict:
         r"""
@@ -168,13 +224,11 @@ class AlarmManager(Singleton):
 
         * **alarm** (list) of alarm objects
         """
-        for id, alarm in self._alarms.items():
-            
-            if tag == alarm.tag:
-                
-                return {
-                    id: alarm
-                }
+        for id, alarm in self._alarms_by_tag.get(tag, dict()).items():
+
+            return {
+                id: alarm
+            }
 
     def get_alarms(self)->dict:
         r"""
@@ -206,9 +260,7 @@ class AlarmManager(Singleton):
 
         * **tags**: (list)
         """
-        result = set([_alarm.tag for id, _alarm in self.get_alarms().items()])
-
-        return list(result)
+        return list(self._alarms_by_tag)
 
     def summary(self)->dict:
         r"""
@@ -224,16 +276,17 @@ class AlarmManager(Singleton):
         result["alarms"] = alarms
         result["alarm_tags"] = self.get_tag_alarms()
         result["tags"] = self.tags()
+        result["queue"] = self._tag_queue.get_metrics()
 
         return result
 
     def attach_all(self):
-
+        r"""
+        Attaches a single observer to each tag binded into alarms
+        """
         _cvt = CVTEngine()
 
-        def attach_observers(entity):
-
-            _tag = entity.tag
+        def attach_observers(_tag):
 
             observer = TagObserver(self._tag_queue)
             query = dict()
@@ -245,9 +298,126 @@ class AlarmManager(Singleton):
             _cvt.request(query)
             _cvt.response()
 
-        for id, _alarm in self._alarms.items():
+        for _tag in self.tags():
+
+            attach_observers(_tag)
+
+    def get_evaluator(self)->BatchAlarmEvaluator:
+        r"""
+        Returns the batch evaluator of all alarms, it is built again when alarms or their tags changed
+        """
+        evaluator = self._evaluator
+
+        if evaluator is None or evaluator.is_stale():
+
+            evaluator = BatchAlarmEvaluator(list(self._alarms.values()))
+            self._evaluator = evaluator
+
+        return evaluator
+
+    def evaluate(self, tags:list=None)->list:
+        r"""
+        Evaluates the alarms of many tags in a single vectorized pass over a CVT snapshot,
+        only alarms whose condition flipped are updated
+
+        **Paramters**
 
-            attach_observers(_alarm)
+        * **tags**: (list)[Optional] Changed tags, all tags binded into alarms by default
+
+        **Returns**
+
+        * **alarms** (list) Alarm objects updated
+        """
+        evaluator = self.get_evaluator()
+
+        if tags is None:
+
+            tags = evaluator.get_tags()
+
+        tags = [tag for tag in tags if tag in self._alarms_by_tag]
+
+        if not tags:
+
+            return list()
+
+        values = CVTEngine().read_tags(tags)
+
+        return evaluator.evaluate({tag: value['value'] for tag, value in values.items()})
+
+    def schedule_unshelve(self, alarm:Alarm):
+        r"""
+        Schedules the end of the shelving of an alarm, the alarm worker is woken up
+        if it is the next deadline
+
+        **Paramters**
+
+        * **alarm**: (Alarm Object) Shelved alarm
+        """
+        shelved_until = alarm._shelved_until
+
+        if shelved_until is None:
+
+            return
+
+        with self._deadlines_lock:
+
+            heapq.heappush(self._deadlines, (shelved_until, next(self._sequence), alarm))
+            is_next = self._deadlines[0][2] is alarm
+
+        if is_next:
+
+            self._tag_queue.interrupt()
+
+    def get_next_deadline(self)->datetime:
+        r"""
+        Returns the next shelving end, None if no alarm is shelved until a given time
+        """
+        with self._deadlines_lock:
+
+            while self._deadlines:
+
+                shelved_until, _, alarm = self._deadlines[0]
+
+                if alarm.state == AlarmState.SHLVD and alarm._shelved_until == shelved_until:
+
+                    return shelved_until
+
+                # Unshelved or shelved again meanwhile
+                heapq.heappop(self._deadlines)
+
+        return None
+
+    def unshelve_expired(self, now:datetime=None)->list:
+        r"""
+        Unshelves alarms whose shelving time elapsed
+
+        **Paramters**
+
+        * **now**: (datetime)[Optional] Current time
+
+        **Returns**
+
+        * **alarms** (list) Alarm objects unshelved
+        """
+        now = now or datetime.now()
+        alarms = list()
+
+        with self._deadlines_lock:
+
+            while self._deadlines and self._deadlines[0][0] <= now:
+
+                shelved_until, _, alarm = heapq.heappop(self._deadlines)
+
+                if alarm.state == AlarmState.SHLVD and alarm._shelved_until == shelved_until:
+
+                    alarms.append(alarm)
+
+        for _alarm in alarms:
+
+            AlarmJournal().publish(_alarm, kind=LOG)
+            _alarm.unshelve()
+
+        return alarms
 
     def execute(self, tag:str):
         r"""
@@ -258,10 +428,16 @@ class AlarmManager(Singleton):
 
         * **tag**: (str) Tag in CVT
         """
+        alarms = self._alarms_by_tag.get(tag)
+
+        if not alarms:
+
+            return
+
         _cvt = CVTEngine()
         value = _cvt.read_tag(tag)
 
-        for id, _alarm in self._alarms.items():
+        for id, _alarm in list(alarms.items()):
 
             if _alarm.state == AlarmState.SHLVD:
 
@@ -271,12 +447,7 @@ class AlarmManager(Singleton):
                     
                     if _now >= _alarm._shelved_until:
                         
-                        AlarmModel.create(
-                            name=_alarm.name,
-                            state=_alarm.state.state,
-                            priority=_alarm._priority,
-                            value=_alarm._value
-                        )
+                        AlarmJournal().publish(_alarm, kind=LOG)
                         _alarm.unshelve()
                         continue
 
@@ -284,6 +455,4 @@ class AlarmManager(Singleton):
 
                 continue
 
-            if tag == _alarm.tag:
-
-                _alarm.update(value)
+            _alarm.update(value)
@@ -10,6 +10,8 @@ from ..tags import CVTEngine
 from ..dbmodels import (
     Tags, 
     TagValue, 
+    TagRollup,
+    RollupWatermark,
     AlarmTypes, 
     AlarmPriorities, 
     AlarmStates, 
@@ -27,11 +29,24 @@ class DBManager(Singleton):
     Database Manager class for database logging settings.
     """
 
-    def __init__(self, period:float=1.0, delay:float=1.0, drop_tables:bool=False):
+    def __init__(
+        self, 
+        period:float=1.0, 
+        delay:float=1.0, 
+        drop_tables:bool=False, 
+        queue_size:int=10000, 
+        flush_size:int=500, 
+        flush_interval:float=1.0,
+        retry_interval:float=5.0
+    ):
 
         self._period = period
         self._delay = delay
         self._drop_tables = drop_tables
+        self._queue_size = queue_size
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._retry_interval = retry_interval
         self.engine = CVTEngine()
 
         self._logging_tags = LogTable()
@@ -42,6 +57,8 @@ class DBManager(Singleton):
             DataTypes, 
             Tags, 
             TagValue, 
+            TagRollup,
+            RollupWatermark,
             AlarmTypes,
             AlarmStates,
             AlarmPriorities,
@@ -138,10 +155,11 @@ class DBManager(Singleton):
         max_value:float, 
         tcp_source_address:str, 
         node_namespace:str, 
-        period:float
+        period:float,
+        compression:dict=None
     ):
         r"""
-        Add tag to tag's repository
+        Add tag to tag's repository, *compression* settings are applied by the period sampler
         """
         self._logging_tags.add_tag(
             tag, 
@@ -153,7 +171,8 @@ class DBManager(Singleton):
             max_value, 
             tcp_source_address, 
             node_namespace, 
-            period
+            period,
+            compression
         )
 
     def get_tags(self)->dict:
@@ -207,7 +226,7 @@ class DBManager(Singleton):
             
             tags = self._logging_tags.get_tags(period)
         
-            for tag, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace in tags:
+            for tag, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace, _ in tags:
 
                 self.set_tag(
                     tag=tag,
@@ -266,6 +285,86 @@ class DBManager(Singleton):
         """
         return self._delay
 
+    def set_queue_size(self, queue_size:int):
+        r"""
+        Sets the max number of tag values waiting to be written by the write-behind worker
+
+        **Parameters**
+
+        * **queue_size** (int): Queue size, new values are dropped when it is full
+        """
+        self._queue_size = queue_size
+
+    def get_queue_size(self)->int:
+        r"""
+        Gets the max number of tag values waiting to be written by the write-behind worker
+        """
+        return self._queue_size
+
+    def set_flush_size(self, flush_size:int):
+        r"""
+        Sets the max number of tag values written in a single transaction
+
+        **Parameters**
+
+        * **flush_size** (int): Batch size
+        """
+        self._flush_size = flush_size
+
+    def get_flush_size(self)->int:
+        r"""
+        Gets the max number of tag values written in a single transaction
+        """
+        return self._flush_size
+
+    def set_flush_interval(self, flush_interval:float):
+        r"""
+        Sets the max time a tag value waits in the write-behind queue before being written
+
+        **Parameters**
+
+        * **flush_interval** (float): Time in seconds
+        """
+        self._flush_interval = flush_interval
+
+    def get_flush_interval(self)->float:
+        r"""
+        Gets the max time a tag value waits in the write-behind queue before being written
+        """
+        return self._flush_interval
+
+    def set_spool(self, spool):
+        r"""
+        Sets the store-and-forward spool used when the database is unreachable
+
+        **Parameters**
+
+        * **spool** (Spool): Disk spool, None to drop values on database errors
+        """
+        self._logger.set_spool(spool)
+
+    def get_spool(self):
+        r"""
+        Gets the store-and-forward spool, None if not defined
+        """
+        return self._logger.get_spool()
+
+    def set_retry_interval(self, retry_interval:float):
+        r"""
+        Sets the time between two attempts to replay the spool while the database is unreachable
+
+        **Parameters**
+
+        * **retry_interval** (float): Time in seconds
+        """
+        self._retry_interval = retry_interval
+
+    def get_retry_interval(self)->float:
+        r"""
+        Gets the time between two attempts to replay the spool while the database is unreachable
+        """
+        return self._retry_interval
+
     def init_database(self):
         r"""
         Initializes all databases.
@@ -294,6 +393,10 @@ class DBManager(Singleton):
         result["period"] = self.get_period()
         result["tags"] = self.get_tags()
         result["delay"] = self.get_delay()
+        result["queue_size"] = self.get_queue_size()
+        result["flush_size"] = self.get_flush_size()
+        result["flush_interval"] = self.get_flush_interval()
+        result["retry_interval"] = self.get_retry_interval()
 
         return result
     
\ No newline at end of file
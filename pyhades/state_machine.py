@@ -365,14 +365,24 @@ class PyHadesStateMachine(StateMachine):
 
     def _update_tags(self, direction=READ):
 
+        values = dict()
+
+        if direction == READ:
+
+            names = [_binding.tag for _, _binding in self._tag_bindings if _binding.direction == READ]
+
+            if names:
+
+                values = self.tag_engine.read_tags(names)
+
         for attr, _binding in self._tag_bindings:
 
             try:
                 if direction == READ and _binding.direction == READ:
 
                     tag = _binding.tag
-                    value = self.tag_engine.read_tag(tag)
-                    value = setattr(self, attr, value)
+                    value = values[tag]['value']
+                    setattr(self, attr, value)
 
                 elif direction == WRITE and _binding.direction == WRITE:
                     tag = _binding.tag
@@ -385,12 +395,28 @@ class PyHadesStateMachine(StateMachine):
 
     def _update_groups(self, direction=READ):
 
+        values = dict()
+
+        if direction == READ:
+
+            names = list()
+
+            for _, _binding in self._group_bindings:
+
+                if _binding.direction == READ:
+
+                    names.extend(_binding.tags)
+
+            if names:
+
+                values = self.tag_engine.read_tags(names)
+
         for attr, _binding in self._group_bindings:
 
             try:
                 if direction == READ and _binding.direction == READ:
 
-                    _binding.update()
+                    _binding.update(values=values)
 
                     setattr(self, attr, _binding.values)
 
@@ -1,4 +1,5 @@
 from .tag import Tag, TagObserver
+from .change_queue import CoalescingQueue
 from .tag_value import TagValue
 from .cvt import CVT, CVTEngine
 from .tag_binding import TagBinding, GroupBinding
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""pyhades/tags/change_queue.py
+
+This module implements the coalescing tag change queue,
+which keeps only the latest change of each tag.
+"""
+import time
+import queue
+import threading
+from collections import OrderedDict
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+QUEUE_SIZE = 10000
+
+
+class CoalescingQueue:
+    r"""
+    Bounded producer-consumer queue of tag changes, keyed by tag name.
+
+    A change of a tag which is already waiting in the queue replaces the pending
+    one and keeps its position, so consumers only see the latest snapshot of each
+    tag and a fast tag can not flood the queue. When *maxsize* tags are waiting,
+    the *policy* of a change of another tag is:
+
+    * 'drop_oldest': the oldest pending change is dropped
+    * 'drop_newest': the new change is dropped
+    * 'block': the producer waits for room, *queue.Full* is raised on timeout
+
+    Keys of dropped changes, unless enqueued again, are kept until they are taken out with *get_dropped*, so consumers
+    which read the latest values elsewhere, as the alarm worker does from the CVT, miss no key.
+
+    **Parameters**
+
+    * **maxsize** (int): Max pending tags
+    * **policy** (str): Overflow policy, 'drop_oldest' by default
+    * **key** (str): Key of the item holding the tag name
+
+    Usage:
+
+    ```python
+    >>> changes = CoalescingQueue(maxsize=1000)
+    >>> changes.put({'tag': 'PT-01', 'value': 10.0})
+    >>> changes.put({'tag': 'PT-01', 'value': 11.0})
+    >>> changes.get_batch()
+    [{'tag': 'PT-01', 'value': 11.0}]
+    ```
+    """
+
+    def __init__(self, maxsize:int=QUEUE_SIZE, policy:str=DROP_OLDEST, key:str='tag'):
+
+        if policy not in POLICIES:
+
+            raise ValueError(f"Overflow policy must be one of {POLICIES}")
+
+        self.maxsize = maxsize
+        self._policy = policy
+        self._key = key
+        self._items = OrderedDict()
+        self._dropped_keys = OrderedDict()
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self._interrupted = False
+
+        self._put = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._delivered = 0
+        self._max_depth = 0
+
+    def get_policy(self)->str:
+
+        return self._policy
+
+    def put(self, item:dict, block:bool=True, timeout:float=None)->bool:
+        r"""
+        Enqueues the change of a tag, the pending change of the same tag is replaced
+
+        **Parameters**
+
+        * **item** (dict): Tag change, holds the tag name in *key*
+        * **block** (bool): With the 'block' policy, wait for room if the queue is full
+        * **timeout** (float)[Optional]: Max seconds to wait for room
+
+        **Returns**
+
+        * **enqueued** (bool): False if the change was dropped
+        """
+        name = item[self._key]
+
+        with self._not_full:
+
+            self._put += 1
+
+            if name in self._items:
+
+                self._items[name] = item
+                self._coalesced += 1
+
+                return True
+
+            if self.maxsize > 0 and len(self._items) >= self.maxsize:
+
+                if self._policy == DROP_NEWEST:
+
+                    self._dropped += 1
+                    self._dropped_keys[name] = None
+
+                    return False
+
+                if self._policy == DROP_OLDEST:
+
+                    dropped, _ = self._items.popitem(last=False)
+                    self._dropped += 1
+                    self._dropped_keys[dropped] = None
+
+                else:
+
+                    self.__wait_room(block, timeout)
+
+                    # The tag may have been enqueued by another producer meanwhile
+                    if name in self._items:
+
+                        self._items[name] = item
+                        self._coalesced += 1
+
+                        return True
+
+            self._items[name] = item
+            self._dropped_keys.pop(name, None)
+            self._max_depth = max(self._max_depth, len(self._items))
+            self._not_empty.notify()
+
+            return True
+
+    def put_nowait(self, item:dict)->bool:
+
+        return self.put(item, block=False)
+
+    def __wait_room(self, block:bool, timeout:float):
+        r"""
+        Waits until a tag can be enqueued, the lock is held
+        """
+        if not block:
+
+            raise queue.Full
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while len(self._items) >= self.maxsize:
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+
+            if remaining is not None and remaining <= 0:
+
+                raise queue.Full
+
+            self._not_full.wait(remaining)
+
+    def get(self, block:bool=True, timeout:float=None)->dict:
+        r"""
+        Takes out the oldest pending change
+
+        **Parameters**
+
+        * **block** (bool): Wait for a change if the queue is empty
+        * **timeout** (float)[Optional]: Max seconds to wait, *queue.Empty* is raised on timeout
+
+        **Returns**
+
+        * **item** (dict): Latest change of a tag
+        """
+        items = self.get_batch(max_items=1, timeout=timeout if block else 0)
+
+        if not items:
+
+            raise queue.Empty
+
+        return items[0]
+
+    def get_nowait(self)->dict:
+
+        return self.get(block=False)
+
+    def get_batch(self, max_items:int=None, timeout:float=0)->list:
+        r"""
+        Takes out pending changes, oldest first
+
+        **Parameters**
+
+        * **max_items** (int)[Optional]: Max changes taken out, all by default
+        * **timeout** (float)[Optional]: Max seconds to wait for a change if the queue is empty,
+        0 does not wait and None waits forever
+
+        **Returns**
+
+        * **items** (list): Latest changes of the tags, empty if none came before *timeout* or on *interrupt*
+        """
+        with self._not_empty:
+
+            if not self._items and timeout != 0:
+
+                self._not_empty.wait_for(lambda: self._items or self._interrupted, timeout)
+
+            self._interrupted = False
+
+            count = len(self._items) if max_items is None else min(max_items, len(self._items))
+            items = [self._items.popitem(last=False)[1] for _ in range(count)]
+
+            if items:
+
+                self._delivered += len(items)
+                self._not_full.notify_all()
+
+            return items
+
+    def get_dropped(self)->list:
+        r"""
+        Takes out the keys of the changes dropped since the last call
+
+        **Returns**
+
+        * **keys** (list): Tag names, oldest drop first
+        """
+        with self._mutex:
+
+            keys = list(self._dropped_keys)
+            self._dropped_keys.clear()
+
+            return keys
+
+    def interrupt(self):
+        r"""
+        Wakes up a consumer waiting in *get_batch*, it gets the pending changes, if any,
+        if no consumer is waiting the next *get_batch* does not wait
+        """
+        with self._not_empty:
+
+            self._interrupted = True
+            self._not_empty.notify_all()
+
+    def qsize(self)->int:
+
+        return len(self._items)
+
+    def empty(self)->bool:
+
+        return not self._items
+
+    def full(self)->bool:
+
+        return 0 < self.maxsize <= len(self._items)
+
+    def get_metrics(self)->dict:
+        r"""
+        Gets queue metrics
+
+        **Returns**
+
+        * **metrics** (dict): Queue depth, max depth reached, changes put, coalesced, dropped and delivered,
+        tags dropped and not taken out with *get_dropped* yet, and coalesce ratio, the fraction of changes merged into a pending one
+        """
+        return {
+            "depth": self.qsize(),
+            "maxsize": self.maxsize,
+            "max_depth": self._max_depth,
+            "policy": self._policy,
+            "put": self._put,
+            "coalesced": self._coalesced,
+            "dropped": self._dropped,
+            "dropped_pending": len(self._dropped_keys),
+            "delivered": self._delivered,
+            "coalesce_ratio": self._coalesced / self._put if self._put else 0.0
+        }
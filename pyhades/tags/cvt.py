@@ -18,6 +18,9 @@ import logging
 from ..utils import log_detailed
 from .unit_conversion import UnitConversion
 
+WRITE_LOCK_STRIPES = 64
+WRITE_ACTIONS = ("set_value", "set_values", "attach", "detach")
+
 
 class CVT:
     """Current Value Table class for Tag based repository.
@@ -42,6 +45,10 @@ class CVT:
     def __init__(self):
 
         self._tags = dict()
+        self._tags_by_name = dict()
+        self._units = dict()
+        # Held by writers only while swapping value slots, so snapshots see one instant
+        self._commit_lock = threading.Lock()
         self.data_types = ["float", "int", "bool", "str"]
 
     def set_data_type(self, data_type):
@@ -51,13 +58,51 @@ class CVT:
 
     def tag_defined(self, name):
 
-        for id, value in self._tags.items():
-            
-            if name == value.name:
+        return name in self._tags_by_name
+
+    def get_tag(self, name:str)->Tag:
+        r"""
+        Gets the Tag object defined by name from the in-memory name index,
+        without querying the database.
+
+        **Parameters**
 
-                return True
+        * **name** (str): Tag name.
 
-        return False
+        **Returns**
+
+        * **tag** (Tag): Tag object or None if it is not defined
+        """
+        return self._tags_by_name.get(name)
+
+    def get_unit_name(self, unit:str)->str:
+        r"""
+        Gets the unit name used by the unit converter for a unit symbol,
+        units are cached after the first database lookup.
+
+        **Parameters**
+
+        * **unit** (str): Unit symbol, i.e. 'Pa', 'kg/s'
+
+        **Returns**
+
+        * **name** (str): Unit name or None if the unit is not defined
+        """
+        if unit is None:
+
+            return None
+
+        if unit not in self._units:
+
+            _unit = Units.read_by_unit(unit)
+
+            if not _unit:
+
+                return None
+
+            self._units[unit] = _unit['name']
+
+        return self._units[unit]
 
     def set_tag(
         self, 
@@ -69,7 +114,8 @@ class CVT:
         min_value:float=None, 
         max_value:float=None,
         tcp_source_address:str="",
-        node_namespace:str=""):
+        node_namespace:str="",
+        compression:dict=None):
         """Initialize a new Tag object in the _tags dictionary.
         
         # Parameters
@@ -97,7 +143,7 @@ class CVT:
             data_type = data_type.__name__
             self.set_data_type(data_type)
 
-        tag = Tag(name, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace)
+        tag = Tag(name, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace, compression)
 
         Tags.create(
             name=name, 
@@ -115,7 +161,14 @@ class CVT:
 
         if _tag:
             
+            tag.set_id(_tag.id)
             self._tags[str(_tag.id)] = tag
+            self._tags_by_name[name] = tag
+
+            if compression:
+
+                span = max_value - min_value if min_value is not None and max_value is not None else None
+                self.logger.set_compression(_tag.id, span=span, **compression)
 
     def set_tags(self, tags):
         """Initialize a list of new Tags object in the _tags dictionary.
@@ -135,7 +188,7 @@ class CVT:
         from pyhades import PyHades
         app = PyHades()
         alarm_manager = app.get_alarm_manager()
-        tag = Tags.read_by_name(name=name)
+        tag = self._tags_by_name.pop(name)
         Tags.delete(tag.id)                         # remove from database
         self._tags.pop(str(tag.id))                 # remove from manager
 
@@ -150,10 +203,16 @@ class CVT:
         r"""
         Documentation here
         """
-        tag = self._tags[id]
+        tag = self._tags[str(id)]
         Tags.put(id, **kwargs)
+
+        if 'name' in kwargs:
+
+            self._tags_by_name.pop(tag.name, None)
+            self._tags_by_name[kwargs['name']] = tag
+
         tag.update(**kwargs)
-        self._tags[id] = tag
+        self._tags[str(id)] = tag
         return Tags.read(id)
 
     def get_tags(self):
@@ -196,11 +255,11 @@ class CVT:
         r"""
         Documentation here
         """
-        for _, tag in self._tags.items():
+        tag = self._tags_by_name.get(name)
 
-            if self._tags[str(tag.id)]['name']==name:
+        if tag:
 
-                return tag.get_node_namespace()
+            return tag.get_node_namespace()
 
         return None
 
@@ -213,16 +272,20 @@ class CVT:
         value (float, int, bool): 
             Tag value ("int", "float", "bool")
         """
-        tag_name = name
-        tag = Tags.read_by_name(tag_name)
+        tag = self._tags_by_name.get(name)
+
         if tag:
 
-            if str(tag.id) not in self._tags:
-                
-                raise KeyError
+            with self._commit_lock:
+
+                slot = tag.swap_value(value)
+
+            tag.notify()
+            self.logger.log_values([(tag.id, value, slot.get_source_timestamp())])
 
-            self._tags[str(tag.id)].set_value(value)
-            self.logger.write_tag(tag_name, value)
+        else:
+
+            logging.warning(f"{name} tag Not exists in CVT.set_value method")
 
     def set_values(self, tags:list):
         """Sets a new value for a defined tag.
@@ -234,11 +297,19 @@ class CVT:
             Tag value ("int", "float", "bool")
         """
 
-        for tag in tags:
+        _tags = [(self._tags[str(tag['tag'])], tag['value']) for tag in tags]
+
+        with self._commit_lock:
+
+            slots = [_tag.swap_value(value) for _tag, value in _tags]
+
+        for _tag, _ in _tags:
 
-            self._tags[str(tag['tag'])].set_value(tag['value'])
+            _tag.notify()
     
-        self.logger.write_tags(tags)
+        self.logger.log_values([
+            (_tag.id, value, slot.get_source_timestamp()) for (_tag, value), slot in zip(_tags, slots)
+        ])
 
     def get_units(self):
         r"""
@@ -253,21 +324,69 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
-        tag = self._tags[str(tag.id)]        
-        _new_object = copy.copy(tag.get_value())
-        _unit = Units.read_by_unit(unit)
-        from_unit = Units.read_by_unit(tag.unit)
-        from_unit = from_unit['name']
-        value = self._tags[str(tag.id)].get_value()
+        tag = self._tags_by_name[name]
+        value = tag.get_value()
+        
+        return self.__convert(tag, value, unit)
+
+    def get_values(self, names:list, unit:str=None)->dict:
+        r"""
+        Returns the values of many tags taken at one consistent instant.
+
+        Value slots are collected while holding the commit lock once, so no
+        write can land between two tags of the same call.
+
+        **Parameters**
+
+        * **names** (list): Tag names
+        * **unit** (str)[Optional]: Unit to convert the values to
+
+        **Returns**
+
+        * **values** (dict): {name: {'value', 'source_timestamp', 'status_code'}}
+        """
+        tags = list()
+
+        for name in names:
+
+            tag = self._tags_by_name.get(name)
+
+            if tag:
 
-        if _unit:
+                tags.append(tag)
 
-            to_unit = _unit['name']
-            new_value =  self.unit_converter.convert(value, from_unit=from_unit, to_unit=to_unit)
-            _new_object = copy.copy(new_value)
+            else:
+
+                logging.warning(f"{name} tag Not exists in CVT.get_values method")
+
+        with self._commit_lock:
+
+            slots = [tag.value for tag in tags]
+
+        result = dict()
+
+        for tag, slot in zip(tags, slots):
+
+            result[tag.name] = {
+                'value': self.__convert(tag, slot.get_value(), unit),
+                'source_timestamp': slot.get_source_timestamp(),
+                'status_code': slot.get_status_code()
+            }
+
+        return result
+
+    def __convert(self, tag:Tag, value, unit:str=None):
+        r"""
+        Converts a tag value to *unit*, returns a copy of the value if no unit is given.
+        """
+        to_unit = self.get_unit_name(unit)
+
+        if to_unit:
+
+            from_unit = self.get_unit_name(tag.unit)
+            value = self.unit_converter.convert(value, from_unit=from_unit, to_unit=to_unit)
         
-        return _new_object
+        return copy.copy(value)
 
     def get_data_type(self, name):
         """Returns a tag type defined by name.
@@ -276,10 +395,10 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
         if tag:
 
-            return self._tags[str(tag.id)].get_data_type()
+            return tag.get_data_type()
 
         else:
 
@@ -299,10 +418,10 @@ class CVT:
         Documentation here
         """
 
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
         if tag:
             
-            attrs = self._tags[str(tag.id)].get_attributes()
+            attrs = tag.get_attributes()
             return attrs
         
         else:
@@ -318,11 +437,11 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
         
         if tag:
 
-            return self._tags[str(tag.id)].get_unit()
+            return tag.get_unit()
         
         else:
 
@@ -336,11 +455,11 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
         
         if tag:
 
-            return self._tags[str(tag.id)].get_variable()
+            return tag.get_variable()
         
         else:
 
@@ -354,11 +473,11 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
         
         if tag:
 
-            return self._tags[str(tag.id)].get_description()
+            return tag.get_description()
         
         else:
 
@@ -372,11 +491,11 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
 
         if tag:
 
-            return self._tags[str(tag.id)].get_display_name()
+            return tag.get_display_name()
 
         else:
 
@@ -390,11 +509,11 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
 
         if tag:
 
-            return self._tags[str(tag.id)].get_min_value()
+            return tag.get_min_value()
 
         else:
 
@@ -408,11 +527,11 @@ class CVT:
         name (str):
             Tag name.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
 
         if tag:
 
-            return self._tags[str(tag.id)].get_max_value()
+            return tag.get_max_value()
 
         else:
 
@@ -435,11 +554,11 @@ class CVT:
         observer (TagObserver): 
             Tag observer object, will update once a tag object is changed.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
 
         if tag:
 
-            self._tags[str(tag.id)].attach(observer)
+            tag.attach(observer)
 
         else:
 
@@ -454,11 +573,11 @@ class CVT:
         observer (TagObserver): 
             Tag observer object.
         """
-        tag = Tags.read_by_name(name)
+        tag = self._tags_by_name.get(name)
 
         if tag:
 
-            self._tags[str(tag.id)].detach(observer)
+            tag.detach(observer)
 
         else:
 
@@ -473,6 +592,10 @@ class CVTEngine(Singleton):
     so each sub-thread within the PyHades application can access tags
     in a thread-safe mechanism.
 
+    Reads never take a lock, tag values are immutable slots swapped on
+    each write. Writes are serialized per tag through striped locks, so
+    writers on different tags do not wait on each other.
+
     Usage:
     
     ```python
@@ -487,13 +610,10 @@ class CVTEngine(Singleton):
 
         self._cvt = CVT()
         self._groups = dict()
-        self._request_lock = threading.Lock()
-        self._response_lock = threading.Lock()
+        self._local = threading.local()
+        self._write_locks = [threading.Lock() for _ in range(WRITE_LOCK_STRIPES)]
         self._config = None
         self.__tags = list()
-        self._response = None
-
-        self._response_lock.acquire()
 
     def set_config(self, config_file:str):
         r"""
@@ -882,7 +1002,8 @@ class CVTEngine(Singleton):
         min_value:float=None, 
         max_value:float=None,
         tcp_source_address:str="",
-        node_namespace:str=""):
+        node_namespace:str="",
+        compression:dict=None):
         """
         Defines a new tag.
         
@@ -896,17 +1017,20 @@ class CVTEngine(Singleton):
         * **max_value** (int - float)[Optional]: Field instrument higher value
         * **tcp_source_address** (str)[Optional]: Url for tcp communication with a server.
         * **node_namespace** (str)[Optional]: Node ID or Namespace (OPC UA) to get element value from server.
+        * **compression** (dict)[Optional]: Logging compression, {'method': 'deadband' or 'swinging_door',
+        'deviation': float, 'percent': bool, 'max_time': seconds}, a percent deviation is relative to max_value - min_value
 
         Usage:
     
         ```python
         >>> tag_engine.set_tag("speed", "float", "km/h", "Speed of car", 0.0, 240.0)
+        >>> tag_engine.set_tag("level", "m", "float", "Tank level", compression={'method': 'swinging_door', 'deviation': 0.01, 'max_time': 600})
         ```
         """
         
         if not self.tag_defined(name):
 
-            self._cvt.set_tag(name, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace)
+            self._cvt.set_tag(name, unit, data_type, description, display_name, min_value, max_value, tcp_source_address, node_namespace, compression)
 
     def set_tags(self, tags:list):
         """
@@ -1140,6 +1264,70 @@ class CVTEngine(Singleton):
             
             return result["response"]
 
+    def read_tags(self, names:list, unit:str=None)->dict:
+        """
+        Returns many tag values taken at one consistent instant, in thread-safe mechanism.
+        
+        **Parameters:**
+
+        * **names** (list): Tag names.
+        * **unit** (str)[Optional]: Unit to convert the values to.
+
+        **Returns**
+
+        * **values** (dict) Tag values with their source timestamps and status codes
+
+        ```python
+        >>> tag_engine.read_tags(['TAG1', 'TAG2'])
+        {
+            'TAG1': {'value': 50.53, 'source_timestamp': datetime(...), 'status_code': StatusCode.GOOD},
+            'TAG2': {'value': 10.0, 'source_timestamp': datetime(...), 'status_code': StatusCode.GOOD}
+        }
+        ```
+        """
+
+        _query = dict()
+        _query["action"] = "get_values"
+
+        _query["parameters"] = dict()
+        _query["parameters"]["names"] = names
+        _query["parameters"]["unit"] = unit
+
+        self.request(_query)
+        result = self.response()
+
+        if result["result"]:
+            
+            return result["response"]
+
+        return dict()
+
+    def snapshot(self, group:str=None)->dict:
+        """
+        Returns the values of all tags, or of a group's tags, taken at one consistent instant.
+        
+        **Parameters:**
+
+        * **group** (str)[Optional]: Group name, if not given all defined tags are read.
+
+        **Returns**
+
+        * **values** (dict) Same structure as *read_tags*
+
+        ```python
+        >>> tag_engine.snapshot('Temperatures')
+        ```
+        """
+        if group is None:
+
+            names = list(self._cvt._tags_by_name.keys())
+
+        else:
+
+            names = self.get_group(group)
+
+        return self.read_tags(names)
+
     def attach(self, name:str, observer):
         """
         Attaches an observer object to a Tag, observer gets notified when the Tag value changes.
@@ -1483,6 +1671,7 @@ class CVTEngine(Singleton):
         * set_tag
         * get_tags
         * get_value
+        * get_values
         * get_data_type
         * get_unit
         * get_description
@@ -1499,6 +1688,7 @@ class CVTEngine(Singleton):
         ```python
         parameters = {
             "name": (str) tag name to do request
+            "names": (list)[Optional] tag names, if you use *get_values* action
             "unit": (str)[Optional] Unit to get value
             "value": (float)[Optional] If you use *set_value* function, you must pass this parameter
             "observer": (TagObserver)[Optional] If you use *attach* and *detach* function, you must pass this parameter
@@ -1506,7 +1696,6 @@ class CVTEngine(Singleton):
         ```
 
         """
-        self._request_lock.acquire()
         parameters = query["parameters"]
         if 'name' in parameters.keys():
             name = parameters["name"]
@@ -1514,6 +1703,11 @@ class CVTEngine(Singleton):
             tags = parameters['tags']
         action = query["action"]
         error_msg = f"Error in CVTEngine with action: {action}"
+        locks = self.__get_write_locks(action, parameters)
+
+        for lock in locks:
+
+            lock.acquire()
 
         try:
 
@@ -1528,6 +1722,10 @@ class CVTEngine(Singleton):
                 unit = parameters["unit"]
                 resp = self._cvt.get_value(name, unit=unit)
 
+            elif action == "get_values":
+                unit = parameters["unit"]
+                resp = self._cvt.get_values(parameters["names"], unit=unit)
+
             elif action == "get_data_type":
                 resp = self._cvt.get_data_type(name)
 
@@ -1574,14 +1772,56 @@ class CVTEngine(Singleton):
         except Exception as e:
             self.__log_error(e, error_msg)
 
-        self._response_lock.release()
+        finally:
+
+            for lock in reversed(locks):
+
+                lock.release()
+
+    def __get_write_locks(self, action:str, parameters:dict)->list:
+        r"""
+        Returns the striped locks a write action must hold, sorted by stripe so
+        multi-tag writes always acquire them in the same order.
+
+        **Parameters**
+
+        * **action** (str): Query action
+        * **parameters** (dict): Query parameters
+
+        **Returns**
+
+        * **locks** (list): Locks to acquire, empty for read actions
+        """
+        if action not in WRITE_ACTIONS:
+
+            return []
+
+        if action == "set_values":
+
+            names = list()
+
+            for tag in parameters["tags"]:
+
+                _tag = self._cvt._tags.get(str(tag["tag"]))
+
+                if _tag:
+
+                    names.append(_tag.name)
+
+        else:
+
+            names = [parameters["name"]]
+
+        stripes = sorted({hash(name) % len(self._write_locks) for name in names})
+
+        return [self._write_locks[stripe] for stripe in stripes]
 
     def __log_error(self, e:Exception, msg:str):
         r"""
         Documentation here
         """
         log_detailed(e, msg)
-        self._response = {
+        self._local.response = {
             "result": False,
             "response": None
         }
@@ -1590,22 +1830,16 @@ class CVTEngine(Singleton):
         r"""
         Documentation here
         """
-        self._response = {
+        self._local.response = {
             "result": True,
             "response": resp
         }
 
     def response(self)->dict:
         r"""
-        Handles the python GIL to emit the request's response in a thread-safe mechanism.
+        Returns the response of the last request done by the calling thread.
         """
-        self._response_lock.acquire()
-
-        result = self._response
-
-        self._request_lock.release()
-
-        return result
+        return getattr(self._local, "response", None)
 
     def serialize_tag(self, id:int)->dict:
         r"""
@@ -1722,18 +1956,16 @@ class CVTEngine(Singleton):
 
     def __getstate__(self):
 
-        self._response_lock.release()
         state = self.__dict__.copy()
-        del state['_request_lock']
-        del state['_response_lock']
+        del state['_local']
+        del state['_write_locks']
         return state
 
     def __setstate__(self, state):
         
         self.__dict__.update(state)
-        self._request_lock = threading.Lock()
-        self._response_lock = threading.Lock()
-        self._response_lock.acquire()
+        self._local = threading.local()
+        self._write_locks = [threading.Lock() for _ in range(WRITE_LOCK_STRIPES)]
 
     def convert_units_to_default(self, default_units:dict, **kwargs):
         r"""
@@ -1,3 +1,5 @@
+import copy
+from datetime import datetime
 from .tag_value import TagValue
 from ..utils import Observer
 from ..dbmodels.tags import Tags
@@ -17,7 +19,8 @@ class Tag:
         min_value:float=None, 
         max_value:float=None, 
         tcp_source_address:str=None, 
-        node_namespace:str=None
+        node_namespace:str=None,
+        compression:dict=None
         ):
 
         self.name = name
@@ -30,6 +33,7 @@ class Tag:
         self.unit = unit
         self.variable = None
         self.id = None
+        self.compression = compression
 
         if display_name:
 
@@ -40,17 +44,57 @@ class Tag:
             self.display_name = name
 
     def set_value(self, value):
+        r"""
+        Publishes a new value for the tag and notifies its observers.
+
+        **Parameters**
 
-        self.value.update(value)
+        * **value** (float, int, bool, str): New tag value
+        """
+        self.swap_value(value)
         self.notify()
 
+    def swap_value(self, value):
+        r"""
+        Replaces the value slot without notifying observers.
+
+        The value slot is never mutated in place, a new TagValue is built and the
+        reference is swapped, so concurrent readers always get a consistent
+        (value, source_timestamp, status_code) without taking any lock.
+
+        **Parameters**
+
+        * **value** (float, int, bool, str): New tag value
+
+        **Returns**
+
+        * **value** (TagValue): New value slot
+        """
+        current = self.value
+        self.value = TagValue(
+            value=value, 
+            min_value=current.get_min_value(), 
+            max_value=current.get_max_value(), 
+            source_timestamp=datetime.now()
+        )
+
+        return self.value
+
+    def __swap_value_attribute(self, key:str, value):
+        r"""
+        Replaces the value slot by a copy with the attribute *key* updated.
+        """
+        _value = copy.copy(self.value)
+        setattr(_value, key, value)
+        self.value = _value
+
     def set_min_value(self, value):
 
-        self.value.set_min_value(value)
+        self.__swap_value_attribute('min_value', value)
 
     def set_max_value(self, value):
 
-        self.value.set_max_value(value)
+        self.__swap_value_attribute('max_value', value)
 
     def set_display_name(self, value:str):
         r"""
@@ -152,6 +196,13 @@ class Tag:
 
         return self.node_namespace
 
+    def get_compression(self)->dict:
+        r"""
+        Returns the logging compression settings, None if all values are logged
+        """
+
+        return self.compression
+
     def get_attributes(self):
 
         return {
@@ -201,12 +252,13 @@ class Tag:
     def attach(self, observer):
 
         observer._subject = self
-        self._observers.add(observer)
+        # Copy on write, so notify can iterate the observers while another thread attaches
+        self._observers = self._observers | {observer}
 
     def detach(self, observer):
 
         observer._subject = None
-        self._observers.discard(observer)
+        self._observers = self._observers - {observer}
 
     def notify(self):
 
@@ -239,7 +291,7 @@ class Tag:
 
             if key in ['max_value', 'min_value']:
 
-                setattr(self.value, key, value)
+                self.__swap_value_attribute(key, value)
             
             else:
 
@@ -266,12 +318,15 @@ class TagObserver(Observer):
     def update(self):
 
         """
-        This methods inserts the changing Tag into a 
-        Producer-Consumer Queue Design Pattern
+        This methods inserts a snapshot of the changing Tag into a 
+        Producer-Consumer Queue Design Pattern, a CoalescingQueue keeps
+        only the latest snapshot of each tag
         """
         
         result = dict()
+        value = self._subject.value
 
         result["tag"] = self._subject.name
-        result["value"] = self._subject.value
+        result["value"] = value.get_value()
+        result["timestamp"] = value.get_source_timestamp()
         self._tag_queue.put(result)
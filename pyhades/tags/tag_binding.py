@@ -84,11 +84,25 @@ class GroupBinding:
 
     def _init_group(self):
 
+        values = self.tag_engine.read_tags(self.tags)
+
         for tag in self.tags:
-            tag_value = self.tag_engine.read_tag(tag)
+            tag_value = values.get(tag, {}).get('value')
             setattr(self.values, tag, tag_value)
 
-    def update(self):
+    def update(self, values:dict=None):
+        r"""
+        Updates the group binding.
+
+        **Parameters**
+
+        * **values** (dict)[Optional]: Result of a *CVTEngine.read_tags* call already
+        covering this group, on read direction, if not given the group tags are read
+        in a single *read_tags* call.
+        """
+        if self.direction == READ and values is None:
+
+            values = self.tag_engine.read_tags(self.tags)
 
         for tag in self.tags:
             
@@ -100,6 +114,6 @@ class GroupBinding:
 
             if self.direction == READ:
 
-                value = self.tag_engine.read_tag(tag)
+                if tag in values:
 
-                setattr(self.values, tag, value)
+                    setattr(self.values, tag, values[tag]['value'])
@@ -124,6 +124,8 @@ class Converter(Singleton):
     Documentation here
     """
     temperature_converter = TemperatureConverter()
+    # Unit name -> variable name, kept at class level so it is not taken as a conversion table
+    _variables = dict()
 
     def __init__(self):
         # Default Units
@@ -169,8 +171,12 @@ class Converter(Singleton):
         r"""
         Documentation here
         """
-        _unit = Units.read_by_name(from_unit)
-        _variable = _unit['variable'].lower()
+        if from_unit not in self._variables:
+
+            _unit = Units.read_by_name(from_unit)
+            self._variables[from_unit] = _unit['variable'].lower()
+
+        _variable = self._variables[from_unit]
         _from = from_unit
         _to = to_unit
         multiplier = None
@@ -0,0 +1,82 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+from peewee import ModelDelete
+from pyhades.tests import tag_engine
+from pyhades.logger import DataLogger
+from pyhades.logger.actor import DBActor, WRITE_TAG, WRITE_TAGS
+from pyhades.dbmodels import Tags, TagValue
+
+
+class TestDBActor(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.name = 'test_actor_tag'
+        self.start = datetime(2017, 1, 1)
+
+        if not tag_engine.tag_defined(self.name):
+
+            tag_engine.set_tag(self.name, 'Pa', 'float', 'Test Tag Description', self.name)
+
+        self.tag_id = Tags.read_by_name(self.name).id
+        self.actor = DBActor(DataLogger(), batch_size=100)
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        self.actor.stop()
+        ModelDelete(TagValue).where(TagValue.tag == self.tag_id).execute()
+
+        return super().tearDown()
+
+    def testCoalescedWrites(self):
+
+        # Commands submitted before the actor starts are coalesced
+        futures = [self.actor.submit(WRITE_TAG, tag=self.name, value=float(i), timestamp=self.start + timedelta(seconds=i)) for i in range(150)]
+        futures.append(self.actor.submit(WRITE_TAG, tag='undefined_actor_tag', value=0.0))
+        self.actor.start()
+
+        self.assertTrue(all(future.result(5) for future in futures[:-1]))
+        self.assertFalse(futures[-1].result(5))
+
+        metrics = self.actor.get_metrics()
+        self.assertEqual(metrics['commands'], 151)
+        self.assertEqual(metrics['batches'], 2)
+        self.assertEqual(metrics['written'], 150)
+
+        query = TagValue.select(TagValue.value).where(TagValue.tag == self.tag_id).order_by(TagValue.timestamp)
+        self.assertEqual([row.value for row in query], [float(i) for i in range(150)])
+
+    def testConcurrentWriters(self):
+
+        self.actor.start()
+        futures = list()
+
+        def write(n):
+
+            for i in range(20):
+
+                timestamp = self.start + timedelta(seconds=n * 100 + i)
+                futures.append(self.actor.submit(WRITE_TAGS, tags=[{'tag': self.tag_id, 'value': float(i), 'timestamp': timestamp}]))
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+
+        for thread in threads:
+
+            thread.start()
+
+        for thread in threads:
+
+            thread.join()
+
+        # Stopping waits for the pending commands
+        self.actor.stop(5)
+
+        self.assertTrue(all(future.done() and future.result() for future in futures))
+        self.assertEqual(TagValue.select().where(TagValue.tag == self.tag_id).count(), 80)
+
+        with self.assertRaises(RuntimeError):
+
+            self.actor.submit(WRITE_TAGS, tags=list())
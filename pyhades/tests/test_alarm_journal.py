@@ -0,0 +1,214 @@
+import time
+import threading
+import unittest
+from unittest import mock
+from pyhades.alarms import Alarm, AlarmJournal
+from pyhades.alarms.states import AlarmState
+from pyhades.alarms.trigger import TriggerType
+from pyhades.alarms.journal import LOG, TRANSITION, NOTIFY
+from pyhades.dbmodels import AlarmsDB, AlarmLogging, AlarmSummary
+from pyhades.workers import AlarmJournalWorker
+from pyhades.tests import app, tag_engine
+
+
+class SocketIO:
+
+    def __init__(self):
+
+        self.events = list()
+
+    def emit(self, event, data):
+
+        self.events.append((event, data))
+
+
+class TestAlarmJournal(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self._tag = 'PT-JOURNAL'
+
+        if not tag_engine.tag_defined(self._tag):
+
+            tag_engine.set_tag(self._tag, 'Pa', 'float', 'Alarm journal tag', self._tag)
+
+        self.journal = AlarmJournal()
+        self.alarm = app.get_alarm_manager().get_alarm_by_name('PT-JOURNAL-H')
+
+        if self.alarm is None:
+
+            self.alarm = Alarm(name='PT-JOURNAL-H', tag=self._tag, description='High Pressure')
+            self.alarm.set_trigger(100.0, TriggerType.H.value)
+            app.append_alarm(self.alarm)
+
+        self.alarm.reset()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        self.journal.set_worker(None)
+        app.set_socketio(None)
+
+        return super().tearDown()
+
+    def get_logs(self)->int:
+
+        return AlarmLogging.select().where(AlarmLogging.alarm == self.alarm._id).count()
+
+    def get_summary(self)->AlarmSummary:
+
+        return AlarmSummary.select().where(AlarmSummary.alarm == self.alarm._id).order_by(AlarmSummary.id.desc()).get_or_none()
+
+    def testSynchronousWrite(self):
+
+        logs = self.get_logs()
+        self.alarm.update(105.0)
+
+        # Without a journal worker the transition is persisted right away
+        self.assertEqual(self.alarm.state, AlarmState.UNACK)
+        self.assertEqual(self.get_logs(), logs + 1)
+        summary = self.get_summary()
+        self.assertEqual(summary.state.name, AlarmState.UNACK.state)
+        self.assertTrue(summary.active)
+
+    def testBatchWrite(self):
+
+        logs = self.get_logs()
+        events = list()
+
+        # Notifications are not persisted, their events are snapshots of the alarm transitions
+        self.alarm.update(105.0)
+        events.append(self.journal.publish(self.alarm, kind=NOTIFY))
+        self.alarm.acknowledge()
+        events.append(self.journal.publish(self.alarm, kind=NOTIFY))
+        self.alarm.update(95.0)
+        events.append(self.journal.publish(self.alarm, kind=NOTIFY))
+        events = [event._replace(kind=TRANSITION) for event in events] + [events[-1]._replace(kind=LOG)]
+        records = AlarmSummary.select().count()
+
+        # UNACK -> ACKED -> NORM of the same alarm are folded into a single summary record
+        written = self.journal.write(events)
+
+        self.assertEqual(written, 4)
+        self.assertEqual(self.get_logs(), logs + 3 + 4)
+        self.assertEqual(AlarmSummary.select().count(), records + 1)
+        summary = self.get_summary()
+        self.assertEqual(summary.state.name, AlarmState.ACKED.state)
+        self.assertIsNotNone(summary.ack_time)
+        self.assertFalse(summary.active)
+
+    @mock.patch.object(AlarmSummary, 'get_comments', return_value=[])
+    def testOrphanSummary(self, get_comments):
+
+        sio = SocketIO()
+        app.set_socketio(sio)
+        name = 'PT-JOURNAL-ORPHAN'
+
+        # Summary records of alarms not defined in the alarm manager are not notified
+        if AlarmsDB.read_by_name(name=name) is None:
+
+            AlarmsDB.create(name=name, tag=self._tag, description='Removed alarm')
+
+        AlarmSummary.create(name=name, state=AlarmState.UNACK.state)
+        self.alarm.update(105.0)
+
+        summary, = [data for event, data in sio.events if event == "notify_alarm_summary"]
+        names = [record['name'] for record in summary]
+        self.assertIn(self.alarm.name, names)
+        self.assertNotIn(name, names)
+
+    @mock.patch.object(AlarmSummary, 'get_comments', return_value=[{'comment': 'Checked on site'}])
+    def testWorker(self, get_comments):
+
+        sio = SocketIO()
+        app.set_socketio(sio)
+        worker = AlarmJournalWorker(flush_interval=0.05, debounce=10.0)
+        worker.daemon = True
+        worker.start()
+
+        start = time.monotonic()
+
+        while self.journal.get_worker() is not worker and time.monotonic() - start < 5.0:
+
+            time.sleep(0.001)
+
+        logs = self.get_logs()
+
+        # Transitions are only enqueued, alarms are notified once with their latest state
+        for _ in range(10):
+
+            self.alarm.silence()
+            self.alarm.sound()
+
+        self.alarm.update(105.0)
+        self.alarm.acknowledge()
+        self.assertEqual(self.alarm.state, AlarmState.ACKED)
+
+        start = time.monotonic()
+
+        while worker.get_metrics()["written"] < 2 and time.monotonic() - start < 5.0:
+
+            time.sleep(0.01)
+
+        self.assertEqual(self.get_logs(), logs + 2)
+        self.assertEqual(self.get_summary().state.name, AlarmState.ACKED.state)
+        notified = [data for event, data in sio.events if event == "notify_alarm"]
+        self.assertLessEqual(len(notified), 1)
+
+        # Pending notifications are emitted on stop
+        worker.stop(5)
+        self.assertFalse(worker.is_alive())
+        self.assertIsNone(self.journal.get_worker())
+        notified = [data for event, data in sio.events if event == "notify_alarm"]
+        self.assertEqual(notified[-1]["state"], AlarmState.ACKED.state)
+        self.assertLessEqual(len(notified), 2)
+        metrics = worker.get_metrics()
+        # Normal alarms are not sounded
+        self.assertEqual(metrics["published"], 12)
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(metrics["failed"], 0)
+
+        # The alarm summary is notified with the persisted records
+        summaries = [data for event, data in sio.events if event == "notify_alarm_summary"]
+        self.assertLessEqual(len(summaries), 2)
+        record = next(record for record in summaries[-1] if record['name'] == self.alarm.name)
+        self.assertEqual(record['id'], self.get_summary().id)
+        self.assertEqual(record['state'], AlarmState.ACKED.state)
+        self.assertEqual(record['comments'], [{'comment': 'Checked on site'}])
+        self.assertTrue(get_comments.called)
+
+    def testSlowNotification(self):
+
+        released = threading.Event()
+        worker = AlarmJournalWorker(flush_interval=0.01, debounce=0.0)
+        worker.daemon = True
+
+        # Events keep being written while the UI notification is stalled
+        with mock.patch.object(AlarmJournal, 'emit', side_effect=lambda *args, **kwargs: released.wait(5)):
+
+            worker.start()
+
+            start = time.monotonic()
+
+            while self.journal.get_worker() is not worker and time.monotonic() - start < 5.0:
+
+                time.sleep(0.001)
+
+            logs = self.get_logs()
+            self.alarm.update(105.0)
+            time.sleep(0.05)
+            self.alarm.acknowledge()
+            start = time.monotonic()
+
+            while worker.get_metrics()["written"] < 2 and time.monotonic() - start < 5.0:
+
+                time.sleep(0.01)
+
+            self.assertEqual(self.get_logs(), logs + 2)
+            self.assertEqual(worker.get_metrics()["notifications"], 0)
+            released.set()
+            worker.stop(5)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(worker.get_metrics()["notifications"], 2)
@@ -149,6 +149,30 @@ class TestAlarmManager(unittest.TestCase):
             alarm_names = [alarm.name for id, alarm in alarms.items()]
             self.assertEqual(alarm_names, ['Alarm-Surge-C-100'])
 
+    def testAlarmIndexes(self):
+
+        alarm_manager = app.get_alarm_manager()
+        alarm = Alarm(name='Alarm-PT-100-Index', tag='PT-100', description='Indexed Alarm')
+        alarm.set_trigger(value=90.0, _type=TriggerType.H.value)
+        app.append_alarm(alarm)
+
+        self.assertIs(alarm_manager.get_alarm_by_name('Alarm-PT-100-Index'), alarm)
+        self.assertIn(str(alarm._id), alarm_manager.get_alarms_by_tag('PT-100'))
+
+        alarm_manager.update_alarm(alarm._id, tag='C-100')
+
+        with self.subTest("Testing tag index after update"):
+
+            self.assertNotIn(str(alarm._id), alarm_manager.get_alarms_by_tag('PT-100'))
+            self.assertIs(alarm_manager.get_alarms_by_tag('C-100')[str(alarm._id)], alarm)
+
+        alarm_manager.delete_alarm(alarm._id)
+
+        with self.subTest("Testing indexes after delete"):
+
+            self.assertIsNone(alarm_manager.get_alarm_by_name('Alarm-PT-100-Index'))
+            self.assertNotIn(str(alarm._id), alarm_manager.get_alarms_by_tag('C-100'))
+
     def testGetSubscribedTags(self):
 
         alarm_manager = app.get_alarm_manager()
@@ -0,0 +1,93 @@
+import time
+import unittest
+from pyhades.alarms import Alarm
+from pyhades.alarms.states import AlarmState
+from pyhades.alarms.trigger import TriggerType
+from pyhades.workers import AlarmWorker
+from pyhades.tests import app, tag_engine
+
+
+class TestAlarmWorker(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self._tag = 'PT-WORKER'
+
+        if not tag_engine.tag_defined(self._tag):
+
+            tag_engine.set_tag(self._tag, 'Pa', 'float', 'Alarm worker tag', self._tag)
+
+        self.manager = app.get_alarm_manager()
+        self.alarm = self.manager.get_alarm_by_name('PT-WORKER-H')
+
+        if self.alarm is None:
+
+            self.alarm = Alarm(name='PT-WORKER-H', tag=self._tag, description='High Pressure')
+            self.alarm.set_trigger(100.0, TriggerType.H.value)
+            app.append_alarm(self.alarm)
+
+        tag_engine.write_tag(self._tag, 50.0)
+        self.worker = AlarmWorker(self.manager)
+        self.worker.daemon = True
+        self.worker.start()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        self.worker.stop()
+        self.worker.join(5)
+
+        return super().tearDown()
+
+    def wait(self, state, timeout:float=5.0)->float:
+
+        start = time.monotonic()
+
+        while self.alarm.state != state and time.monotonic() - start < timeout:
+
+            time.sleep(0.001)
+
+        return time.monotonic() - start
+
+    def testEventDriven(self):
+
+        # Shelved alarms are unshelved when due
+        self.alarm.shelve(seconds=0.2)
+        self.assertEqual(self.alarm.state, AlarmState.SHLVD)
+        elapsed = self.wait(AlarmState.NORM)
+
+        self.assertEqual(self.alarm.state, AlarmState.NORM)
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertIsNone(self.manager.get_next_deadline())
+
+        # Tag changes are evaluated as they come, not once per period
+        tag_engine.write_tag(self._tag, 105.0)
+        latency = self.wait(AlarmState.UNACK)
+
+        self.assertEqual(self.alarm.state, AlarmState.UNACK)
+        self.assertLess(latency, 0.5)
+
+        self.worker.stop()
+        self.worker.join(5)
+        self.assertFalse(self.worker.is_alive())
+
+    def testDroppedChanges(self):
+
+        self.worker.stop()
+        self.worker.join(5)
+
+        # A change dropped on overflow is evaluated on the next cycle with the current tag value
+        _queue = self.manager.get_queue()
+        tag_engine.write_tag(self._tag, 105.0)
+        _queue.get_batch()
+        _queue._dropped_keys[self._tag] = None
+        self.assertEqual(self.alarm.state, AlarmState.NORM)
+
+        self.worker = AlarmWorker(self.manager)
+        self.worker.daemon = True
+        self.worker.start()
+        _queue.put({'tag': 'PT-WORKER-OTHER'})
+        self.wait(AlarmState.UNACK)
+
+        self.assertEqual(self.alarm.state, AlarmState.UNACK)
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from peewee import ModelDelete
+from pyhades.tests import tag_engine
+from pyhades.logger import DataLoggerEngine, QueryLogger
+from pyhades.logger.archive import Archive
+from pyhades.logger.export import Exporter
+from pyhades.dbmodels import Tags, TagValue
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.name = 'test_archive_tag'
+        self.day = datetime(2022, 6, 1)
+
+        if not tag_engine.tag_defined(self.name):
+
+            tag_engine.set_tag(self.name, 'Pa', 'float', 'Test Tag Description', self.name)
+
+        self.tag_id = Tags.read_by_name(self.name).id
+        # One value every 6 hours on June 1st and 2nd
+        rows = [(self.tag_id, float(i), self.day + timedelta(hours=6 * i)) for i in range(8)]
+        TagValue.insert_many(rows, fields=[TagValue.tag, TagValue.value, TagValue.timestamp]).execute()
+
+        self.directory = tempfile.mkdtemp()
+        self.archive = Archive(self.directory)
+        self.logger = DataLoggerEngine()
+        self.query = QueryLogger()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        self.logger.set_archive(None)
+        ModelDelete(TagValue).where(TagValue.tag == self.tag_id).execute()
+        shutil.rmtree(self.directory)
+
+        return super().tearDown()
+
+    def testArchive(self):
+
+        archived = self.archive.archive(self.logger.get_db(), before=self.day + timedelta(days=1, hours=12))
+
+        self.assertEqual(archived, 4)
+        self.assertEqual(TagValue.select().where(TagValue.tag == self.tag_id).count(), 4)
+        self.assertEqual([segment['day'] for segment in self.archive.get_segments(self.tag_id)], ['2022-06-01'])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'manifest.json')))
+        # Nothing left to archive
+        self.assertEqual(self.archive.archive(self.logger.get_db(), before=self.day + timedelta(days=1, hours=12)), 0)
+        # Manifest is loaded back
+        self.assertEqual(len(Archive(self.directory).get_segments(self.tag_id)), 1)
+
+    def testQueryAcrossArchive(self):
+
+        self.archive.archive(self.logger.get_db(), before=self.day + timedelta(days=1))
+        self.logger.set_archive(self.archive)
+        start = (self.day + timedelta(hours=6)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.day + timedelta(days=1, hours=12)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        result = self.query.query_trends(start, stop, self.name)
+
+        self.assertEqual(result[self.name]['values'], [
+            {"x": "2022-06-01 12:00:00.000000", "y": 2.0},
+            {"x": "2022-06-01 18:00:00.000000", "y": 3.0},
+            {"x": "2022-06-02 00:00:00.000000", "y": 4.0},
+            {"x": "2022-06-02 06:00:00.000000", "y": 5.0}
+        ])
+
+        arrays = self.query.query_trends_arrays(start, stop, self.name)
+
+        self.assertEqual(arrays[self.name]['values'].tolist(), [2.0, 3.0, 4.0, 5.0])
+
+        result = self.query.query_trends(start, stop, self.name, max_points=2, method='buckets')
+
+        self.assertEqual([(value['min'], value['max'], value['count']) for value in result[self.name]['values']], [
+            (1.0, 3.0, 3),
+            (4.0, 5.0, 2)
+        ])
+
+    def testLegacyQueriesAcrossArchive(self):
+
+        self.archive.archive(self.logger.get_db(), before=self.day + timedelta(days=1))
+        self.logger.set_archive(self.archive)
+        start = (self.day - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.day + timedelta(days=2)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        expected = [float(i) for i in range(8)]
+
+        result = self.query.query_trend(self.name, start, stop)
+
+        self.assertEqual([value['y'] for value in result['values']], expected)
+        self.assertEqual(result['values'][0], {"x": "2022-06-01 00:00:00.000000", "y": 0.0})
+
+        seconds = (datetime.now() - self.day).total_seconds() + 3600
+        result = self.query.query_last(self.name, seconds=seconds)
+
+        self.assertEqual([value['y'] for value in result['values']], expected)
+
+        # The last value before June 2nd is archived
+        middle = (self.day + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.assertEqual(self.query.query_values(middle, self.name)[self.name]['value'], 3.0)
+
+        chunks = list(self.query.stream_trends(start, stop, self.name, chunk_size=3))
+        self.assertEqual([value['y'] for chunk in chunks for value in chunk[self.name]], expected)
+
+        csv = Exporter(chunk_size=3).to_string(self.day, self.day + timedelta(days=2), tags=[self.name])
+        self.assertEqual([float(row.split(',')[1]) for row in csv.splitlines()[1:]], expected)
+
+    def testQueryCurrentFromArchive(self):
+
+        self.archive.archive(self.logger.get_db(), before=self.day + timedelta(days=2))
+        self.logger.set_archive(self.archive)
+
+        self.assertEqual(TagValue.select().where(TagValue.tag == self.tag_id).count(), 0)
+        self.assertEqual(self.query.query_current(self.name)[self.name]['y'], 7.0)
@@ -0,0 +1,81 @@
+import unittest
+from pyhades.alarms import Alarm
+from pyhades.alarms.states import AlarmState
+from pyhades.alarms.trigger import TriggerType
+from pyhades.alarms.batch import BatchAlarmEvaluator
+from pyhades.dbmodels.tags import Tags
+from pyhades.tests import app
+
+
+class TestBatchAlarms(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self._tag = 'PT-BATCH'
+        self._bool_tag = 'S-BATCH'
+
+        for name in (self._tag, self._bool_tag):
+
+            Tags.create(name=name, unit='Pa', data_type='float', description='Batch evaluated tag', display_name=name)
+
+        self.high = Alarm(name='PT-BATCH-H', tag=self._tag, description='High Pressure')
+        self.high.set_trigger(100.0, TriggerType.H.value)
+        self.low = Alarm(name='PT-BATCH-L', tag=self._tag, description='Low Pressure')
+        self.low.set_trigger(20.0, TriggerType.L.value)
+        self.bool = Alarm(name='S-BATCH-B', tag=self._bool_tag, description='Surge')
+        self.bool.set_trigger(True, TriggerType.B.value)
+
+        for alarm in (self.high, self.low, self.bool):
+
+            app.append_alarm(alarm)
+
+        self.evaluator = BatchAlarmEvaluator([self.high, self.low, self.bool])
+
+        return super().setUp()
+
+    def testFlippedAlarms(self):
+
+        # Every alarm is evaluated on the first pass
+        self.assertEqual(len(self.evaluator.evaluate({self._tag: 50.0, self._bool_tag: False})), 3)
+        self.assertEqual(self.evaluator.evaluate({self._tag: 60.0, self._bool_tag: False}), list())
+
+        self.assertEqual(self.evaluator.evaluate({self._tag: 101.0, self._bool_tag: True}), [self.high, self.bool])
+        self.assertEqual(self.high.state, AlarmState.UNACK)
+        self.assertEqual(self.bool.state, AlarmState.UNACK)
+        self.assertEqual(self.low.state, AlarmState.NORM)
+
+        # Triggered alarms are evaluated once more after their state changed
+        self.assertEqual(self.evaluator.evaluate({self._tag: 102.0, self._bool_tag: True}), [self.high, self.bool])
+        self.assertEqual(self.evaluator.evaluate({self._tag: 103.0, self._bool_tag: True}), list())
+        self.assertEqual(self.high.state, AlarmState.UNACK)
+
+    def testLatestValue(self):
+
+        self.evaluator.evaluate({self._tag: 50.0, self._bool_tag: False})
+        self.evaluator.evaluate({self._tag: 101.0, self._bool_tag: False})
+        self.evaluator.evaluate({self._tag: 102.0, self._bool_tag: False})
+
+        # The condition did not flip, alarms still get the latest value
+        self.assertEqual(self.evaluator.evaluate({self._tag: 150.0}), list())
+        self.assertEqual(self.high.state, AlarmState.UNACK)
+        self.assertEqual(self.high.serialize()["value"], 150.0)
+        self.assertEqual(self.low.serialize()["value"], 150.0)
+        self.assertEqual(self.bool.serialize()["value"], False)
+
+    def testInvalidatedAlarms(self):
+
+        self.evaluator.evaluate({self._tag: 95.0, self._bool_tag: False})
+        self.high.set_trigger(90.0, TriggerType.H.value)
+
+        # The condition did not flip but the trigger changed
+        self.assertEqual(self.evaluator.evaluate({self._tag: 95.0}), [self.high])
+        self.assertEqual(self.high.state, AlarmState.UNACK)
+
+        self.high.reset()
+        self.assertEqual(self.high.state, AlarmState.NORM)
+        self.evaluator.evaluate({self._tag: 95.0})
+        self.assertEqual(self.high.state, AlarmState.UNACK)
+
+    def testNonNumericValues(self):
+
+        self.assertEqual(self.evaluator.evaluate({self._tag: None, self._bool_tag: 'unknown'}), list())
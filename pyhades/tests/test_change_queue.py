@@ -0,0 +1,112 @@
+import queue
+import threading
+import unittest
+from pyhades.tags import CoalescingQueue, TagObserver
+from pyhades.tags.change_queue import DROP_NEWEST, BLOCK
+from pyhades.tests import tag_engine
+
+
+class TestCoalescingQueue(unittest.TestCase):
+
+    def testCoalescedChanges(self):
+
+        changes = CoalescingQueue(maxsize=10)
+
+        for i in range(100):
+
+            changes.put({'tag': 'PT-01', 'value': float(i)})
+            changes.put({'tag': 'PT-02', 'value': float(-i)})
+
+        changes.put({'tag': 'PT-03', 'value': 0.0})
+
+        self.assertEqual(changes.qsize(), 3)
+        self.assertEqual(changes.get_batch(max_items=2), [{'tag': 'PT-01', 'value': 99.0}, {'tag': 'PT-02', 'value': -99.0}])
+        self.assertEqual(changes.get(), {'tag': 'PT-03', 'value': 0.0})
+
+        metrics = changes.get_metrics()
+        self.assertEqual(metrics['put'], 201)
+        self.assertEqual(metrics['coalesced'], 198)
+        self.assertEqual(metrics['delivered'], 3)
+        self.assertAlmostEqual(metrics['coalesce_ratio'], 198 / 201)
+
+        with self.assertRaises(queue.Empty):
+
+            changes.get(timeout=0.01)
+
+    def testOverflowPolicies(self):
+
+        changes = CoalescingQueue(maxsize=2)
+
+        for name in ('A', 'B', 'C'):
+
+            changes.put({'tag': name})
+
+        self.assertEqual([item['tag'] for item in changes.get_batch()], ['B', 'C'])
+        self.assertEqual(changes.get_metrics()['dropped'], 1)
+
+        changes = CoalescingQueue(maxsize=2, policy=DROP_NEWEST)
+
+        for name in ('A', 'B', 'C'):
+
+            changes.put({'tag': name})
+
+        self.assertEqual([item['tag'] for item in changes.get_batch()], ['A', 'B'])
+
+    def testDroppedKeys(self):
+
+        changes = CoalescingQueue(maxsize=2)
+
+        for name in ('A', 'B', 'C', 'D', 'A'):
+
+            changes.put({'tag': name})
+
+        self.assertEqual(changes.get_metrics()['dropped_pending'], 2)
+        self.assertEqual(changes.get_dropped(), ['B', 'C'])
+        self.assertEqual(changes.get_dropped(), [])
+
+        changes = CoalescingQueue(maxsize=1, policy=DROP_NEWEST)
+        changes.put({'tag': 'A'})
+        changes.put({'tag': 'B'})
+
+        self.assertEqual(changes.get_dropped(), ['B'])
+
+    def testBackpressure(self):
+
+        changes = CoalescingQueue(maxsize=1, policy=BLOCK)
+        changes.put({'tag': 'A'})
+
+        with self.assertRaises(queue.Full):
+
+            changes.put({'tag': 'B'}, timeout=0.01)
+
+        producer = threading.Thread(target=changes.put, args=({'tag': 'B'},))
+        producer.start()
+
+        self.assertEqual(changes.get(timeout=1)['tag'], 'A')
+        producer.join(1)
+        self.assertEqual(changes.get(timeout=1)['tag'], 'B')
+
+    def testTagObserverSnapshot(self):
+
+        name = 'test_change_queue_tag'
+
+        if not tag_engine.tag_defined(name):
+
+            tag_engine.set_tag(name, 'Pa', 'float', 'Test Tag Description', name)
+
+        changes = CoalescingQueue()
+        observer = TagObserver(changes)
+        tag_engine.attach(name=name, observer=observer)
+
+        try:
+
+            tag_engine.write_tag(name, 1.0)
+            tag_engine.write_tag(name, 2.0)
+
+        finally:
+
+            tag_engine.detach(name=name, observer=observer)
+
+        item, = changes.get_batch()
+        self.assertEqual(item['value'], 2.0)
+        self.assertIsNotNone(item['timestamp'])
@@ -0,0 +1,101 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from peewee import ModelDelete
+from pyhades.tests import tag_engine
+from pyhades.logger import DataLoggerEngine, QueryLogger
+from pyhades.logger.compression import Compressor, interpolate, DEADBAND, SWINGING_DOOR, STEP, LINEAR
+from pyhades.dbmodels import Tags, TagValue
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.name = 'test_compression_tag'
+        self.start = datetime(2020, 5, 1)
+        self.settings = {'method': DEADBAND, 'deviation': 1.0, 'percent': True, 'max_time': 60}
+
+        if not tag_engine.tag_defined(self.name):
+
+            tag_engine.set_tag(self.name, 'Pa', 'float', 'Test Tag Description', self.name, 0.0, 50.0, compression=self.settings)
+
+        self.tag_id = Tags.read_by_name(self.name).id
+        self.logger = DataLoggerEngine()
+        self.query = QueryLogger()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        ModelDelete(TagValue).where(TagValue.tag == self.tag_id).execute()
+
+        return super().tearDown()
+
+    def testSwingingDoor(self):
+
+        compressor = Compressor(SWINGING_DOOR, deviation=0.05)
+        t = np.arange(3600)
+        y = np.sin(t / 600.0) * 10 + np.random.default_rng(0).uniform(-0.02, 0.02, len(t))
+        timestamps = [self.start + timedelta(seconds=int(second)) for second in t]
+        logged = list()
+
+        for timestamp, value in zip(timestamps, y.tolist()):
+
+            logged.extend(compressor.add(timestamp, value))
+
+        logged.extend(compressor.flush())
+        x = np.array([(timestamp - self.start).total_seconds() for timestamp, _ in logged])
+        rebuilt = interpolate(x, [value for _, value in logged], t, compressor.get_interpolation())
+
+        self.assertEqual(compressor.get_interpolation(), LINEAR)
+        self.assertLessEqual(np.abs(rebuilt - y).max(), 0.05 + 1e-9)
+        self.assertGreater(compressor.get_stats()['ratio'], 10)
+
+    def testDeadbandHeartbeat(self):
+
+        compressor = Compressor(DEADBAND, deviation=0.5, max_time=60)
+        values = [10.0] * 150 + [10.3] * 10 + [12.0] * 40
+        logged = list()
+
+        for second, value in enumerate(values):
+
+            logged.extend(compressor.add(self.start + timedelta(seconds=second), value))
+
+        # First value, heartbeats at 60 s and 120 s, step at 160 s
+        self.assertEqual([(timestamp - self.start).total_seconds() for timestamp, _ in logged], [0, 60, 120, 160])
+        x = np.array([(timestamp - self.start).total_seconds() for timestamp, _ in logged])
+        rebuilt = interpolate(x, [value for _, value in logged], np.arange(len(values)), STEP)
+
+        self.assertLessEqual(np.abs(rebuilt - np.array(values)).max(), 0.5)
+        self.assertEqual(compressor.get_stats()['logged'], 4)
+
+    def testLogValues(self):
+
+        self.assertEqual(tag_engine._cvt.get_tag(self.name).get_compression(), self.settings)
+        self.assertEqual(self.logger.get_compression(self.tag_id).get_deviation(), 0.5)
+
+        # Reset the compressor state left by other tests
+        self.logger.set_compression(self.tag_id, span=50.0, **self.settings)
+        values = [20.0] * 100 + [20.2] * 100 + [25.0] * 100
+        self.logger.log_values([
+            (self.tag_id, value, self.start + timedelta(seconds=second)) for second, value in enumerate(values)
+        ])
+
+        query = TagValue.select().where(TagValue.tag == self.tag_id)
+        deadline = time.monotonic() + 5.0
+
+        while query.count() < 6 and time.monotonic() < deadline:
+
+            time.sleep(0.1)
+
+        # 20.0 at 0 s, heartbeats at 60 s, 120 s and 180 s, step at 200 s, heartbeat at 260 s
+        self.assertEqual(query.count(), 6)
+        self.assertEqual(self.query.query_compression(self.name)[self.name]['ratio'], 50.0)
+
+        start = (self.start + timedelta(seconds=150)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=210)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        result = self.query.query_trends_interpolated(start, stop, self.name, period=30)
+
+        self.assertEqual(result[self.name]['values'].tolist(), [20.2, 20.2, 25.0])
@@ -0,0 +1,123 @@
+import unittest
+import threading
+from pyhades.tests import tag_engine
+from pyhades.status_codes import StatusCode
+
+
+class TestCVTEngine(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        return super().tearDown()
+
+    def testReadWhileWriterHoldsLock(self):
+
+        tag_name = 'test_cvt_read_lock_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name)
+        tag_engine.write_tag(tag_name, 10.0)
+
+        # Simulate a slow writer on the same tag
+        lock = tag_engine._write_locks[hash(tag_name) % len(tag_engine._write_locks)]
+        results = list()
+
+        with lock:
+
+            reader = threading.Thread(target=lambda: results.append(tag_engine.read_tag(tag_name)))
+            reader.start()
+            reader.join(timeout=2.0)
+
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(results, [10.0])
+
+    def testValueSlotIsReplacedOnWrite(self):
+
+        tag_name = 'test_cvt_value_slot_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name, 0.0, 100.0)
+        tag = tag_engine._cvt.get_tag(tag_name)
+        tag_engine.write_tag(tag_name, 10.0)
+        old_slot = tag.value
+        tag_engine.write_tag(tag_name, 20.0)
+
+        self.assertEqual(old_slot.get_value(), 10.0)
+        self.assertEqual(tag.value.get_value(), 20.0)
+        self.assertEqual(tag.value.get_min_value(), 0.0)
+        self.assertEqual(tag.value.get_max_value(), 100.0)
+
+    def testConcurrentReadersAndWriters(self):
+
+        names = [f'test_cvt_concurrent_tag_{i}' for i in range(8)]
+
+        for name in names:
+
+            tag_engine.set_tag(name, 'Pa', 'float', 'Test Tag Description', name)
+
+        errors = list()
+
+        def worker(index):
+
+            name = names[index % len(names)]
+
+            for value in range(200):
+
+                tag_engine.write_tag(name, float(value))
+
+                if tag_engine.read_tag(name) is None:
+
+                    errors.append(name)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+
+        for thread in threads:
+
+            thread.start()
+
+        for thread in threads:
+
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+        for name in names:
+
+            self.assertEqual(tag_engine.read_tag(name), 199.0)
+
+    def testReadTags(self):
+
+        names = ['test_cvt_read_tags_1', 'test_cvt_read_tags_2']
+
+        for name in names:
+
+            tag_engine.set_tag(name, 'm', 'float', 'Test Tag Description', name)
+
+        tag_engine.write_tag(names[0], 1.0)
+        tag_engine.write_tag(names[1], 2.0)
+
+        values = tag_engine.read_tags(names + ['test_cvt_undefined_tag'])
+
+        self.assertEqual(list(values.keys()), names)
+        self.assertEqual(values[names[0]]['value'], 1.0)
+        self.assertEqual(values[names[1]]['value'], 2.0)
+        self.assertEqual(values[names[0]]['status_code'], StatusCode.GOOD)
+        self.assertLessEqual(values[names[0]]['source_timestamp'], values[names[1]]['source_timestamp'])
+
+        values = tag_engine.read_tags(names, unit='cm')
+        self.assertAlmostEqual(values[names[1]]['value'], 200.0, 5)
+
+    def testSnapshotGroup(self):
+
+        tags = [
+            ('test_cvt_group_tag_1', 'Pa', 'float', 'Test Tag Description', 'test_cvt_group_tag_1'),
+            ('test_cvt_group_tag_2', 'Pa', 'float', 'Test Tag Description', 'test_cvt_group_tag_2')
+        ]
+        tag_engine.set_group('test_cvt_group', *tags)
+        tag_engine.write_tag('test_cvt_group_tag_2', 5.0)
+
+        values = tag_engine.snapshot('test_cvt_group')
+
+        self.assertEqual(sorted(values.keys()), ['test_cvt_group_tag_1', 'test_cvt_group_tag_2'])
+        self.assertEqual(values['test_cvt_group_tag_2']['value'], 5.0)
+        self.assertIn('test_cvt_group_tag_2', tag_engine.snapshot())
@@ -1,5 +1,5 @@
 import unittest
-from pyhades.dbmodels import Units, Variables, DataTypes, Tags, AlarmsDB
+from pyhades.dbmodels import Units, Variables, DataTypes, Tags, TagValue, AlarmsDB
 from pyhades.dbmodels import AlarmTypes, AlarmPriorities, AlarmStates
 from pyhades.alarms import Alarm
 
@@ -97,3 +97,16 @@ class TestDBModels(unittest.TestCase):
         }
 
         self.assertEqual(_alarm_result, expected_result)
+
+    def testTagValueIndexMigration(self):
+
+        self.assertIn('tagvalue_tag_id_timestamp', TagValue.get_index_names())
+
+        TagValue.drop_indexes()
+        TagValue.create_table()
+        self.assertNotIn('tagvalue_tag_id_timestamp', TagValue.get_index_names())
+
+        statements = TagValue.create_indexes()
+        self.assertEqual(len(statements), 1)
+        self.assertIn('tagvalue_tag_id_timestamp', TagValue.get_index_names())
+        self.assertEqual(TagValue.create_indexes(), [])
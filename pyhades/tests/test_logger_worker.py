@@ -0,0 +1,58 @@
+import unittest
+import time
+from peewee import fn
+from pyhades.tests import tag_engine
+from pyhades.workers.logger import MicroLoggerWorker
+from pyhades.logger import DataLoggerEngine
+from pyhades.dbmodels import Tags, TagValue
+
+
+class TestMicroLoggerWorker(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        return super().tearDown()
+
+    def testPeriodicSampling(self):
+
+        names = ['test_sampler_tag_1', 'test_sampler_tag_2']
+        tags = list()
+
+        for name in names:
+
+            tag = (name, 'Pa', 'float', 'Test Tag Description', name, None, None, None, None)
+            tag_engine.set_tag(*tag[:5])
+            tag_engine.write_tag(name, 1.0)
+            tags.append(tag)
+
+        worker = MicroLoggerWorker(tags, 0.1)
+        tag_ids = worker.get_tag_ids()
+        worker.daemon = True
+        worker.start()
+        time.sleep(0.55)
+        worker.stop()
+        worker.join(timeout=2.0)
+
+        metrics = worker.get_metrics()
+        self.assertFalse(worker.is_alive())
+        self.assertGreaterEqual(metrics['ticks'], 3)
+        self.assertEqual(metrics['samples'], 2 * metrics['ticks'])
+
+        for name in names:
+
+            tag = Tags.read_by_name(name)
+            rows = TagValue.select().where(TagValue.tag == tag)
+            self.assertGreaterEqual(rows.count(), metrics['ticks'])
+
+        # Each tick logs all group tags with the same timestamp
+        timestamps = (TagValue
+            .select(TagValue.timestamp)
+            .where(TagValue.tag.in_(tag_ids))
+            .group_by(TagValue.timestamp)
+            .having(fn.COUNT(TagValue.id) == 2))
+        self.assertEqual(timestamps.count(), metrics['ticks'])
+        self.assertFalse(set(tag_ids) & DataLoggerEngine().get_sampled_tags())
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from playhouse.pool import PooledSqliteDatabase
+from pyhades.dbmodels import use_connection
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.directory = tempfile.mkdtemp()
+        self.db = PooledSqliteDatabase(os.path.join(self.directory, 'pool.db'), max_connections=2, stale_timeout=300, timeout=1, check_same_thread=False)
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        self.db.close_all()
+        shutil.rmtree(self.directory)
+
+        return super().tearDown()
+
+    def testConnectionReleased(self):
+
+        with use_connection(self.db):
+
+            connection = self.db.connection()
+
+            with use_connection(self.db):
+
+                # Nested blocks share the connection
+                self.assertIs(self.db.connection(), connection)
+
+            self.assertFalse(self.db.is_closed())
+
+        self.assertTrue(self.db.is_closed())
+
+        connections = list()
+
+        def read():
+
+            with use_connection(self.db):
+
+                connections.append(self.db.connection())
+                self.db.execute_sql('SELECT 1')
+
+        # Threads one after the other reuse the pooled connection
+        for _ in range(3):
+
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join()
+
+        self.assertTrue(all(_connection is connection for _connection in connections))
+
+    def testConcurrentReaders(self):
+
+        barrier = threading.Barrier(2)
+        connections = list()
+
+        def read():
+
+            with use_connection(self.db):
+
+                connections.append(self.db.connection())
+                barrier.wait(timeout=5)
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+
+        for thread in threads:
+
+            thread.start()
+
+        for thread in threads:
+
+            thread.join()
+
+        # Concurrent readers get their own connection
+        self.assertIsNot(connections[0], connections[1])
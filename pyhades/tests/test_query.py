@@ -0,0 +1,224 @@
+import os
+import time
+import gzip
+import tempfile
+import unittest
+import numpy as np
+from datetime import datetime, timedelta
+from pyhades.tests import tag_engine
+from pyhades.logger import QueryLogger
+from pyhades.dbmodels import Tags, TagValue
+from pyhades.logger.downsampling import lttb, BUCKETS, LTTB
+from pyhades.logger.export import Exporter
+
+
+class TestQueryLogger(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.names = ['test_query_tag_1', 'test_query_tag_2']
+        self.start = datetime(2023, 1, 1, 0, 0, 0)
+        rows = list()
+
+        for index, name in enumerate(self.names):
+
+            if not tag_engine.tag_defined(name):
+
+                tag_engine.set_tag(name, 'Pa', 'float', 'Test Tag Description', name)
+
+            tag_id = Tags.read_by_name(name).id
+
+            if TagValue.select().where(TagValue.tag == tag_id).count():
+
+                continue
+
+            for second in range(5):
+
+                timestamp = self.start + timedelta(seconds=second, microseconds=500000 * index)
+                rows.append((tag_id, float(10 * index + second), timestamp))
+
+        if rows:
+
+            TagValue.insert_many(rows, fields=[TagValue.tag, TagValue.value, TagValue.timestamp]).execute()
+
+        self.query = QueryLogger()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        return super().tearDown()
+
+    def testQueryTrends(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=3)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        result = self.query.query_trends(start, stop, *self.names, 'test_query_undefined_tag')
+
+        self.assertEqual(result[self.names[0]]['unit'], 'Pa')
+        self.assertEqual(result[self.names[0]]['values'], [
+            {"x": "2023-01-01 00:00:01.000000", "y": 1.0},
+            {"x": "2023-01-01 00:00:02.000000", "y": 2.0}
+        ])
+        self.assertEqual(result[self.names[1]]['values'], [
+            {"x": "2023-01-01 00:00:00.500000", "y": 10.0},
+            {"x": "2023-01-01 00:00:01.500000", "y": 11.0},
+            {"x": "2023-01-01 00:00:02.500000", "y": 12.0}
+        ])
+        self.assertEqual(result['test_query_undefined_tag']['values'], [])
+
+    def testQueryTrendsEpoch(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=2)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        # Naive timestamps are UTC whatever the host time zone is
+        t0 = 1672531200000
+        tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/Caracas'
+        time.tzset()
+
+        try:
+
+            result = self.query.query_trends(start, stop, self.names[1], epoch_ms=True)
+            arrays = self.query.query_trends_arrays(start, stop, self.names[1])
+
+        finally:
+
+            if tz is None:
+
+                del os.environ['TZ']
+
+            else:
+
+                os.environ['TZ'] = tz
+
+            time.tzset()
+
+        self.assertEqual(result[self.names[1]]['values'], [
+            {"x": t0 + 500, "y": 10.0},
+            {"x": t0 + 1500, "y": 11.0}
+        ])
+        self.assertEqual([value["x"] for value in result[self.names[1]]['values']], (arrays[self.names[1]]['timestamps'] // 1000000).tolist())
+
+    def testQueryTrendsBuckets(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=4)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        result = self.query.query_trends(start, stop, self.names[0], max_points=2, method=BUCKETS)
+
+        self.assertEqual(result[self.names[0]]['values'], [
+            {"x": "2023-01-01 00:00:00.000000", "y": 0.5, "min": 0.0, "max": 1.0, "count": 2},
+            {"x": "2023-01-01 00:00:02.000000", "y": 2.5, "min": 2.0, "max": 3.0, "count": 2}
+        ])
+
+    def testQueryTrendsLTTB(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=5)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        result = self.query.query_trends(start, stop, *self.names, max_points=3, method=LTTB)
+
+        values = result[self.names[1]]['values']
+        self.assertEqual(len(values), 3)
+        self.assertEqual(values[0], {"x": "2023-01-01 00:00:00.500000", "y": 10.0})
+        self.assertEqual(values[-1], {"x": "2023-01-01 00:00:04.500000", "y": 14.0})
+
+    def testLTTB(self):
+
+        x = np.arange(100)
+        y = np.zeros(100)
+        y[42] = 100.0
+
+        indexes = lttb(x, y, 10)
+
+        self.assertEqual(len(indexes), 10)
+        self.assertEqual(indexes[0], 0)
+        self.assertEqual(indexes[-1], 99)
+        self.assertIn(42, indexes)
+
+    def testQueryTrendsArrays(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=3)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        result = self.query.query_trends_arrays(start, stop, *self.names, 'test_query_undefined_tag')
+        timestamps = result[self.names[1]]['timestamps']
+
+        self.assertEqual(result[self.names[1]]['unit'], 'Pa')
+        self.assertEqual(timestamps.dtype, np.int64)
+        self.assertEqual(
+            timestamps.astype('datetime64[ns]').tolist(),
+            np.array(['2023-01-01T00:00:00.5', '2023-01-01T00:00:01.5', '2023-01-01T00:00:02.5'], dtype='datetime64[ns]').tolist()
+        )
+        self.assertEqual(result[self.names[1]]['values'].tolist(), [10.0, 11.0, 12.0])
+        self.assertEqual(result[self.names[0]]['values'].tolist(), [1.0, 2.0])
+        self.assertEqual(len(result['test_query_undefined_tag']['values']), 0)
+
+    def testStream(self):
+
+        chunks = list(TagValue.stream(self.start, self.start + timedelta(seconds=5), tags=self.names, chunk_size=3, include_start=True))
+        rows = [row for chunk in chunks for row in chunk]
+
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+        self.assertEqual([value for _, _, _, value in rows], [0.0, 10.0, 1.0, 11.0, 2.0, 12.0, 3.0, 13.0, 4.0, 14.0])
+
+        # Bounds are excluded by default, as in query_trends
+        chunks = list(TagValue.stream(self.start, self.start + timedelta(seconds=4), tags=self.names, chunk_size=3))
+        rows = [row for chunk in chunks for row in chunk]
+
+        self.assertEqual([value for _, _, _, value in rows], [10.0, 1.0, 11.0, 2.0, 12.0, 3.0, 13.0])
+
+        chunks = list(TagValue.stream(self.start, self.start + timedelta(seconds=5), tags=self.names, chunk_size=3, by_tag=True, include_start=True))
+        rows = [row for chunk in chunks for row in chunk]
+
+        self.assertEqual([value for _, _, _, value in rows], [0.0, 1.0, 2.0, 3.0, 4.0, 10.0, 11.0, 12.0, 13.0, 14.0])
+
+    def testStreamTrends(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=2)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        chunks = list(self.query.stream_trends(start, stop, *self.names, chunk_size=2))
+
+        # Same rows as query_trends, bounds are excluded
+        self.assertEqual(chunks, [
+            {
+                self.names[0]: [{"x": "2023-01-01 00:00:01.000000", "y": 1.0}],
+                self.names[1]: [{"x": "2023-01-01 00:00:00.500000", "y": 10.0}]
+            },
+            {
+                self.names[1]: [{"x": "2023-01-01 00:00:01.500000", "y": 11.0}]
+            }
+        ])
+        trends = self.query.query_trends(start, stop, *self.names)
+
+        for name in self.names:
+
+            self.assertEqual([value for chunk in chunks for value in chunk.get(name, [])], trends[name]['values'])
+
+    def testExport(self):
+
+        exporter = Exporter(chunk_size=2)
+        expected = (
+            "timestamp,test_query_tag_2,test_query_tag_1\r\n"
+            "2023-01-01 00:00:00.0,,0.0\r\n"
+            "2023-01-01 00:00:00.5,10.0,\r\n"
+            "2023-01-01 00:00:01.0,,1.0\r\n"
+        )
+
+        result = exporter.to_string(self.start, self.start + timedelta(seconds=1), tags=self.names[::-1])
+
+        self.assertEqual(result, expected)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            filename = os.path.join(directory, 'export.csv.gz')
+            rows = exporter.to_csv(filename, self.start, self.start + timedelta(seconds=1), tags=self.names[::-1])
+
+            with gzip.open(filename, 'rt', newline='') as f:
+
+                self.assertEqual(f.read(), expected)
+
+        self.assertEqual(rows, 3)
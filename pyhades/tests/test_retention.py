@@ -0,0 +1,66 @@
+import unittest
+from datetime import datetime, timedelta
+from peewee import ModelDelete
+from pyhades.tests import tag_engine
+from pyhades.logger import DataLoggerEngine, LogTable
+from pyhades.logger.retention import Retention
+from pyhades.dbmodels import Tags, TagValue
+
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.names = ['test_retention_tag_1', 'test_retention_tag_2', 'test_retention_tag_3']
+        self.now = datetime(2024, 1, 10)
+        self.tag_ids = list()
+        rows = list()
+
+        for name in self.names:
+
+            if not tag_engine.tag_defined(name):
+
+                tag_engine.set_tag(name, 'Pa', 'float', 'Test Tag Description', name)
+
+            tag_id = Tags.read_by_name(name).id
+            self.tag_ids.append(tag_id)
+
+            for hours in range(0, 24 * 5, 12):
+
+                rows.append((tag_id, float(hours), self.now - timedelta(hours=hours)))
+
+        TagValue.insert_many(rows, fields=[TagValue.tag, TagValue.value, TagValue.timestamp]).execute()
+        self.db = DataLoggerEngine().get_db()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        ModelDelete(TagValue).where(TagValue.tag.in_(self.tag_ids)).execute()
+
+        return super().tearDown()
+
+    def count(self, tag_id:int)->int:
+
+        return TagValue.select().where(TagValue.tag == tag_id).count()
+
+    def testApply(self):
+
+        table = LogTable()
+        table.add_tag(self.names[1], 'Pa', 'float', '', '', None, None, None, None, 0.5)
+        retention = Retention(self.db, tags={self.names[0]: 1}, groups={0.5: 2}, table=table, batch_size=2)
+
+        result = retention.apply(now=self.now)
+
+        self.assertEqual(result, {'partitions': [], 'deleted': 7 + 5})
+        # Values of the last day and of the last two days are kept, bounds included
+        self.assertEqual(self.count(self.tag_ids[0]), 3)
+        self.assertEqual(self.count(self.tag_ids[1]), 5)
+        # No retention
+        self.assertEqual(self.count(self.tag_ids[2]), 10)
+
+    def testPartitionCutoff(self):
+
+        self.assertIsNone(Retention(self.db).get_partition_cutoff(self.now))
+        self.assertEqual(Retention(self.db, days=30, tags={'test': 90}).get_partition_cutoff(self.now), self.now - timedelta(days=90))
+        self.assertIsNone(Retention(self.db, days=30, tags={'test': None}).get_partition_cutoff(self.now))
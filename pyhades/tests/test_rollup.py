@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime, timedelta
+from peewee import ModelDelete
+from pyhades.tests import tag_engine
+from pyhades.logger import DataLoggerEngine, QueryLogger
+from pyhades.logger.rollup import Rollup
+from pyhades.dbmodels import Tags, TagValue, TagRollup, RollupWatermark
+
+
+class TestRollup(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.name = 'test_rollup_tag'
+        self.start = datetime(2021, 3, 1)
+
+        if not tag_engine.tag_defined(self.name):
+
+            tag_engine.set_tag(self.name, 'Pa', 'float', 'Test Tag Description', self.name)
+
+        self.tag_id = Tags.read_by_name(self.name).id
+        # One value every 10 seconds during 2 hours
+        rows = [(self.tag_id, float(i), self.start + timedelta(seconds=10 * i)) for i in range(720)]
+        TagValue.insert_many(rows, fields=[TagValue.tag, TagValue.value, TagValue.timestamp]).execute()
+
+        self.logger = DataLoggerEngine()
+        self.rollup = Rollup(self.logger.get_db(), resolutions=(60, 3600), delay=0)
+        self.query = QueryLogger()
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        self.logger.set_rollup(None)
+        ModelDelete(TagValue).where(TagValue.tag == self.tag_id).execute()
+        ModelDelete(TagRollup).execute()
+        ModelDelete(RollupWatermark).execute()
+
+        return super().tearDown()
+
+    def testUpdate(self):
+
+        now = self.start + timedelta(hours=2, seconds=30)
+
+        self.assertEqual(self.rollup.update(now=now), {60: 120, 3600: 2})
+        self.assertEqual(self.rollup.get_watermark(3600), self.start + timedelta(hours=2))
+
+        hour = (TagRollup
+            .select()
+            .where((TagRollup.tag == self.tag_id) & (TagRollup.resolution == 3600))
+            .order_by(TagRollup.bucket)
+            .first())
+
+        self.assertEqual(
+            (hour.bucket, hour.min, hour.max, hour.avg, hour.count, hour.first, hour.last),
+            (self.start, 0.0, 359.0, 179.5, 360, 0.0, 359.0)
+        )
+        # Idempotent
+        self.assertEqual(self.rollup.update(now=now), {60: 0, 3600: 0})
+        ModelDelete(RollupWatermark).execute()
+        self.assertEqual(self.rollup.update(now=now), {60: 120, 3600: 2})
+        self.assertEqual(TagRollup.select().where(TagRollup.tag == self.tag_id).count(), 122)
+
+    def testQueryRouting(self):
+
+        self.rollup.update(now=self.start + timedelta(hours=2))
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(hours=2)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        raw = self.query.query_trends(start, stop, self.name, max_points=2, method='buckets')
+        self.logger.set_rollup(self.rollup)
+        routed = self.query.query_trends(start, stop, self.name, max_points=2, method='buckets')
+
+        self.assertEqual(self.rollup.route(self.start, self.start + timedelta(hours=2), 3600000000), (3600, self.start, self.start + timedelta(hours=2)))
+        self.assertIsNone(self.rollup.route(self.start, self.start + timedelta(hours=2), 30000000))
+        self.assertEqual(routed, raw)
+        self.assertEqual(routed[self.name]['values'][0], {"x": "2021-03-01 00:00:00.000000", "y": 179.5, "min": 0.0, "max": 359.0, "count": 360})
@@ -0,0 +1,107 @@
+import os
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from peewee import SqliteDatabase, ModelDelete, OperationalError
+from pyhades.tests import tag_engine, dbfile
+from pyhades.logger import QueryLogger
+from pyhades.dbmodels import proxy, use_read_db, Tags, TagValue
+from pyhades.dbmodels.core import SQLITE_READ_PRAGMAS
+
+
+class TestDatabaseRouter(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.name = 'test_router_tag'
+        self.start = datetime(2018, 1, 1)
+
+        if not tag_engine.tag_defined(self.name):
+
+            tag_engine.set_tag(self.name, 'Pa', 'float', 'Test Tag Description', self.name)
+
+        self.tag_id = Tags.read_by_name(self.name).id
+        rows = [(self.tag_id, float(i), self.start + timedelta(seconds=i)) for i in range(10)]
+        TagValue.insert_many(rows, fields=[TagValue.tag, TagValue.value, TagValue.timestamp]).execute()
+        self.read_db = SqliteDatabase(f"file:{os.path.abspath(dbfile)}?mode=ro", uri=True, pragmas=SQLITE_READ_PRAGMAS)
+        proxy.set_read_db(self.read_db)
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        proxy.set_read_db(None)
+        self.read_db.close()
+        ModelDelete(TagValue).where(TagValue.tag == self.tag_id).execute()
+
+        return super().tearDown()
+
+    def testReadOnlyConnection(self):
+
+        with use_read_db():
+
+            self.assertIs(proxy.get_database(), self.read_db)
+            self.assertEqual(TagValue.select().where(TagValue.tag == self.tag_id).count(), 10)
+
+            with self.assertRaises(OperationalError):
+
+                TagValue.create(tag=self.tag_id, value=0.0)
+
+        # Writes outside the block go to the primary database
+        self.assertIs(proxy.get_database(), proxy.obj)
+        TagValue.create(tag=self.tag_id, value=10.0, timestamp=self.start + timedelta(seconds=10))
+
+    def testQueryLogger(self):
+
+        start = self.start.strftime('%Y-%m-%d %H:%M:%S.%f')
+        stop = (self.start + timedelta(seconds=5)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        result = QueryLogger().query_trends_arrays(start, stop, self.name)
+
+        self.assertEqual(result[self.name]['values'].tolist(), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(self.read_db.is_closed(), False)
+
+    def testUnreachableReadDatabase(self):
+
+        read_db = SqliteDatabase(os.path.join(os.path.dirname(os.path.abspath(dbfile)), 'missing', 'replica.db'))
+        proxy.set_read_db(read_db, max_lag=5.0, check_interval=0.0)
+
+        # Reads fall back to the primary database
+        with use_read_db():
+
+            self.assertIs(proxy.get_database(), proxy.obj)
+            self.assertEqual(TagValue.select().where(TagValue.tag == self.tag_id).count(), 10)
+
+        self.assertFalse(proxy.get_status()['healthy'])
+
+        proxy.set_read_db(self.read_db, max_lag=5.0, check_interval=0.0)
+
+        with use_read_db():
+
+            self.assertIs(proxy.get_database(), self.read_db)
+
+        self.assertTrue(proxy.get_status()['healthy'])
+
+    def testReplicationLag(self):
+
+        proxy.set_read_db(self.read_db, max_lag=5.0, check_interval=3600.0)
+
+        with mock.patch('pyhades.dbmodels.core.get_replication_lag', return_value=30.0):
+
+            with use_read_db():
+
+                self.assertIs(proxy.get_database(), proxy.obj)
+
+        self.assertEqual(proxy.get_status()['lag'], 30.0)
+
+        with mock.patch('pyhades.dbmodels.core.get_replication_lag', return_value=1.0):
+
+            # The lag is checked again after check_interval only
+            with use_read_db():
+
+                self.assertIs(proxy.get_database(), proxy.obj)
+
+            proxy.set_read_db(self.read_db, max_lag=5.0, check_interval=3600.0)
+
+            with use_read_db():
+
+                self.assertIs(proxy.get_database(), self.read_db)
@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from peewee import SqliteDatabase, ModelDelete
+from pyhades.tests import app, tag_engine
+from pyhades.workers import TagWriterWorker
+from pyhades.logger.spool import Spool, HEADER, RECORD
+from pyhades.dbmodels import proxy, Tags, TagValue
+
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.directory = tempfile.mkdtemp()
+        self.start = datetime(2019, 1, 1)
+        self.samples = [(1, float(i), self.start + timedelta(seconds=i)) for i in range(100)]
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        shutil.rmtree(self.directory)
+
+        return super().tearDown()
+
+    def testAppendReplay(self):
+
+        spool = Spool(self.directory, segment_size=len(HEADER) + 30 * RECORD.size)
+        spool.append(self.samples[:50])
+        spool.append(self.samples[50:])
+
+        self.assertEqual(spool.get_metrics()['segments'], 4)
+        self.assertEqual(spool.get_pending(), 100)
+
+        batches = list()
+        spool.replay(batches.append, batch_size=40)
+
+        self.assertEqual([len(batch) for batch in batches], [40, 40, 20])
+        self.assertEqual([sample for batch in batches for sample in batch], self.samples)
+        self.assertEqual(spool.get_pending(), 0)
+        self.assertEqual(spool.get_metrics()['segments'], 1)
+
+        spool.close()
+
+        self.assertEqual(Spool(self.directory).get_pending(), 0)
+
+    def testFailedReplay(self):
+
+        spool = Spool(self.directory)
+        spool.append(self.samples[:10])
+
+        def fail(batch):
+
+            raise ConnectionError("database is down")
+
+        with self.assertRaises(ConnectionError):
+
+            spool.replay(fail, batch_size=4)
+
+        spool.close()
+        # The replay position survives a restart
+        spool = Spool(self.directory)
+        batches = list()
+        spool.replay(batches.append)
+
+        self.assertEqual(batches, [self.samples[:10]])
+
+    def testCorruptedRecords(self):
+
+        spool = Spool(self.directory)
+        spool.append(self.samples[:3])
+        spool.close()
+        path = os.path.join(self.directory, '000000000000.spool')
+
+        with open(path, 'r+b') as f:
+
+            # Corrupts the value of the second record and leaves a partial record at the end
+            f.seek(len(HEADER) + RECORD.size + 20)
+            f.write(b'\xff')
+            f.seek(0, os.SEEK_END)
+            f.write(b'\x00' * 5)
+
+        spool = Spool(self.directory)
+        batches = list()
+        spool.replay(batches.append)
+
+        self.assertEqual(batches, [[self.samples[0], self.samples[2]]])
+        self.assertEqual(spool.get_metrics()['corrupt'], 1)
+
+    def testMaxSize(self):
+
+        segment_size = len(HEADER) + 10 * RECORD.size
+        spool = Spool(self.directory, segment_size=segment_size, max_size=3 * segment_size)
+        spool.append(self.samples)
+        metrics = spool.get_metrics()
+
+        self.assertLessEqual(metrics['size'], 3 * segment_size)
+        self.assertEqual(metrics['dropped'], 70)
+
+        batches = list()
+        spool.replay(batches.append)
+
+        self.assertEqual(batches[0][0], self.samples[70])
+
+    def testWriterOutage(self):
+
+        tag_name = 'test_spool_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name)
+        tag_id = Tags.read_by_name(tag_name).id
+        manager = app.get_db_manager()
+        manager.set_spool(Spool(self.directory))
+        manager.set_retry_interval(0.0)
+
+        try:
+
+            writer = TagWriterWorker(manager)
+
+        finally:
+
+            manager.set_spool(None)
+            manager.set_retry_interval(5.0)
+
+        samples = [(tag_id, float(i), self.start + timedelta(seconds=i)) for i in range(6)]
+        db = proxy.obj
+        # Stops the database, a stand-in that can not be opened
+        proxy.initialize(SqliteDatabase(os.path.join(self.directory, 'missing', 'app.db')))
+
+        try:
+
+            writer.flush(samples[:2])
+            writer.flush(samples[2:4])
+
+        finally:
+
+            proxy.initialize(db)
+
+        self.assertEqual(writer.get_metrics()['spooled'], 4)
+        self.assertEqual(writer.get_metrics()['spool']['pending'], 4)
+
+        writer.flush(samples[4:])
+        query = TagValue.select(TagValue.value).where(TagValue.tag == tag_id).order_by(TagValue.id)
+
+        self.assertEqual([row.value for row in query], [float(i) for i in range(6)])
+        self.assertEqual(writer.get_metrics()['spool']['pending'], 0)
+
+        ModelDelete(TagValue).where(TagValue.tag == tag_id).execute()
+
+    def testReplayInvalidRecord(self):
+
+        tag_name = 'test_spool_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name)
+        tag_id = Tags.read_by_name(tag_name).id
+        missing_id = Tags.select().count() + 1000
+        manager = app.get_db_manager()
+        spool = Spool(self.directory)
+        manager.set_spool(spool)
+        manager.set_retry_interval(0.0)
+
+        try:
+
+            writer = TagWriterWorker(manager)
+
+        finally:
+
+            manager.set_spool(None)
+            manager.set_retry_interval(5.0)
+
+        # A value of a deleted tag is spooled during an outage, the replay skips it
+        samples = [(tag_id, float(i), self.start + timedelta(seconds=i)) for i in range(4)]
+        spool.append(samples[:2] + [(missing_id, 0.0, self.start)] + samples[2:3])
+        writer.flush(samples[3:])
+        query = TagValue.select(TagValue.value).where(TagValue.tag == tag_id).order_by(TagValue.id)
+
+        self.assertEqual([row.value for row in query], [float(i) for i in range(4)])
+        self.assertEqual(writer.get_metrics()['invalid'], 1)
+        self.assertEqual(writer.get_metrics()['spool']['pending'], 0)
+
+        # Batches rejected because of their data are not spooled
+        writer.flush([(missing_id, 1.0, self.start), (tag_id, 4.0, self.start + timedelta(seconds=4))])
+
+        self.assertEqual(writer.get_metrics()['invalid'], 2)
+        self.assertEqual(writer.get_metrics()['written'], 5)
+        self.assertEqual(writer.get_metrics()['spooled'], 0)
+        self.assertEqual(writer.get_metrics()['spool']['pending'], 0)
+
+        ModelDelete(TagValue).where(TagValue.tag == tag_id).execute()
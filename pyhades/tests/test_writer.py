@@ -0,0 +1,109 @@
+import unittest
+import time
+from datetime import datetime
+from unittest import mock
+from pyhades.tests import app, tag_engine
+from pyhades.logger import DataLoggerEngine
+from pyhades.workers import TagWriterWorker
+from pyhades.dbmodels import Tags, TagValue
+
+
+class TestTagWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        return super().setUp()
+
+    def tearDown(self) -> None:
+
+        return super().tearDown()
+
+    def testWriteBehind(self):
+
+        tag_name = 'test_writer_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name)
+        writer = app.get_writer()
+        self.assertTrue(writer.is_alive())
+
+        for value in range(10):
+
+            tag_engine.write_tag(tag_name, float(value))
+
+        tag = Tags.read_by_name(tag_name)
+        query = TagValue.select().where(TagValue.tag == tag)
+        deadline = time.monotonic() + 5.0
+
+        while query.count() < 10 and time.monotonic() < deadline:
+
+            time.sleep(0.1)
+
+        self.assertEqual([row.value for row in query.order_by(TagValue.id)], [float(value) for value in range(10)])
+        self.assertEqual(writer.get_metrics()['dropped'], 0)
+
+    def testDroppedAndRejectedSamples(self):
+
+        manager = app.get_db_manager()
+        queue_size = manager.get_queue_size()
+        manager.set_queue_size(2)
+
+        try:
+
+            writer = TagWriterWorker(manager)
+
+        finally:
+
+            manager.set_queue_size(queue_size)
+
+        tag_name = 'test_writer_dropped_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name)
+        tag_id = Tags.read_by_name(tag_name).id
+
+        self.assertTrue(writer.put(tag_id, 1.0))
+        self.assertTrue(writer.put(tag_id, 2.0))
+        self.assertFalse(writer.put(tag_id, 3.0))
+        self.assertFalse(writer.put(tag_id, 'not a number'))
+
+        metrics = writer.get_metrics()
+        self.assertEqual(metrics['queue_depth'], 2)
+        self.assertEqual(metrics['dropped'], 1)
+        self.assertEqual(metrics['rejected'], 1)
+
+        writer._drain()
+
+        metrics = writer.get_metrics()
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['written'], 2)
+        self.assertEqual(metrics['flushes'], 1)
+        self.assertEqual(TagValue.select().where(TagValue.tag == tag_id).count(), 2)
+
+    def testStoppingWriter(self):
+
+        writer = TagWriterWorker(app.get_db_manager())
+        tag_name = 'test_writer_stopping_tag'
+        tag_engine.set_tag(tag_name, 'Pa', 'float', 'Test Tag Description', tag_name)
+        tag_id = Tags.read_by_name(tag_name).id
+
+        # Once the writer is stopping, samples are not enqueued behind its last drain
+        writer.get_stop_event().set()
+
+        self.assertFalse(writer.put(tag_id, 1.0))
+        self.assertEqual(writer.get_queue_depth(), 0)
+        self.assertEqual(writer.get_metrics()['dropped'], 0)
+
+        # The logger engine writes them through the DB actor instead
+        engine = DataLoggerEngine()
+        running = engine.get_writer()
+        engine.set_writer(writer)
+
+        try:
+
+            with mock.patch.object(writer, 'is_alive', return_value=True):
+
+                future = engine.write_values([(tag_id, 2.0, datetime.now())])
+
+        finally:
+
+            engine.set_writer(running)
+
+        self.assertTrue(future.result(timeout=5))
+        self.assertEqual([row.value for row in TagValue.select().where(TagValue.tag == tag_id)], [2.0])
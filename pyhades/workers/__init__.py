@@ -1,4 +1,9 @@
 from .logger import LoggerWorker
 from .continuos import _ContinuosWorker
 from .state_machine import StateMachineWorker
-from .alarms import AlarmWorker
\ No newline at end of file
+from .alarms import AlarmWorker
+from .writer import TagWriterWorker
+from .archive import ArchiveWorker
+from .rollup import RollupWorker
+from .retention import RetentionWorker
+from .journal import AlarmJournalWorker
\ No newline at end of file
@@ -4,58 +4,83 @@
 This module implements Alarm Worker.
 """
 import logging
-import time
-from ..alarms import AlarmState
 from datetime import datetime
-from ..dbmodels import AlarmLogging as AlarmModel
+from ..dbmodels import use_connection
 
 from .worker import BaseWorker
+from ..utils import log_detailed
 
 
 class AlarmWorker(BaseWorker):
+    r"""
+    Evaluates alarms when their tags change.
 
-    def __init__(self, manager, period=1.0):
+    The worker blocks on the tag change queue of the alarm manager until a tag
+    changes or the next shelved alarm is due, so alarms are annunciated as soon
+    as their tags change and the worker does not wake up while nothing happens.
+
+    **Parameters**
+
+    * **manager** (AlarmManager): Alarm manager
+    * **period** (float)[Optional]: Max seconds the worker waits without checking shelved alarms, not bounded by default
+    """
+
+    def __init__(self, manager, period:float=None):
 
         super(AlarmWorker, self).__init__()
-        
+
         self._manager = manager
         self._period = period
 
         self._manager.attach_all()
 
+    def get_timeout(self)->float:
+        r"""
+        Returns the seconds until the next shelved alarm is due, None if no alarm is shelved until a given time
+        """
+        deadline = self._manager.get_next_deadline()
+        timeout = self._period
+
+        if deadline is not None:
+
+            remaining = max((deadline - datetime.now()).total_seconds(), 0.0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        return timeout
+
+    def stop(self):
+
+        self.stop_event.set()
+        self._manager.get_queue().interrupt()
+
     def run(self):
 
         _queue = self._manager.get_queue()
 
-        while True:
+        while not self.stop_event.is_set():
+
+            items = _queue.get_batch(timeout=self.get_timeout())
+
+            try:
 
-            time.sleep(self._period)
+                with use_connection():
 
-            for _, _alarm in self._manager._alarms.items():
+                    self._manager.unshelve_expired()
+                    tags = [item["tag"] for item in items]
+                    dropped = _queue.get_dropped()
 
-                if _alarm.state == AlarmState.SHLVD:
+                    if dropped:
 
-                    _now = datetime.now()
-                    if _alarm._shelved_until:
-                        
-                        if _now >= _alarm._shelved_until:
-                            
-                            AlarmModel.create(
-                                name=_alarm.name,
-                                state=_alarm.state.state,
-                                priority=_alarm._priority,
-                                value=_alarm._value
-                            )
-                            _alarm.unshelve()
+                        # Alarms evaluate the current CVT value, so dropped changes are not missed
+                        logging.warning(f"Alarm Worker: Changes of {len(dropped)} tags dropped on queue overflow, evaluating them again")
+                        tags = list(dict.fromkeys(tags + dropped))
 
-            while not _queue.empty():
+                    if tags:
 
-                item = _queue.get()
-                
-                _tag = item["tag"]
-                self._manager.execute(_tag)
+                        self._manager.evaluate(tags)
 
-            if self.stop_event.is_set():
-                break
+            except Exception as e:
+                message = "Alarm Worker: Error evaluating alarms"
+                log_detailed(e, message)
 
-        logging.info("Alarm worker shutdown successfully!")
\ No newline at end of file
+        logging.info("Alarm worker shutdown successfully!")
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""pyhades/workers/archive.py
+
+This module implements Archive Worker, it moves old tag values
+from the database to the columnar archive.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from ..logger.engine import DataLoggerEngine
+from .worker import BaseWorker
+from ..dbmodels import use_connection
+from ..utils import log_detailed
+
+
+class ArchiveWorker(BaseWorker):
+    r"""
+    Periodically archives whole days of tag values older than *age*.
+
+    **Parameters**
+
+    * **archive** (Archive): Columnar archive
+    * **age** (timedelta): Values older than this age are moved to the archive
+    * **period** (float): Seconds between two archiving runs
+    """
+
+    def __init__(self, archive, age:timedelta, period:float=3600.0):
+
+        super(ArchiveWorker, self).__init__()
+
+        self._archive = archive
+        self._age = age
+        self._period = period
+        self._logger = DataLoggerEngine()
+        self._archived = 0
+
+    def get_archived(self)->int:
+        r"""
+        Returns the number of tag values archived since the worker started
+        """
+        return self._archived
+
+    def run(self):
+
+        self._logger.set_archive(self._archive)
+
+        while not self.stop_event.is_set():
+
+            try:
+
+                before = datetime.now() - self._age
+
+                with use_connection():
+
+                    self._archived += self._archive.archive(self._logger.get_db(), before)
+
+            except Exception as e:
+                message = "Archive: Error archiving tag values"
+                log_detailed(e, message)
+
+            self.stop_event.wait(self._period)
+
+        logging.info("Archive worker shutdown successfully!")
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""pyhades/workers/journal.py
+
+This module implements Alarm Journal Worker, which persists
+alarm events in bulk and notifies them to the UI.
+"""
+import time
+import logging
+import threading
+import concurrent.futures
+
+from ..dbmodels import use_connection
+from ..alarms.journal import AlarmJournal, TRANSITION, NOTIFY
+from .worker import BatchWorker
+from ..utils import log_detailed
+
+
+class AlarmJournalWorker(BatchWorker):
+    r"""
+    Drains alarm events published in the alarm journal.
+
+    Alarm transitions only enqueue an event, this worker takes them out in batches and
+    persists each batch with *AlarmJournal.write* in a single transaction. A batch is flushed
+    when it reaches *flush_size* events or when *flush_interval* seconds elapsed since its first event.
+
+    UI notifications are debounced, alarms changed meanwhile are notified with their latest state
+    at most once every *debounce* seconds, along with the alarm summary if any alarm had a transition.
+    Notifications are emitted by their own thread, so a slow UI or comments service does not delay
+    persistence, while a notification is emitted the following changes keep being folded.
+
+    **Parameters**
+
+    * **flush_size** (int): Max events written in a transaction
+    * **flush_interval** (float): Max seconds an event waits to be written
+    * **debounce** (float): Min seconds between UI notifications
+    """
+
+    def __init__(self, flush_size:int=500, flush_interval:float=0.5, debounce:float=1.0):
+
+        super(AlarmJournalWorker, self).__init__(flush_size=flush_size, flush_interval=flush_interval)
+
+        self._journal = AlarmJournal()
+        self._debounce = debounce
+        self._put_lock = threading.Lock()
+        self._pending = dict()
+        self._pending_summary = False
+        self._notified_at = 0.0
+        self._notifier = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._notifying = None
+
+        self._published = 0
+        self._written = 0
+        self._failed = 0
+        self._notifications = 0
+
+    def put(self, event)->bool:
+        r"""
+        Enqueues an alarm event, never blocks
+
+        **Parameters**
+
+        * **event** (AlarmEvent)
+
+        **Returns**
+
+        * **enqueued** (bool): False if the worker is stopping, the event must be handled by the caller
+        """
+        with self._put_lock:
+
+            if self.stop_event.is_set():
+
+                return False
+
+            self._queue.put_nowait(event)
+            self._published += 1
+
+        return True
+
+    def get_metrics(self)->dict:
+        r"""
+        Gets alarm journal metrics
+
+        **Returns**
+
+        * **metrics** (dict): Queue depth, published events, written logging rows, failed events, flushes count,
+        flush latencies in seconds, UI notifications and alarms waiting to be notified
+        """
+        result = {
+            "queue_depth": self.get_queue_depth(),
+            "published": self._published,
+            "written": self._written,
+            "failed": self._failed
+        }
+        result.update(self.get_flush_metrics())
+        result["notifications"] = self._notifications
+        result["pending_notifications"] = len(self._pending)
+
+        return result
+
+    def flush(self, batch:list):
+        r"""
+        Writes a batch of events in a single transaction and marks their alarms to be notified
+
+        **Parameters**
+
+        * **batch** (list): AlarmEvent objects
+        """
+        if not batch:
+
+            return
+
+        for event in batch:
+
+            if event.kind in (TRANSITION, NOTIFY):
+
+                self._pending[event.name] = event.alarm
+
+            if event.kind == TRANSITION:
+
+                self._pending_summary = True
+
+        start = time.perf_counter()
+
+        try:
+
+            self._written += self._journal.write(batch)
+
+        except Exception as e:
+
+            self._failed += len(batch)
+            message = "Alarm Journal: Error writing alarm events batch"
+            log_detailed(e, message)
+
+        self._record_flush(start)
+
+    def notify(self, force:bool=False):
+        r"""
+        Notifies the alarms changed since the last notification, if *debounce* seconds elapsed
+        and the previous notification was emitted
+
+        **Parameters**
+
+        * **force** (bool): Notify regardless of *debounce*, waits for the previous notification
+        """
+        if not self._pending:
+
+            return
+
+        if self.__is_notifying():
+
+            if not force:
+
+                return
+
+            concurrent.futures.wait([self._notifying])
+
+        if not force and time.monotonic() - self._notified_at < self._debounce:
+
+            return
+
+        alarms = list(self._pending.values())
+        summary = self._pending_summary
+        self._pending = dict()
+        self._pending_summary = False
+        self._notified_at = time.monotonic()
+        self._notifying = self._notifier.submit(self.__emit, alarms, summary)
+
+    def __is_notifying(self)->bool:
+
+        return self._notifying is not None and not self._notifying.done()
+
+    def __emit(self, alarms:list, summary:bool):
+
+        try:
+
+            with use_connection():
+
+                self._journal.emit(alarms, summary=summary)
+
+            self._notifications += 1
+
+        except Exception as e:
+            message = "Alarm Journal: Error notifying alarms"
+            log_detailed(e, message)
+
+    def _get_timeout(self)->float:
+        r"""
+        Returns the seconds to wait for the first event of a batch, bounded by the next notification
+        """
+        if not self._pending or self.__is_notifying():
+
+            return self._flush_interval
+
+        remaining = self._notified_at + self._debounce - time.monotonic()
+
+        return min(self._flush_interval, max(remaining, 0.0))
+
+    def run(self):
+
+        self._journal.set_worker(self)
+
+        try:
+
+            while not self.stop_event.is_set():
+
+                batch = self._get_batch()
+
+                with use_connection():
+
+                    self.flush(batch)
+
+                self.notify()
+
+        except Exception as e:
+            message = "Alarm Journal: Error on alarm journal worker"
+            log_detailed(e, message)
+
+        finally:
+
+            if self._journal.get_worker() is self:
+
+                self._journal.set_worker(None)
+
+            # Events are not enqueued anymore once the pending puts are done
+            with self._put_lock:
+
+                self.stop_event.set()
+
+            with use_connection():
+
+                self._drain()
+
+            self.notify(force=True)
+            self._notifier.shutdown(wait=True)
+
+        logging.info("Alarm Journal worker shutdown successfully!")
@@ -5,13 +5,28 @@ This module implements Logger Worker.
 """
 import time
 import logging
+from datetime import datetime
 
 from ..logger.engine import DataLoggerEngine
 from .worker import BaseWorker
-from ..utils import chunks, log_detailed
+from ..dbmodels import use_connection
+from ..utils import log_detailed
 
 
 class MicroLoggerWorker(BaseWorker):
+    r"""
+    Periodic sampler for a period group of the LogTable.
+
+    Each tick reads all tags of the group from the CVT in a single snapshot,
+    filters them through the compression of their tags and logs them with a single insert. Ticks are scheduled on a monotonic clock
+    from the start time (t0 + n * period), so they do not drift; when a tick
+    can not be done on time it is skipped and counted as an overrun.
+
+    **Parameters**
+
+    * **tags** (list): LogTable tags of the period group
+    * **period** (float): Sampling period in seconds
+    """
 
     def __init__(self, tags, period):
 
@@ -19,38 +34,134 @@ class MicroLoggerWorker(BaseWorker):
 
         self.tags = tags
         self._period = period
-        self.last = None
-        self.compensation = 0.0
+        self._names = [tag[0] for tag in tags]
+        self._compression = {tag[0]: tag[9] for tag in tags if len(tag) > 9 and tag[9]}
+        self._tag_ids = dict()
+        self._ticks = 0
+        self._overruns = 0
+        self._samples = 0
 
         self._logger = DataLoggerEngine()
 
-    def set_last(self):
+    def get_period(self)->float:
+
+        return self._period
+
+    def get_overruns(self)->int:
+        r"""
+        Returns the number of ticks skipped because sampling was late
+        """
+        return self._overruns
+
+    def get_metrics(self)->dict:
+        r"""
+        Gets sampler metrics
+
+        **Returns**
+
+        * **metrics** (dict): period, tags count, ticks done, overruns and samples logged
+        """
+        result = dict()
+
+        result["period"] = self._period
+        result["tags"] = len(self._names)
+        result["ticks"] = self._ticks
+        result["overruns"] = self._overruns
+        result["samples"] = self._samples
+
+        return result
+
+    def get_tag_ids(self)->list:
+        r"""
+        Returns database ids of the group tags defined in the CVT, compression settings
+        of their LogTable entries are registered if not defined yet
+        """
+        for name in self._names:
+
+            if name not in self._tag_ids:
+
+                tag = self.tag_engine._cvt.get_tag(name)
+
+                if tag is not None and tag.get_id() is not None:
+
+                    self._tag_ids[name] = tag.get_id()
+
+                    if name in self._compression and self._logger.get_compression(tag.get_id()) is None:
+
+                        min_value, max_value = tag.get_min_value(), tag.get_max_value()
+                        span = max_value - min_value if min_value is not None and max_value is not None else None
+                        self._logger.set_compression(tag.get_id(), span=span, **self._compression[name])
+
+        return list(self._tag_ids.values())
+
+    def sample(self):
+        r"""
+        Logs a snapshot of all group tags with a single insert
+        """
+        self.get_tag_ids()
+        timestamp = datetime.now()
+        values = self.tag_engine.read_tags(list(self._tag_ids.keys()))
+        rows = list()
+
+        for name, tag_value in values.items():
 
-        self.last = time.time()
+            try:
 
-    def sleep_elapsed(self):
+                value = float(tag_value['value'])
 
-        elapsed = time.time() - self.last
+            except (TypeError, ValueError):
 
-        if elapsed < self._period:
-            time.sleep(self._period - elapsed)
-        else:
-            logging.warning("Logger Worker: Failed to log items on time...")
+                continue
 
-        self.set_last()
+            rows.append((self._tag_ids[name], value, timestamp))
+
+        rows = self._logger.compress(rows)
+
+        if rows:
+
+            if self._logger.get_single_writer():
+
+                self._logger.write_values(rows)
+
+            else:
+
+                self._logger.write_tags([{'tag': tag_id, 'value': value, 'timestamp': timestamp} for tag_id, value, timestamp in rows])
+
+            self._samples += len(rows)
+
+        self._ticks += 1
 
     def run(self):
 
-        time.sleep(self._period)
+        self._logger.add_sampled_tags(self.get_tag_ids())
+        deadline = time.monotonic() + self._period
+
+        try:
+
+            while not self.stop_event.wait(max(deadline - time.monotonic(), 0.0)):
 
-        self.set_last()
+                with use_connection():
 
-        while True:
+                    self.sample()
 
-            self.sleep_elapsed()
+                self._logger.add_sampled_tags(self.get_tag_ids())
+                deadline += self._period
+                now = time.monotonic()
 
-            if self.stop_event.is_set():
-                break
+                if now > deadline:
+
+                    missed = int((now - deadline) // self._period) + 1
+                    self._overruns += missed
+                    deadline += missed * self._period
+                    logging.warning(f"Logger Worker: {missed} sample(s) of period {self._period}s skipped, logging is late")
+
+        except Exception as e:
+            message = f"logger: Error on sampler of period {self._period}s"
+            log_detailed(e, message)
+
+        finally:
+
+            self._logger.remove_sampled_tags(list(self._tag_ids.values()))
 
 
 class LoggerWorker(BaseWorker):
@@ -71,7 +182,7 @@ class LoggerWorker(BaseWorker):
 
     def verify_workload(self):
 
-        tags = self._manager.get_tags()
+        tags = self._manager.get_table().get_all_tags()
 
         if not tags:
             return False
@@ -90,17 +201,23 @@ class LoggerWorker(BaseWorker):
         for period in log_table.get_groups():
 
             tags = log_table.get_tags(period)
-            tags = list(chunks(tags, 3))
-            
-            for group in tags:
-                
-                worker = MicroLoggerWorker(group, period)
-                worker.daemon = True
-                self.micro_workers.append(worker)
+
+            if not tags:
+                continue
+
+            worker = MicroLoggerWorker(tags, period)
+            worker.daemon = True
+            self.micro_workers.append(worker)
 
         for worker in self.micro_workers:
             worker.start()
 
+    def get_metrics(self)->list:
+        r"""
+        Gets metrics of each period sampler
+        """
+        return [worker.get_metrics() for worker in self.micro_workers]
+
     def stop(self):
 
         for worker in self.micro_workers:
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""pyhades/workers/retention.py
+
+This module implements Retention Worker, it removes tag values
+older than their retention.
+"""
+import logging
+
+from .worker import BaseWorker
+from ..dbmodels import use_connection
+from ..utils import log_detailed
+
+
+class RetentionWorker(BaseWorker):
+    r"""
+    Periodically applies the retention policy.
+
+    **Parameters**
+
+    * **retention** (Retention): Retention policy
+    * **period** (float): Seconds between two runs
+    """
+
+    def __init__(self, retention, period:float=3600.0):
+
+        super(RetentionWorker, self).__init__()
+
+        self._retention = retention
+        self._period = period
+
+    def run(self):
+
+        while not self.stop_event.is_set():
+
+            try:
+
+                with use_connection():
+
+                    self._retention.apply()
+
+            except Exception as e:
+                message = "Retention: Error removing old tag values"
+                log_detailed(e, message)
+
+            self.stop_event.wait(self._period)
+
+        logging.info("Retention worker shutdown successfully!")
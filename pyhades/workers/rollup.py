@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""pyhades/workers/rollup.py
+
+This module implements Rollup Worker, it keeps tag rollups up to date.
+"""
+import logging
+
+from ..logger.engine import DataLoggerEngine
+from .worker import BaseWorker
+from ..dbmodels import use_connection
+from ..utils import log_detailed
+
+
+class RollupWorker(BaseWorker):
+    r"""
+    Periodically computes the rollup buckets completed since the last run.
+
+    **Parameters**
+
+    * **rollup** (Rollup): Rollups to maintain
+    * **period** (float): Seconds between two runs
+    """
+
+    def __init__(self, rollup, period:float=60.0):
+
+        super(RollupWorker, self).__init__()
+
+        self._rollup = rollup
+        self._period = period
+        self._logger = DataLoggerEngine()
+
+    def run(self):
+
+        self._logger.set_rollup(self._rollup)
+
+        while not self.stop_event.is_set():
+
+            try:
+
+                with use_connection():
+
+                    self._rollup.update()
+
+            except Exception as e:
+                message = "Rollup: Error updating tag rollups"
+                log_detailed(e, message)
+
+            self.stop_event.wait(self._period)
+
+        logging.info("Rollup worker shutdown successfully!")
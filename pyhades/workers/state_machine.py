@@ -13,6 +13,7 @@ from collections import deque
 from threading import Thread
 
 from .worker import BaseWorker
+from ..dbmodels import use_connection
 
 
 class MachineScheduler():
@@ -57,7 +58,9 @@ class MachineScheduler():
 
             while self._ready:
                 func = self._ready.popleft()
-                func()
+
+                with use_connection():
+                    func()
 
     def set_last(self):
 
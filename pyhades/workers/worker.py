@@ -3,6 +3,8 @@
 
 This module implements all thread classes for workers.
 """
+import time
+import queue
 from threading import Thread
 from threading import Event as ThreadEvent
 from ..tags import CVTEngine
@@ -35,4 +37,148 @@ class BaseWorker(Thread):
         
         self.__dict__.update(state)
         self.stop_event = ThreadEvent()
-    
\ No newline at end of file
+    
+
+
+class BatchWorker(BaseWorker):
+    r"""
+    Base class of workers which drain a queue in batches.
+
+    Items are taken out of the queue in batches, a batch is flushed when it reaches
+    *flush_size* items or when *flush_interval* seconds elapsed since its first item.
+    Subclasses implement *flush* and call *_record_flush* to keep the flush latency metrics.
+
+    **Parameters**
+
+    * **flush_size** (int): Max items in a batch
+    * **flush_interval** (float): Max seconds an item waits to be flushed
+    * **queue_size** (int)[Optional]: Max items in the queue, not bounded by default
+    """
+
+    def __init__(self, flush_size:int, flush_interval:float, queue_size:int=0):
+
+        super(BatchWorker, self).__init__()
+
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        self._flushes = 0
+        self._last_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    def get_queue_depth(self)->int:
+        r"""
+        Returns the number of items waiting to be flushed
+        """
+        return self._queue.qsize()
+
+    def get_flush_metrics(self)->dict:
+        r"""
+        Gets the flushes count and the flush latencies in seconds
+        """
+        return {
+            "flushes": self._flushes,
+            "last_flush_latency": self._last_flush_latency,
+            "max_flush_latency": self._max_flush_latency,
+            "avg_flush_latency": self._total_flush_latency / self._flushes if self._flushes else 0.0
+        }
+
+    def flush(self, batch:list):
+        r"""
+        Handles a batch of items, it must be implemented by subclasses
+
+        **Parameters**
+
+        * **batch** (list): Items in queue order
+        """
+        raise NotImplementedError
+
+    def _record_flush(self, start:float):
+        r"""
+        Records the latency of a flush started at *start*, a *time.perf_counter* value
+        """
+        latency = time.perf_counter() - start
+        self._flushes += 1
+        self._last_flush_latency = latency
+        self._max_flush_latency = max(self._max_flush_latency, latency)
+        self._total_flush_latency += latency
+
+    def _get_timeout(self)->float:
+        r"""
+        Returns the seconds to wait for the first item of a batch
+        """
+        return self._flush_interval
+
+    def _get_batch(self)->list:
+        r"""
+        Collects items until *flush_size* is reached or *flush_interval* elapsed
+        since the first item of the batch.
+        """
+        batch = list()
+
+        try:
+
+            batch.append(self._queue.get(timeout=self._get_timeout()))
+
+        except queue.Empty:
+
+            return batch
+
+        deadline = time.monotonic() + self._flush_interval
+
+        while len(batch) < self._flush_size:
+
+            timeout = deadline - time.monotonic()
+
+            if timeout <= 0 or self.stop_event.is_set():
+
+                break
+
+            try:
+
+                batch.append(self._queue.get(timeout=timeout))
+
+            except queue.Empty:
+
+                break
+
+        return batch
+
+    def _drain(self):
+        r"""
+        Flushes everything left in the queue
+        """
+        batch = list()
+
+        while True:
+
+            try:
+
+                batch.append(self._queue.get_nowait())
+
+            except queue.Empty:
+
+                break
+
+            if len(batch) >= self._flush_size:
+
+                self.flush(batch)
+                batch = list()
+
+        self.flush(batch)
+
+    def stop(self, timeout:float=None):
+        r"""
+        Stops the worker and waits until the queue is flushed
+
+        **Parameters**
+
+        * **timeout** (float)[Optional]: Max time in seconds to wait for the flush
+        """
+        self.stop_event.set()
+
+        if self.is_alive():
+
+            self.join(timeout)
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""pyhades/workers/writer.py
+
+This module implements Tag Writer Worker, a write-behind pipeline
+between the CVT and the database.
+"""
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+
+from ..dbmodels import TagValue, CONNECTION_ERRORS, use_connection
+from ..logger.engine import DataLoggerEngine
+from .worker import BatchWorker
+from ..utils import log_detailed
+
+
+class TagWriterWorker(BatchWorker):
+    r"""
+    Drains tag values written in the CVT into the database.
+
+    CVT writes only enqueue `(tag_id, value, timestamp)` into a bounded queue,
+    this worker takes them out in batches and persists each batch with a single
+    `TagValue.insert_many` inside a transaction. A batch is flushed when it reaches
+    *flush_size* samples or when *flush_interval* seconds elapsed since its first sample.
+
+    If the queue is full, the new sample is dropped and counted in the metrics.
+
+    If a spool is defined, batches which can not be written because the database is unreachable
+    are appended to it and the following batches go to the spool too, so values are kept in order.
+    Every *retry_interval* seconds the spool is replayed in bulk, once it is empty batches
+    are written in the database again.
+
+    Batches rejected by the database because of their data, as values of deleted tags, are written
+    one sample at a time, invalid samples are skipped and counted in the metrics.
+
+    **Parameters**
+
+    * **manager** (DBManager): Database manager, holds the database and the writer settings
+    """
+
+    def __init__(self, manager):
+
+        super(TagWriterWorker, self).__init__(
+            flush_size=manager.get_flush_size(),
+            flush_interval=manager.get_flush_interval(),
+            queue_size=manager.get_queue_size()
+        )
+
+        self._manager = manager
+        self._logger = DataLoggerEngine()
+        self._spool = manager.get_spool()
+        self._retry_interval = manager.get_retry_interval()
+        self._retry_at = 0.0
+        self._metrics_lock = threading.Lock()
+        self._put_lock = threading.Lock()
+
+        self._dropped = 0
+        self._rejected = 0
+        self._written = 0
+        self._failed = 0
+        self._invalid = 0
+        self._spooled = 0
+
+    def put(self, tag_id:int, value, timestamp:datetime=None)->bool:
+        r"""
+        Enqueues a tag value to be written in the database, never blocks.
+
+        **Parameters**
+
+        * **tag_id** (int): Tag id in database
+        * **value** (float, int, bool): Tag value
+        * **timestamp** (datetime)[Optional]: Source timestamp, now by default
+
+        **Returns**
+
+        * **enqueued** (bool): False if the sample was dropped or rejected, or if the worker is stopping,
+        then its stop event is set and the sample must be written by the caller
+        """
+        try:
+
+            value = float(value)
+
+        except (TypeError, ValueError):
+
+            with self._metrics_lock:
+
+                self._rejected += 1
+
+            return False
+
+        if timestamp is None:
+
+            timestamp = datetime.now()
+
+        with self._put_lock:
+
+            if self.stop_event.is_set():
+
+                return False
+
+            try:
+
+                self._queue.put_nowait((tag_id, value, timestamp))
+
+            except queue.Full:
+
+                with self._metrics_lock:
+
+                    self._dropped += 1
+
+                return False
+
+        return True
+
+    def get_metrics(self)->dict:
+        r"""
+        Gets write-behind pipeline metrics
+
+        **Returns**
+
+        * **metrics** (dict): Queue depth, dropped and rejected samples, written, failed, invalid and spooled samples,
+        flushes count, flush latencies in seconds and spool metrics
+        """
+        result = dict()
+
+        result["queue_depth"] = self.get_queue_depth()
+        result["queue_size"] = self._queue.maxsize
+        result["dropped"] = self._dropped
+        result["rejected"] = self._rejected
+        result["written"] = self._written
+        result["failed"] = self._failed
+        result["invalid"] = self._invalid
+        result["spooled"] = self._spooled
+        result.update(self.get_flush_metrics())
+
+        if self._spool is not None:
+
+            result["spool"] = self._spool.get_metrics()
+
+        return result
+
+    def flush(self, batch:list):
+        r"""
+        Writes a batch of samples in a single transaction, the batch is spooled
+        if the database is unreachable or the spool is not replayed yet
+
+        **Parameters**
+
+        * **batch** (list): List of (tag_id, value, timestamp) tuples
+        """
+        if self._spool is not None and self._spool.get_pending():
+
+            if not self.replay():
+
+                self.__spool(batch)
+
+                return
+
+        if not batch:
+
+            return
+
+        start = time.perf_counter()
+
+        try:
+
+            self._written += self.__write(batch)
+
+        except CONNECTION_ERRORS as e:
+
+            if self._spool is not None:
+
+                self.__spool(batch)
+                self._retry_at = time.monotonic() + self._retry_interval
+                message = "Tag Writer: Database unreachable, tag values are spooled"
+
+            else:
+
+                self._failed += len(batch)
+                message = "Tag Writer: Error writing tag values batch"
+
+            log_detailed(e, message)
+
+        except Exception as e:
+
+            self._failed += len(batch)
+            message = "Tag Writer: Error writing tag values batch"
+            log_detailed(e, message)
+
+        self._record_flush(start)
+
+    def replay(self)->bool:
+        r"""
+        Replays the spool in the database, at most once every *retry_interval* seconds while it fails
+
+        **Returns**
+
+        * **replayed** (bool): True if the spool is empty
+        """
+        if time.monotonic() < self._retry_at:
+
+            return False
+
+        try:
+
+            self._spool.replay(self.__replay, batch_size=self._flush_size)
+
+        except Exception as e:
+
+            self._retry_at = time.monotonic() + self._retry_interval
+            logging.warning(f"Tag Writer: Database still unreachable, spool replay retried in {self._retry_interval}s")
+
+            return False
+
+        return not self._spool.get_pending()
+
+    def __replay(self, batch:list):
+
+        self._written += self.__write(batch)
+
+    def __write(self, batch:list)->int:
+        r"""
+        Inserts a batch of samples, if it fails because of its data the samples are inserted one by one
+        and the invalid ones are skipped, so they are neither retried nor spooled. Connection errors are raised.
+
+        **Returns**
+
+        * **written** (int): Number of inserted samples
+        """
+        try:
+
+            self.__insert(batch)
+
+            return len(batch)
+
+        except CONNECTION_ERRORS:
+
+            raise
+
+        except Exception as e:
+
+            if len(batch) > 1:
+
+                logging.warning(f"Tag Writer: Invalid tag values in batch ({e}), they are written one by one")
+
+        written = 0
+
+        for sample in batch:
+
+            try:
+
+                self.__insert([sample])
+                written += 1
+
+            except CONNECTION_ERRORS:
+
+                raise
+
+            except Exception as e:
+
+                self._invalid += 1
+                logging.warning(f"Tag Writer: Invalid value of tag {sample[0]} at {sample[2]} skipped ({e})")
+
+        return written
+
+    def __insert(self, batch:list):
+
+        db = self._manager.get_db()
+
+        with db.atomic():
+
+            TagValue.insert_many(
+                batch,
+                fields=[TagValue.tag, TagValue.value, TagValue.timestamp]
+            ).execute()
+
+    def __spool(self, batch:list):
+
+        try:
+
+            self._spooled += self._spool.append(batch)
+
+        except Exception as e:
+
+            self._failed += len(batch)
+            message = "Tag Writer: Error spooling tag values batch"
+            log_detailed(e, message)
+
+    def run(self):
+
+        self._logger.set_writer(self)
+
+        try:
+
+            while not self.stop_event.is_set():
+
+                batch = self._get_batch()
+
+                with use_connection():
+
+                    self.flush(batch)
+
+        except Exception as e:
+            message = "Tag Writer: Error on write-behind worker"
+            log_detailed(e, message)
+
+        finally:
+
+            if self._logger.get_writer() is self:
+
+                self._logger.set_writer(None)
+
+            # Samples are not enqueued anymore once the pending puts are done
+            with self._put_lock:
+
+                self.stop_event.set()
+
+            with use_connection():
+
+                self._drain()
+
+        logging.info("Tag Writer worker shutdown successfully!")
@@ -10,6 +10,22 @@ from pyhades.tests.test_dbmodels import TestDBModels
 from pyhades.tests.test_dbmodels_from_config_file import TestDBModelsFromConfigFile
 from pyhades.tests.test_unit_conversion import TestUnitConversion
 from pyhades.tests.test_unit_conversion_from_tags import TestUnitConversionFromTags
+from pyhades.tests.test_cvt import TestCVTEngine
+from pyhades.tests.test_writer import TestTagWriter
+from pyhades.tests.test_logger_worker import TestMicroLoggerWorker
+from pyhades.tests.test_query import TestQueryLogger
+from pyhades.tests.test_archive import TestArchive
+from pyhades.tests.test_rollup import TestRollup
+from pyhades.tests.test_retention import TestRetention
+from pyhades.tests.test_compression import TestCompression
+from pyhades.tests.test_spool import TestSpool
+from pyhades.tests.test_pool import TestConnectionPool
+from pyhades.tests.test_router import TestDatabaseRouter
+from pyhades.tests.test_actor import TestDBActor
+from pyhades.tests.test_batch_alarms import TestBatchAlarms
+from pyhades.tests.test_change_queue import TestCoalescingQueue
+from pyhades.tests.test_alarm_worker import TestAlarmWorker
+from pyhades.tests.test_alarm_journal import TestAlarmJournal
 
 
 def suite():
@@ -29,6 +45,22 @@ def suite():
     tests.append(TestLoader().loadTestsFromTestCase(TestDBModelsFromConfigFile))
     tests.append(TestLoader().loadTestsFromTestCase(TestUnitConversion))
     tests.append(TestLoader().loadTestsFromTestCase(TestUnitConversionFromTags))
+    tests.append(TestLoader().loadTestsFromTestCase(TestCVTEngine))
+    tests.append(TestLoader().loadTestsFromTestCase(TestTagWriter))
+    tests.append(TestLoader().loadTestsFromTestCase(TestMicroLoggerWorker))
+    tests.append(TestLoader().loadTestsFromTestCase(TestQueryLogger))
+    tests.append(TestLoader().loadTestsFromTestCase(TestArchive))
+    tests.append(TestLoader().loadTestsFromTestCase(TestRollup))
+    tests.append(TestLoader().loadTestsFromTestCase(TestRetention))
+    tests.append(TestLoader().loadTestsFromTestCase(TestCompression))
+    tests.append(TestLoader().loadTestsFromTestCase(TestSpool))
+    tests.append(TestLoader().loadTestsFromTestCase(TestConnectionPool))
+    tests.append(TestLoader().loadTestsFromTestCase(TestDatabaseRouter))
+    tests.append(TestLoader().loadTestsFromTestCase(TestDBActor))
+    tests.append(TestLoader().loadTestsFromTestCase(TestBatchAlarms))
+    tests.append(TestLoader().loadTestsFromTestCase(TestCoalescingQueue))
+    tests.append(TestLoader().loadTestsFromTestCase(TestAlarmWorker))
+    tests.append(TestLoader().loadTestsFromTestCase(TestAlarmJournal))
     suite = TestSuite(tests)
     return suite
 